@@ -0,0 +1,285 @@
+"""
+Shared cache of finished chat answers.
+
+Staff ask the same few questions over and over in slightly different words.
+Answers are cached across sessions under (intent, normalized question, role).
+The normalized form is case-folded, punctuation-free, stripped of filler
+words and has synonyms mapped to one spelling, so "List all injuries", "show
+the injury report" and "injury report pls" share one entry. The routed intent
+is part of the key so that dropping a word can never turn one kind of
+question into another.
+
+Each entry remembers what it was built from, as declared by the answer code
+while it ran (see depends_on_players() and friends):
+
+- the whole roster (the default): dropped on any player update
+- specific players: dropped only when one of them is updated
+- nothing: static text, kept until the TTL runs out
+- the query log: dropped once a question is logged or patched after it
+- uncacheable: answers relative to the current time are never stored
+
+Entries are evicted least-recently-used first when either the entry limit or
+the memory budget is exceeded, and expire after a TTL. An answer computed
+while a relevant update landed is not stored.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from intent_router import tokenize
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_BUDGET_MB = 16
+DEFAULT_TTL = 600.0
+
+# dropped from the normalized form: words the answer code ignores anyway
+# (retrieval stop words that are neither entities nor, given the intent in the
+# key, needed for routing)
+FILLER = {
+    "a", "an", "the", "please", "pls", "plz", "thanks", "thx", "me", "us", "our", "my", "i", "we",
+    "can", "could", "would", "you", "u", "to", "of", "for", "on", "current", "currently", "right", "now",
+    "just", "all", "whole", "entire", "list", "show", "display", "give", "get", "see", "sentinels",
+}
+
+# mapped to one spelling; each pair is treated identically by routing,
+# entity extraction and retrieval
+SYNONYMS = {
+    "injuries": "injury", "injured": "injury", "report": "injury", "roster": "injury",
+    "what's": "what", "whats": "what", "who's": "who", "whos": "who", "how's": "how", "hows": "how",
+    "wrs": "wr", "receivers": "wr", "receiver": "wr", "qbs": "qb", "quarterbacks": "qb", "quarterback": "qb",
+}
+
+
+def normalize_question(text: str) -> str:
+    terms = []
+    for token in tokenize(text.casefold().replace("’", "'")):
+        token = SYNONYMS.get(token, token)
+        if token in FILLER or (terms and terms[-1] == token):
+            continue
+        terms.append(token)
+    return " ".join(terms)
+
+
+# ---------- DEPENDENCIES ----------
+class Dependencies:
+    __slots__ = ("roster", "numbers", "cacheable", "log_version")
+
+    def __init__(self):
+        self.roster = True
+        self.numbers = set()
+        self.cacheable = True
+        self.log_version = None  # query log version read, if the answer reads the log
+
+
+_current = threading.local()
+
+
+def _deps() -> Dependencies | None:
+    return getattr(_current, "deps", None)
+
+
+def depends_on_players(numbers):
+    """The answer being built reads only these players (not the roster as a whole)."""
+    deps = _deps()
+    if deps is not None:
+        deps.roster = False
+        deps.numbers.update(numbers)
+
+
+def depends_on_roster():
+    deps = _deps()
+    if deps is not None:
+        deps.roster = True
+
+
+def static_answer():
+    """The answer being built does not depend on player data at all."""
+    deps = _deps()
+    if deps is not None:
+        deps.roster = False
+
+
+def depends_on_query_log():
+    """The answer being built reads the query log (call before reading it)."""
+    deps = _deps()
+    if deps is not None:
+        deps.log_version = _query_log_version()
+
+
+def _query_log_version() -> int:
+    from query_log import get_query_log
+
+    return get_query_log().version
+
+
+def uncacheable():
+    deps = _deps()
+    if deps is not None:
+        deps.cacheable = False
+
+
+class Entry:
+    __slots__ = ("text", "roster", "revisions", "version", "log_version", "expires", "size")
+
+    def __init__(self, text: str, roster: bool, revisions: dict, version: int, log_version: int | None, expires: float):
+        self.text = text
+        self.roster = roster
+        self.revisions = revisions  # number -> revision the answer saw
+        self.version = version
+        self.log_version = log_version  # query log version the answer saw, if it read the log
+        self.expires = expires
+        self.size = sys.getsizeof(text) + 200  # text plus key, entry and index overhead
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        store,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        budget_bytes: int = DEFAULT_BUDGET_MB * 2**20,
+        ttl: float = DEFAULT_TTL,
+    ):
+        self.store = store
+        self.max_entries = max_entries
+        self.budget_bytes = budget_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> Entry, least recently used first
+        self._by_player = {}  # number -> keys of entries that read that player
+        self._roster_keys = set()  # keys of entries that read the whole roster
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0, "expired": 0}
+        store.add_listener(self._player_updated)
+
+    @staticmethod
+    def key(text: str, role: str, intent: str | None = None) -> tuple:
+        return intent, normalize_question(text), role
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    # ----- lookups -----
+    def get(self, key) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            elif entry is not None and entry.log_version is not None and entry.log_version != _query_log_version():
+                self._drop(key)
+                self.stats["invalidations"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.text
+
+    @contextmanager
+    def tracking(self):
+        """
+        Record what the answer built inside the block depends on. Yields
+        (Dependencies, roster version at the start); pass both to put().
+        """
+        deps = Dependencies()
+        previous, _current.deps = _deps(), deps
+        try:
+            yield deps, self.store.version
+        finally:
+            _current.deps = previous
+
+    def put(self, key, text: str, deps: Dependencies, version: int):
+        if not deps.cacheable or not text:
+            return
+        store = self.store
+        # only lock-free store reads in here: the store calls _player_updated
+        # with its own lock held, so taking it under ours could deadlock
+        with self._lock:
+            # an update that landed while the answer was built: the answer may be stale
+            if deps.roster and store.version != version:
+                return
+            revisions = {}
+            for number in deps.numbers:
+                revision = store.revision(number)
+                if revision is not None and revision > version:
+                    return
+                revisions[number] = revision
+            entry = Entry(text, deps.roster, revisions, store.version, deps.log_version, time.monotonic() + self.ttl)
+            if entry.size > self.budget_bytes:
+                return
+
+            self._drop(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            if entry.roster:
+                self._roster_keys.add(key)
+            for number in revisions:
+                self._by_player.setdefault(number, set()).add(key)
+            self.stats["stores"] += 1
+
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.budget_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    # ----- invalidation -----
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry.size
+        if entry.roster:
+            self._roster_keys.discard(key)
+        for number in entry.revisions:
+            keys = self._by_player.get(number)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_player[number]
+
+    def _player_updated(self, record: dict):
+        with self._lock:
+            doomed = self._roster_keys | self._by_player.get(record["number"], set())
+            for key in doomed:
+                self._drop(key)
+            self.stats["invalidations"] += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    The process-wide cache for the current store. SENTINEL_ANSWER_CACHE_MB
+    sets the memory budget (0 disables caching) and SENTINEL_ANSWER_CACHE_TTL
+    the lifetime of an entry in seconds.
+    """
+    global _cache
+    from player_store import get_store
+
+    store = get_store()
+    if _cache is None or _cache.store is not store:
+        with _cache_lock:
+            if _cache is None or _cache.store is not store:
+                _cache = AnswerCache(
+                    store,
+                    budget_bytes=int(float(os.environ.get("SENTINEL_ANSWER_CACHE_MB", DEFAULT_BUDGET_MB)) * 2**20),
+                    ttl=float(os.environ.get("SENTINEL_ANSWER_CACHE_TTL", DEFAULT_TTL)),
+                )
+    return _cache
@@ -0,0 +1,207 @@
+"""
+Background answer pipeline.
+
+The Streamlit script thread only enqueues a question and renders whatever has
+finished; answers are produced on a bounded, process-wide worker pool.
+
+- Backpressure: at most max_pending jobs may be queued or running at once;
+  submit() raises PipelineFull instead of letting the queue grow.
+- Timeouts: a job still unfinished after `timeout` seconds is reported as
+  timed out, and a streaming job stops at its next piece.
+- Cancellation: jobs can be cancelled one by one or per session (e.g. when a
+  rerun no longer shows them). A queued job never starts; a streaming job
+  stops at its next piece.
+- Partial output: answers produced as a stream are visible piece by piece
+  through Job.text while they are still being generated.
+- Eviction: a settled job waits for its session to collect it (forget()),
+  but a session that ended never will. submit() sweeps out settled jobs
+  older than settled_ttl, and the oldest ones beyond max_settled, so
+  abandoned answers do not pile up in the process.
+"""
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_SETTLED_TTL = 300.0  # seconds a settled job is kept for its session to collect
+DEFAULT_MAX_SETTLED = 1024
+SWEEP_INTERVAL = 10.0  # seconds between sweeps in submit()
+
+
+class PipelineFull(Exception):
+    """Raised by submit() when max_pending jobs are already queued or running."""
+
+
+class Job:
+    __slots__ = (
+        "id", "session_id", "submitted_at", "deadline", "ended", "pieces", "error", "cancelled", "finished", "future",
+    )
+
+    def __init__(self, job_id: int, session_id: str, timeout: float):
+        self.id = job_id
+        self.session_id = session_id
+        self.submitted_at = time.monotonic()
+        self.deadline = self.submitted_at + timeout
+        self.ended = None  # when the worker let go of it
+        self.pieces = []
+        self.error = None
+        self.cancelled = False
+        self.finished = False
+        self.future = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+    @property
+    def timed_out(self) -> bool:
+        return not self.finished and time.monotonic() > self.deadline
+
+    @property
+    def settled(self) -> bool:
+        """Nothing more will change: finished, failed, cancelled or timed out."""
+        return self.finished or self.cancelled or self.timed_out
+
+
+class AnswerPipeline:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        timeout: float = DEFAULT_TIMEOUT,
+        settled_ttl: float = DEFAULT_SETTLED_TTL,
+        max_settled: int = DEFAULT_MAX_SETTLED,
+    ):
+        self.timeout = timeout
+        self.settled_ttl = settled_ttl
+        self.max_settled = max_settled
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="answer-worker")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = {}  # job id -> Job, in submission order
+        self._swept = time.monotonic()
+        self.stats = {
+            "submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0, "timed_out": 0, "evicted": 0,
+        }
+
+    def submit(self, session_id: str, fn, *args, timeout: float | None = None) -> Job:
+        """
+        Run fn(*args) on the pool. fn may return a string or an iterable of
+        text pieces (streamed into Job.text as they arrive).
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise PipelineFull("Too many answers are being prepared right now")
+
+        job = Job(next(self._ids), session_id, self.timeout if timeout is None else timeout)
+        with self._lock:
+            if job.submitted_at - self._swept >= SWEEP_INTERVAL or len(self._jobs) > self.max_settled:
+                self._sweep(job.submitted_at)
+            self._jobs[job.id] = job
+            self.stats["submitted"] += 1
+        try:
+            job.future = self._executor.submit(self._run, job, fn, args)
+        except BaseException:
+            self._release(job)
+            raise
+        return job
+
+    def _run(self, job: Job, fn, args):
+        try:
+            if job.cancelled:
+                return
+            result = fn(*args)
+            if isinstance(result, str):
+                job.pieces.append(result)
+            else:
+                try:
+                    for piece in result:
+                        if job.cancelled or job.timed_out:
+                            break
+                        job.pieces.append(piece)
+                finally:
+                    close = getattr(result, "close", None)
+                    if close:
+                        close()
+            job.finished = not (job.cancelled or job.timed_out)
+        except Exception as exc:
+            job.error = exc
+        finally:
+            self._release(job)
+
+    def _sweep(self, now: float):
+        """Drop settled jobs nobody collected (called with the lock held)."""
+        self._swept = now
+        settled = [job for job in self._jobs.values() if job.settled]
+        excess = len(settled) - self.max_settled
+        for i, job in enumerate(settled):
+            ended = job.ended if job.ended is not None else job.deadline
+            if i < excess or now - ended >= self.settled_ttl:
+                del self._jobs[job.id]
+                self.stats["evicted"] += 1
+
+    def _release(self, job: Job):
+        job.ended = time.monotonic()
+        self._slots.release()
+        if metrics.enabled:
+            metrics.histogram("answer_job").record(time.monotonic() - job.submitted_at)
+        with self._lock:
+            if job.error is not None:
+                self.stats["failed"] += 1
+            elif job.finished:
+                self.stats["completed"] += 1
+            elif job.cancelled:
+                self.stats["cancelled"] += 1
+            else:
+                self.stats["timed_out"] += 1
+
+    def get(self, job_id: int) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def forget(self, job_id: int):
+        """Drop a settled job once its result has been copied into the chat."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def cancel(self, job_id: int):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.cancelled = True
+        # Future.cancel() only succeeds while the job is still queued; then
+        # _run never executes, so its slot has to be handed back here
+        if job.future is not None and job.future.cancel():
+            self._release(job)
+        self.forget(job_id)
+
+    def cancel_session(self, session_id: str, keep=()):
+        """Cancel every job of a session except the ids in keep."""
+        keep = set(keep)
+        with self._lock:
+            doomed = [j.id for j in self._jobs.values() if j.session_id == session_id and j.id not in keep]
+        for job_id in doomed:
+            self.cancel(job_id)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.settled)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_answer_pipeline() -> AnswerPipeline:
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = AnswerPipeline()
+    return _pipeline
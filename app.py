@@ -1,8 +1,16 @@
 import streamlit as st
 from datetime import datetime
-import pandas as pd
-import json
+from html import escape
+import io
+import os
+import uuid
 
+import metrics
+
+from auth import AuthBusy, AuthError, get_auth_service
+
+# The chat, roster and query-log machinery is imported by load_chat(), once
+# the user is past sign-in, so a cold process paints the login form without it.
 
 
 # ---------- BASIC PAGE CONFIG ----------
@@ -12,94 +20,6 @@ st.set_page_config(
     layout="wide",
 )
 
-# ---------- FICTIONAL SENTINEL PLAYERS ----------
-SENTINEL_PLAYERS = [
-    {
-        "number": 1,
-        "name": "Marcus Reed",
-        "position": "QB",
-        "injury": "Right shoulder strain",
-        "status": "Day-to-day – limited throws only",
-    },
-    {
-        "number": 22,
-        "name": "Devin Cole",
-        "position": "RB",
-        "injury": "Left hamstring tightness",
-        "status": "Limited practice – no full-speed cuts",
-    },
-    {
-        "number": 11,
-        "name": "Tyler Brooks",
-        "position": "WR",
-        "injury": "Concussion (Phase 2)",
-        "status": "Non-contact drills only",
-    },
-    {
-        "number": 17,
-        "name": "Jalen Ortiz",
-        "position": "WR",
-        "injury": "Right ankle sprain",
-        "status": "Out 1–2 weeks – rehab only",
-    },
-    {
-        "number": 85,
-        "name": "Cameron Price",
-        "position": "TE",
-        "injury": "Rib contusion",
-        "status": "No live contact, individual periods only",
-    },
-    {
-        "number": 52,
-        "name": "Malik Harris",
-        "position": "LB",
-        "injury": "Patellar tendinitis (right knee)",
-        "status": "Practice reps managed – no back-to-back full days",
-    },
-    {
-        "number": 24,
-        "name": "Isaiah Grant",
-        "position": "CB",
-        "injury": "Groin strain",
-        "status": "Day-to-day – avoid long sprints",
-    },
-    {
-        "number": 33,
-        "name": "Andre Walker",
-        "position": "S",
-        "injury": "Fractured right thumb",
-        "status": "Club cast – can practice, monitor contact",
-    },
-    {
-        "number": 72,
-        "name": "Logan Hayes",
-        "position": "LT",
-        "injury": "Lower back spasms",
-        "status": "Questionable – limited team periods",
-    },
-    {
-        "number": 90,
-        "name": "Jordan Fox",
-        "position": "DE",
-        "injury": "Calf strain",
-        "status": "Individual drills only, no full-speed rushes",
-    },
-    {
-        "number": 3,
-        "name": "Eli Summers",
-        "position": "K",
-        "injury": "Right quad strain",
-        "status": "Short-range kicks only, no max effort",
-    },
-    {
-        "number": 60,
-        "name": "Nate Dawson",
-        "position": "C",
-        "injury": "Left hand sprain",
-        "status": "Full participation with taped support",
-    },
-]
-
 # ---------- SESSION STATE ----------
 if "step" not in st.session_state:
     st.session_state.step = "login"  # login -> mfa -> dashboard/chat
@@ -111,176 +31,569 @@ if "user" not in st.session_state:
         "login_time": None,
     }
 
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = [
-        {
-            "sender": "system",
-            "label": "Sentinel Chatbox",
-            "text": (
-                "Welcome to the internal Sentinels chat platform. "
-                "This demo focuses on a **12-player injury report** use case. "
-                "Ask something like “List all injuries” or “Show the injury report.”"
-            ),
-        }
-    ]
-
-if "query_db" not in st.session_state:
-    st.session_state.query_db = []
-
-if "query_id_counter" not in st.session_state:
-    st.session_state.query_id_counter = 1
-
-# live, editable players list
-if "players" not in st.session_state:
-    # copy and add last_updated
-    st.session_state.players = []
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    for p in SENTINEL_PLAYERS:
-        p_copy = dict(p)
-        p_copy["last_updated"] = now_str
-        st.session_state.players.append(p_copy)
+if "auth_token" not in st.session_state:
+    st.session_state.auth_token = None  # signed token from the auth service
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+auth = get_auth_service()
+
+
+# ---------- CHAT MACHINERY ----------
+def load_chat():
+    """
+    Import the chat, roster and query-log machinery and set up this session's
+    chat state. Only the screens past sign-in call it; after the first call in
+    a process the imports are lookups in sys.modules.
+    """
+    global players_store, query_log
+    global get_answer_cache, PipelineFull, get_answer_pipeline, get_change_feed, ChatHistory
+    global format_batch_notice, format_update_notice, ai_answer_stream, get_query_analytics
+    global EXPORT_FORMATS, available_formats, export_file, get_query_frame, QUERY_STATUSES
+    global RosterError, diff_updates, read_updates, get_rate_limiter, policy_for
+
+    from answer_cache import get_answer_cache
+    from answer_pipeline import PipelineFull, get_answer_pipeline
+    from change_feed import get_change_feed
+    from chat_history import ChatHistory
+    from chatbot import ai_answer_stream
+    from injury_report import format_batch_notice, format_update_notice
+    from player_store import get_store
+    from projection import policy_for
+    from query_analytics import get_query_analytics
+    from query_export import EXPORT_FORMATS, available_formats, export_file, get_query_frame
+    from query_log import QUERY_STATUSES, get_query_log
+    from rate_limit import get_rate_limiter
+    from roster_loader import RosterError, diff_updates, read_updates
+
+    # live, editable players and the query database: process-wide, shared by every session
+    players_store = get_store()
+    query_log = get_query_log()
+    # other workers' roster updates and questions (no-ops without shared state)
+    players_store.sync()
+    query_log.sync()
+
+    if "chat_history" not in st.session_state:
+        # bounded: old turns are folded into summaries (and archived, if configured)
+        st.session_state.chat_history = ChatHistory(st.session_state.session_id)
+        st.session_state.chat_history.append(
+            {
+                "sender": "system",
+                "label": "Sentinel Chatbox",
+                "text": (
+                    "Welcome to the internal Sentinels chat platform. "
+                    "This demo focuses on a **12-player injury report** use case. "
+                    "Ask something like “List all injuries” or “Show the injury report.”"
+                ),
+            }
+        )
+
+    if "pending_answers" not in st.session_state:
+        st.session_state.pending_answers = {}  # answer pipeline job id -> placeholder chat message
+
+    if "chat_offset" not in st.session_state:
+        st.session_state.chat_offset = 0  # how many messages back from the newest the window ends
+
+    if "archive_page" not in st.session_state:
+        st.session_state.archive_page = None  # page of the chat archive being read, newest is 0
+
+    if "last_query_id" not in st.session_state:
+        st.session_state.last_query_id = None  # this session's most recent entry in the query log
+
+    if "feed_cursor" not in st.session_state:
+        # live updates are delivered from the moment the session starts
+        get_change_feed().sync()
+        st.session_state.feed_cursor = get_change_feed().latest
 
 
 # ---------- HELPERS ----------
+@st.cache_resource
+def page_assets() -> dict:
+    """The page's fixed CSS and HTML, built once per process and sent as single lines."""
+
+    def compact(html: str) -> str:
+        return " ".join(line.strip() for line in html.splitlines() if line.strip())
+
+    return {
+        "style": compact(
+            """
+            <style>
+              body {
+                background-color: #050814;
+                color:#F7FAFF;
+              }
+              .stApp {
+                background: radial-gradient(circle at top left,#151A30,#050814);
+              }
+            </style>
+            """
+        ),
+        "brand": compact(
+            """
+            <div style="display:flex;align-items:center;gap:10px;">
+              <div style="
+                  width:32px;height:32px;border-radius:999px;
+                  border:1px solid rgba(255,255,255,0.4);
+                  display:flex;align-items:center;justify-content:center;
+                  font-weight:700;font-size:14px;
+                  color:#FFFFFF;
+              ">
+                WS
+              </div>
+              <div style="font-weight:600;font-size:15px;color:#FFFFFF;">
+                Washington Sentinels | Internal Chatbot Prototype
+              </div>
+            </div>
+            """
+        ),
+        "footer": compact(
+            """
+            <hr style="opacity:0.4;border-color:#2E3650;" />
+            <div style="font-size:12px;color:#9CA5D1;text-align:center;">
+              Prototype only – no real PHI. Shared chat UI for all roles, with live injury updates when logged in as Team Physician.
+            </div>
+            """
+        ),
+    }
+
+
 def header_bar():
     with st.container():
         left, right = st.columns([3, 2])
         with left:
-            st.markdown(
-                """
-                <div style="display:flex;align-items:center;gap:10px;">
-                  <div style="
-                      width:32px;height:32px;border-radius:999px;
-                      border:1px solid rgba(255,255,255,0.4);
-                      display:flex;align-items:center;justify-content:center;
-                      font-weight:700;font-size:14px;
-                      color:#FFFFFF;
-                  ">
-                    WS
-                  </div>
-                  <div style="font-weight:600;font-size:15px;color:#FFFFFF;">
-                    Washington Sentinels | Internal Chatbot Prototype
-                  </div>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+            st.markdown(page_assets()["brand"], unsafe_allow_html=True)
         with right:
             user = st.session_state.user
             if user["username"]:
                 st.markdown(
                     f"""
                     <div style="text-align:right;font-size:12px;color:#D0D7F5;">
-                      {user["username"]} &nbsp;|&nbsp; {user["role"] or "Unknown"}<br/>
-                      <span>Logged in: {user["login_time"] or ""}</span>
+                      {escape(user["username"])} &nbsp;|&nbsp; {escape(user["role"] or "Unknown")}<br/>
+                      <span>Logged in: {escape(user["login_time"] or "")}</span>
                     </div>
                     """,
                     unsafe_allow_html=True,
                 )
+                if st.button("Sign out", key="sign_out"):
+                    sign_out()
+                    st.rerun()
 
 
 def footer_bar():
+    st.markdown(page_assets()["footer"], unsafe_allow_html=True)
+
+
+CHAT_WINDOW_SIZE = 30  # messages rendered per rerun; older ones are paged
+
+CHAT_BUBBLE_STYLES = {
+    # sender: (align, background, border, text colour)
+    "user": ("flex-end", "linear-gradient(135deg,#4C6FFF,#9F7AEA)", "rgba(255,255,255,0.1)", "#FFFFFF"),
+    "system": ("flex-start", "#1A2340", "#3D4973", "#E5E9FF"),
+    "bot": ("flex-start", "#151B34", "#3D4973", "#F7FAFF"),
+}
+
+
+def render_message_html(msg: dict) -> str:
+    """
+    Build the chat bubble HTML for one message, once. The result is cached on
+    the message itself (or on its shared snapshot), so later reruns only pay
+    for a dict lookup. Anything that edits a message's text must drop its
+    "html" key. Label and text are escaped: questions and roster fields are
+    typed by users, and the bubble is rendered as HTML.
+    """
+    snapshot = msg.get("snapshot")
+    cache = msg if snapshot is None else snapshot.html
+    cache_key = "html" if snapshot is None else (msg["sender"], msg["label"])
+    html = cache.get(cache_key)
+    if html is not None:
+        return html
+
+    align, bg, border, text_color = CHAT_BUBBLE_STYLES.get(msg["sender"], CHAT_BUBBLE_STYLES["bot"])
+    html = f"""
+                    <div style="display:flex;justify-content:{align};margin-bottom:8px;">
+                      <div style="max-width:80%;">
+                        <div style="font-size:11px;color:#A0A8D8;text-transform:uppercase;margin-bottom:2px;">
+                          {escape(msg["label"])}
+                        </div>
+                        <div style="
+                            padding:10px 14px;
+                            border-radius:12px;
+                            background:{bg};
+                            font-size:13px;
+                            white-space:pre-wrap;
+                            border:1px solid {border};
+                            color:{text_color};
+                        ">
+                          {escape(msg["text"])}
+                        </div>
+                      </div>
+                    </div>
+                    """
+    cache[cache_key] = html
+    return html
+
+
+@metrics.timed("chat_render")
+def render_chat_history(history: "ChatHistory"):
+    """
+    Render only a window of the most recent CHAT_WINDOW_SIZE messages, as a
+    single markdown element, with a pager for older ones. Rerun cost depends
+    on the window size, not on how long the conversation has grown.
+    """
+    if st.session_state.archive_page is not None:
+        render_chat_archive(history)
+        return
+
+    total = len(history)
+    offset = min(st.session_state.chat_offset, max(total - CHAT_WINDOW_SIZE, 0))
+    end = total - offset
+    start = max(end - CHAT_WINDOW_SIZE, 0)
+
+    if start > 0 or offset > 0:
+        col_older, col_info, col_newer = st.columns([1, 2, 1])
+        with col_older:
+            if st.button("◀ Older messages", disabled=start == 0, key="chat_older"):
+                st.session_state.chat_offset = offset + CHAT_WINDOW_SIZE
+                st.rerun()
+        with col_info:
+            st.caption(f"Showing messages {start + 1}–{end} of {total}")
+        with col_newer:
+            if st.button("Newer messages ▶", disabled=offset == 0, key="chat_newer"):
+                st.session_state.chat_offset = max(offset - CHAT_WINDOW_SIZE, 0)
+                st.rerun()
+
+    window = history[start:end]
+    summary = history.summary_message() if start == 0 else None
+    if summary is not None:
+        window = [summary] + window
+        if history.archived() and st.button("Open archived messages", key="chat_archive"):
+            st.session_state.archive_page = 0
+            st.rerun()
+    st.markdown("".join(render_message_html(msg) for msg in window), unsafe_allow_html=True)
+
+
+def render_chat_archive(history: "ChatHistory"):
+    """Page back through the messages this session folded out of memory, read from disk."""
+    total = history.archived()
+    pages = max((total + CHAT_WINDOW_SIZE - 1) // CHAT_WINDOW_SIZE, 1)
+    page = min(st.session_state.archive_page, pages - 1)
+    end = total - page * CHAT_WINDOW_SIZE
+    start = max(end - CHAT_WINDOW_SIZE, 0)
+
+    col_older, col_info, col_newer = st.columns([1, 2, 1])
+    with col_older:
+        if st.button("◀ Older", disabled=page >= pages - 1, key="archive_older"):
+            st.session_state.archive_page = page + 1
+            st.rerun()
+    with col_info:
+        st.caption(f"Archive: messages {start + 1}–{end} of {total}")
+    with col_newer:
+        if st.button("Back to chat" if page == 0 else "Newer ▶", key="archive_newer"):
+            st.session_state.archive_page = None if page == 0 else page - 1
+            st.rerun()
+
+    # archived pages are read from disk per rerun; their bubbles are not cached
     st.markdown(
-        """
-        <hr style="opacity:0.4;border-color:#2E3650;" />
-        <div style="font-size:12px;color:#9CA5D1;text-align:center;">
-          Prototype only – no real PHI. Shared chat UI for all roles, with live injury updates when logged in as Team Physician.
-        </div>
-        """,
+        "".join(render_message_html(msg) for msg in history.read_archive(start, end - start)),
         unsafe_allow_html=True,
     )
 
 
+PENDING_ANSWER_TEXT = "…"
+ANSWER_REFRESH_SECONDS = 0.5
+
+
+def sync_pending_answers() -> bool:
+    """
+    Copy whatever the answer pipeline has produced into the placeholder
+    messages. Settled jobs are released; returns True while any are running.
+    """
+    pipeline = get_answer_pipeline()
+    pending = st.session_state.pending_answers
+    history = st.session_state.chat_history
+
+    for job_id, msg in list(pending.items()):
+        job = pipeline.get(job_id)
+        settled = True
+        if job is None or job.cancelled:
+            text = "_This answer was cancelled._"
+        elif job.error is not None:
+            text = "Sorry, something went wrong while preparing this answer. Please ask again."
+        elif job.finished:
+            text = job.text
+        elif job.timed_out:
+            text = (job.text + "\n\n" if job.text else "") + "_This answer took too long and was stopped._"
+        else:
+            text = (job.text + " ▌") if job.text else PENDING_ANSWER_TEXT
+            settled = False
+
+        if msg["text"] != text or settled:
+            history.settle(msg, text, final=settled)
+        if settled:
+            pipeline.forget(job_id)
+            del pending[job_id]
+
+    return bool(pending)
+
+
+FEED_REFRESH_SECONDS = 5.0
+
+
+def sync_change_feed():
+    """Append live updates published by other sessions since this one last looked."""
+    events, cursor, missed = get_change_feed().read(st.session_state.feed_cursor)
+    st.session_state.feed_cursor = cursor
+    history = st.session_state.chat_history
+    if missed:
+        history.append(
+            {
+                "sender": "system",
+                "label": "Live update",
+                "text": f"{missed} earlier injury updates were missed. Ask for the injury report to catch up.",
+            }
+        )
+    role = st.session_state.user["role"]
+    for event in events:
+        if event.origin == st.session_state.session_id:
+            continue
+        # each session gets the update through its own role's projection
+        if event.kind == "injury_update":
+            text = format_update_notice(event.data["player"], event.data["by"], role)
+        elif event.kind == "injury_batch":
+            text = format_batch_notice(event.data["players"], event.data["by"], role)
+        else:
+            text = event.text
+        history.append({"sender": "system", "label": "Live update", "text": text})
+    if events or missed:
+        st.session_state.chat_offset = 0
+
+
+def chat_window():
+    sync_pending_answers()
+    sync_change_feed()
+    render_chat_history(st.session_state.chat_history)
+
+
+def live_chat_window():
+    """chat_window() as a periodically refreshed fragment body."""
+    still_pending = sync_pending_answers()
+    sync_change_feed()
+    render_chat_history(st.session_state.chat_history)
+    if not still_pending:
+        # last answer just landed: one full rerun stops the refresh timer and
+        # brings the rest of the page up to date
+        st.rerun()
+
+
+QUERY_PAGE_SIZE = 20
+PLAYER_PICKER_LIMIT = 50  # matches offered by the physician's player picker
+
+
+def render_query_card(q: dict, show_note: bool = True) -> str:
+    """One Previous Questions card; every logged field is escaped, since other users typed them."""
+    return f"""
+                    <div style="
+                        font-size:12px;
+                        color:#E5E9FF;
+                        margin-bottom:6px;
+                        padding:6px 8px;
+                        border-radius:6px;
+                        border:1px solid #38426B;
+                        background:rgba(17,24,64,0.9);
+                    ">
+                      <div style="font-weight:600;">
+                        Q{q['id']}
+                        <span style="font-weight:400;color:#A0A8D8;">({escape(q['created_at'])})</span>
+                      </div>
+                      <div>{escape(q['question'])}</div>
+                      <div style="font-size:11px;color:#A0A8D8;margin-top:2px;">
+                        status: <strong>{escape(q['status'])}</strong>
+                        {(" · note: " + escape(q["note"])) if show_note and q.get("note") else ""}
+                      </div>
+                    </div>
+                    """
+
+
+def render_query_history():
+    """
+    One page of the query log, newest first, through the log's secondary
+    indexes. Older/newer paging uses keyset cursors kept in session state, so
+    each rerun only reads QUERY_PAGE_SIZE entries however large the log is.
+
+    The log is shared by every user: clinical roles see all of it with the
+    internal notes, other roles only their own role's questions and no notes.
+    """
+    viewer_role = st.session_state.user["role"] or "Unknown"
+    clinical = policy_for(viewer_role).full
+    if not len(query_log):
+        st.markdown(
+            "<div style='color:#E5E9FF;font-size:13px;'>No questions logged yet. As you chat, they’ll show up here.</div>",
+            unsafe_allow_html=True,
+        )
+        return
+
+    with st.expander("Filter / search", expanded=False):
+        status = st.selectbox("Status", ["Any"] + QUERY_STATUSES, key="qf_status")
+        if clinical:
+            role = st.selectbox("Role", ["Any"] + query_log.distinct("role"), key="qf_role")
+        else:
+            role = viewer_role
+        users = query_log.distinct("user") if clinical else [st.session_state.user["username"] or "internal_user"]
+        user = st.selectbox("User", ["Any"] + users, key="qf_user")
+        dates = st.date_input("Date range", value=(), key="qf_dates")
+        text = st.text_input("Search text", key="qf_text", placeholder="e.g. hamstring")
+
+    dates = list(dates) if isinstance(dates, (list, tuple)) else [dates]
+    filters = {
+        "status": None if status == "Any" else status,
+        "role": None if role == "Any" else role,
+        "user": None if user == "Any" else user,
+        "date_from": dates[0].isoformat() if dates else None,
+        "date_to": dates[-1].isoformat() if dates else None,
+        "text": text.strip() or None,
+    }
+
+    # a new filter starts again from the newest page
+    if st.session_state.get("query_filters") != filters:
+        st.session_state.query_filters = filters
+        st.session_state.query_cursors = [None]
+
+    cursors = st.session_state.query_cursors
+    items, older_cursor = query_log.page(
+        before_id=cursors[-1], limit=QUERY_PAGE_SIZE, search_notes=clinical, **filters
+    )
+
+    if items:
+        st.markdown("".join(render_query_card(q, show_note=clinical) for q in items), unsafe_allow_html=True)
+    else:
+        st.caption("No questions match these filters.")
+
+    col_newer, col_older = st.columns(2)
+    with col_newer:
+        if st.button("◀ Newer", disabled=len(cursors) == 1, key="queries_newer"):
+            cursors.pop()
+            st.rerun()
+    with col_older:
+        if st.button("Older ▶", disabled=older_cursor is None, key="queries_older"):
+            cursors.append(older_cursor)
+            st.rerun()
+
+
 def switch_step(new_step: str):
     st.session_state.step = new_step
 
 
+def sign_out(message: str | None = None):
+    auth.logout(st.session_state.auth_token)
+    st.session_state.auth_token = None
+    st.session_state.user = {"username": None, "role": None, "login_time": None}
+    st.session_state.step = "login"
+    if message:
+        st.session_state.auth_message = message
+
+
+def admit_send(role: str) -> bool:
+    """
+    Spend one of the user's send tokens. Over budget, the send is turned away
+    with a notice before it reaches the history, the answer pool or the query log.
+    """
+    user = st.session_state.user["username"] or st.session_state.session_id
+    wait = get_rate_limiter().acquire(user, role)
+    if wait:
+        st.warning(f"You're sending questions faster than your role allows. Try again in {int(wait) + 1} s.")
+        return False
+    return True
+
+
+@metrics.timed()
 def log_query(question: str, status: str = "new", note: str = "") -> int:
-    q_id = st.session_state.query_id_counter
-    st.session_state.query_id_counter += 1
-
-    entry = {
-        "id": q_id,
-        "user": st.session_state.user["username"] or "internal_user",
-        "role": st.session_state.user["role"] or "Unknown",
-        "question": question,
-        "status": status,  # new | reviewed | answered | ignored
-        "note": note,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
-    }
-    st.session_state.query_db.append(entry)
+    q_id = query_log.log(
+        user=st.session_state.user["username"] or "internal_user",
+        role=st.session_state.user["role"] or "Unknown",
+        question=question,
+        status=status,
+        note=note,
+    )
+    st.session_state.last_query_id = q_id
     return q_id
 
 
 def update_last_query(status: str, note: str):
-    if not st.session_state.query_db:
+    if st.session_state.last_query_id is None:
         return
-    st.session_state.query_db[-1]["status"] = status
-    st.session_state.query_db[-1]["note"] = note
-
-
-def format_injury_report() -> str:
-    lines = []
-    lines.append("Here’s the current Sentinels injury report (demo data):\n")
-    for p in st.session_state.players:
-        lines.append(
-            f"- **#{p['number']} {p['name']} ({p['position']})**  \n"
-            f"  **Injury:** {p['injury']}  \n"
-            f"  **Status:** {p['status']}  \n"
-            f"  _Last updated: {p['last_updated']}_"
-        )
-    return "\n".join(lines)
+    query_log.update(st.session_state.last_query_id, status, note)
 
 
-def ai_answer(text: str, role: str) -> str:
-    """
-    Simple "AI" centered on the injury report use case.
-    - When the user asks about injuries / report / roster, it lists all 12 players from live state.
-    - Otherwise gives a friendly, role-aware answer.
-    """
-    lower = text.lower()
+# ---------- SCREENS ----------
+ADMINS = {name.strip() for name in os.environ.get("SENTINEL_ADMINS", "").split(",") if name.strip()}
 
-    # If user asks for injuries, report, roster, or list
-    if any(word in lower for word in ["injury", "injuries", "report", "roster", "list"]):
-        report = format_injury_report()
 
-        if role == "Team Physician":
-            tail = (
-                "\n\nAs Team Physician, you’d be able to update these entries in the real system "
-                "directly from this interface (clearing players, changing phases, etc.). "
-                "Use the **Live Injury Update** panel below to simulate that in this demo."
-            )
-        else:
-            tail = (
-                "\n\nIn the full platform, this view would be filtered based on your role so that "
-                "non-clinical staff only see what they’re allowed to see."
-            )
+def is_admin() -> bool:
+    return st.session_state.user["username"] in ADMINS
 
-        return report + tail
 
-    # General / small talk
-    if any(greet in lower for greet in ["hi", "hello", "hey"]):
-        return (
-            "Hey 👋 This prototype is focused on the **injury report** use case. "
-            "Try asking me something like: *“List all injuries”* or *“Show the Sentinels injury report.”*"
-        )
+def render_admin_panel():
+    with st.expander("Performance (admin)", expanded=False):
+        collect = st.checkbox("Collect timings", value=metrics.enabled, key="metrics_enabled")
+        if collect != metrics.enabled:
+            metrics.set_enabled(collect)
 
-    if "what can you do" in lower or "help" in lower:
-        return (
-            "Right now this demo is centered on an **injury report** use case:\n"
-            "- I can list 12 fictional Washington Sentinels players and their current injuries.\n"
-            "- Every question you ask is logged into a **query database** for later analysis.\n"
-            "- If you’re logged in as Team Physician, you can update injuries live from this screen."
-        )
+        data = metrics.snapshot()
+        col_sessions, col_rss, col_peak = st.columns(3)
+        col_sessions.metric("Active sessions (15 min)", data["sessions"])
+        col_rss.metric("Resident memory", f"{data['rss_bytes'] / 2**20:.0f} MB")
+        col_peak.metric("Peak memory", f"{data['peak_rss_bytes'] / 2**20:.0f} MB")
 
-    # Fallback
-    return (
-        "For this demo, my main job is to show the **injury report** for our 12 fictional Sentinels players. "
-        "Try asking: *“List all injuries”* or *“Show the current injury report.”*"
-    )
+        cache = get_answer_cache()
+        col_hits, col_entries, col_bytes = st.columns(3)
+        col_hits.metric(
+            "Answer cache hit rate", f"{cache.hit_rate:.0%}",
+            help=f"{cache.stats['hits']} hits, {cache.stats['misses']} misses, "
+            f"{cache.stats['invalidations']} invalidated, {cache.stats['evictions']} evicted",
+        )
+        col_entries.metric("Cached answers", len(cache))
+        col_bytes.metric("Answer cache size", f"{cache.bytes / 2**20:.1f} of {cache.budget_bytes / 2**20:.0f} MB")
+
+        limits = get_rate_limiter().stats()
+        col_throttled, col_admitted, col_buckets = st.columns(3)
+        col_throttled.metric(
+            "Throttled sends", limits["throttled"],
+            help=", ".join(f"{role}: {c['throttled']}" for role, c in limits["by_role"].items() if c["throttled"])
+            or None,
+        )
+        col_admitted.metric("Admitted sends", limits["admitted"])
+        col_buckets.metric("Active rate buckets", limits["buckets"])
+
+        if data["stages"]:
+            st.table(
+                [
+                    {
+                        "stage": name,
+                        "calls": s["count"],
+                        "p50 ms": round(s["p50_ms"], 2),
+                        "p95 ms": round(s["p95_ms"], 2),
+                        "p99 ms": round(s["p99_ms"], 2),
+                        "max ms": round(s["max_ms"], 2),
+                    }
+                    for name, s in data["stages"].items()
+                ]
+            )
+        else:
+            st.caption("No timings recorded yet.")
+
+        path = os.environ.get("SENTINEL_METRICS_PATH", "metrics.prom")
+        if st.button("Write Prometheus metrics file", key="write_metrics"):
+            metrics.write_prometheus(path)
+            st.success(f"Wrote {path}.")
+        if os.environ.get("SENTINEL_PROFILE_SLOW_MS"):
+            st.caption(
+                f"Reruns slower than {os.environ['SENTINEL_PROFILE_SLOW_MS']} ms are profiled into "
+                f"{os.environ.get('SENTINEL_PROFILE_DIR', 'profiles')}/ as folded stacks."
+            )
 
 
-# ---------- SCREENS ----------
+@metrics.timed()
 def screen_login():
     header_bar()
     st.title("Internal Login", anchor=False)
@@ -291,18 +604,29 @@ def screen_login():
 
     roles = ["Team Physician", "Athletic Trainer", "Head Coach", "Assistant Coach", "Front Office"]
 
+    message = st.session_state.pop("auth_message", None)
+    if message:
+        st.warning(message)
+
     with st.form("login_form"):
         username = st.text_input("Username", placeholder="e.g. kkitching")
         role = st.selectbox("Role for this session", roles, index=0)
         password = st.text_input(
-            "Password", type="password", placeholder="Demo password (not actually checked)"
+            "Password",
+            type="password",
+            placeholder="Demo password (not actually checked)" if auth.users.demo else "",
         )
         submitted = st.form_submit_button("Sign In")
 
     if submitted:
-        if not username or not password:
-            st.error("Please enter both username and password.")
+        try:
+            token = auth.login(username, password, role)
+        except AuthBusy as e:
+            st.warning(str(e))
+        except AuthError as e:
+            st.error(str(e))
         else:
+            st.session_state.auth_token = token
             st.session_state.user["username"] = username
             st.session_state.user["role"] = role
             st.session_state.user["login_time"] = datetime.now().strftime(
@@ -311,22 +635,30 @@ def screen_login():
             switch_step("mfa")
 
 
+@metrics.timed()
 def screen_mfa():
     header_bar()
-    st.title("Multi-Factor Authentication (Simulated)", anchor=False)
-    st.caption("In production this would be a real MFA flow. Here we just ask for any 6-digit code.")
+    if auth.users.demo:
+        st.title("Multi-Factor Authentication (Simulated)", anchor=False)
+        st.caption("Demo sign-in is enabled, so any 6-digit code is accepted.")
+    else:
+        st.title("Multi-Factor Authentication", anchor=False)
+        st.caption("Enter the current 6-digit code from your authenticator app.")
 
     with st.form("mfa_form"):
         code = st.text_input("Verification code", max_chars=6, placeholder="e.g. 123456")
         submitted = st.form_submit_button("Verify & Continue")
 
     if submitted:
-        if not code.isdigit() or len(code) != 6:
-            st.error("Enter a valid 6-digit numeric code.")
+        try:
+            st.session_state.auth_token = auth.verify_mfa(st.session_state.auth_token, code)
+        except AuthError as e:
+            st.error(str(e))
         else:
             switch_step("dashboard")
 
 
+@metrics.timed()
 def screen_dashboard():
     header_bar()
     role = st.session_state.user["role"] or "Unknown"
@@ -345,58 +677,122 @@ def screen_dashboard():
     if st.button("Open Chat", type="primary"):
         st.session_state.step = "chat_screen"
 
+    if is_admin():
+        render_admin_panel()
+
     st.markdown("<hr style='border-color:#2E3650;opacity:0.5;' />", unsafe_allow_html=True)
 
     if st.session_state.step == "chat_screen":
         screen_chat(embed=True)
 
 
+def render_bulk_update():
+    """
+    Edit many players at once, in the grid or from a CSV of medical-staff
+    updates. Only the edited cells are diffed against the live roster, and
+    the changes are saved as one batch: one store version, one chat summary,
+    one live update and one query log entry.
+    """
+    version = players_store.version
+    cached = st.session_state.get("bulk_rows")
+    if cached is None or cached[0] != version:
+        rows = [
+            {"number": p["number"], "name": p["name"], "position": p["position"], "injury": p["injury"], "status": p["status"]}
+            for p in players_store.all()
+        ]
+        st.session_state.bulk_rows = cached = (version, rows)
+    rows = cached[1]
+
+    # widgets are keyed by round so a saved batch starts from a clean grid
+    batch_round = st.session_state.get("bulk_round", 0)
+    editor_key = f"bulk_editor_{batch_round}"
+    st.data_editor(
+        rows,
+        key=editor_key,
+        disabled=["number", "name", "position"],
+        hide_index=True,
+        use_container_width=True,
+    )
+    upload = st.file_uploader(
+        "…or import a CSV of updates (number or player_id, injury, status; blank keeps a field, \"-\" clears it)",
+        type=["csv"],
+        key=f"bulk_csv_{batch_round}",
+    )
+
+    edited = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    grid_rows = [{"number": rows[int(i)]["number"], **cells} for i, cells in edited.items()]
+    try:
+        changes = diff_updates(players_store, grid_rows, blank_clears=True)
+        if upload is not None:
+            csv_rows = read_updates(io.StringIO(upload.getvalue().decode("utf-8-sig")))
+            for number, fields in diff_updates(players_store, csv_rows).items():
+                changes.setdefault(number, {}).update(fields)
+    except (RosterError, UnicodeDecodeError) as e:
+        st.error(f"Cannot use these updates: {e}")
+        return
+
+    if not changes:
+        st.caption("No changes yet. Edit injury or status cells above, or import a CSV.")
+        return
+
+    preview = []
+    for number, fields in changes.items():
+        current = players_store.get(number)
+        for field, value in fields.items():
+            preview.append(
+                {"player": f"#{number} {current['name']}", "field": field, "now": current[field], "new": value}
+            )
+    st.table(preview)
+
+    noun = "player" if len(changes) == 1 else "players"
+    if st.button(f"Save changes to {len(changes)} {noun}", key="bulk_save", type="primary"):
+        updated = players_store.update_many(changes)
+        if updated:
+            by = st.session_state.user["username"] or "Team Physician"
+            st.session_state.chat_history.append(
+                {"sender": "bot", "label": "Chatbox", "text": format_batch_notice(updated, by)}
+            )
+            st.session_state.chat_offset = 0
+            get_change_feed().publish(
+                "injury_batch",
+                f"{by} updated {len(updated)} players.",
+                origin=st.session_state.session_id,
+                players=updated,
+                by=by,
+            )
+            log_query(
+                f"Doctor updated injuries for {len(updated)} players: "
+                + ", ".join(f"#{p['number']} {p['name']}" for p in updated)
+                + ".",
+                status="answered",
+                note="Bulk injury update performed in demo UI.",
+            )
+        st.session_state.bulk_round = batch_round + 1
+        st.rerun()
+
+
+@metrics.timed()
 def screen_chat(embed: bool = False):
     if not embed:
         header_bar()
 
     role = st.session_state.user["role"] or "Unknown"
 
+    # answers this session no longer tracks (e.g. a rerun interrupted the send
+    # handler) are cancelled instead of running on in the background
+    get_answer_pipeline().cancel_session(
+        st.session_state.session_id, keep=st.session_state.pending_answers
+    )
+
     # Layout: LEFT = previous questions (history), RIGHT = chat + DB + update form
     col_left, col_right = st.columns([1, 3], gap="large")
 
     # ---------- LEFT: HISTORY LIST ----------
     with col_left:
         st.markdown("#### Previous Questions", unsafe_allow_html=True)
-        st.caption("Newest at the top. This is the query database view for the demo.")
+        st.caption("Newest at the top, one page at a time. This is the query database view for the demo.")
 
-        if st.session_state.query_db:
-            items = st.session_state.query_db[::-1]  # newest first
-            for q in items:
-                st.markdown(
-                    f"""
-                    <div style="
-                        font-size:12px;
-                        color:#E5E9FF;
-                        margin-bottom:6px;
-                        padding:6px 8px;
-                        border-radius:6px;
-                        border:1px solid #38426B;
-                        background:rgba(17,24,64,0.9);
-                    ">
-                      <div style="font-weight:600;">
-                        Q{q['id']}
-                        <span style="font-weight:400;color:#A0A8D8;">({q['created_at']})</span>
-                      </div>
-                      <div>{q['question']}</div>
-                      <div style="font-size:11px;color:#A0A8D8;margin-top:2px;">
-                        status: <strong>{q['status']}</strong>
-                        {(" · note: " + q["note"]) if q.get("note") else ""}
-                      </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-        else:
-            st.markdown(
-                "<div style='color:#E5E9FF;font-size:13px;'>No questions logged yet. As you chat, they’ll show up here.</div>",
-                unsafe_allow_html=True,
-            )
+        render_query_history()
 
     # ---------- RIGHT: CHAT + INPUT + GUIDED DB UPDATE + INJURY FORM ----------
     with col_right:
@@ -408,46 +804,14 @@ def screen_chat(embed: bool = False):
         # Chat window
         chat_box = st.container()
         with chat_box:
-            for msg in st.session_state.chat_history:
-                if msg["sender"] == "user":
-                    align = "flex-end"
-                    bg = "linear-gradient(135deg,#4C6FFF,#9F7AEA)"  # bright gradient
-                    border = "rgba(255,255,255,0.1)"
-                    text_color = "#FFFFFF"
-                elif msg["sender"] == "system":
-                    align = "flex-start"
-                    bg = "#1A2340"
-                    border = "#3D4973"
-                    text_color = "#E5E9FF"
-                else:  # bot
-                    align = "flex-start"
-                    bg = "#151B34"
-                    border = "#3D4973"
-                    text_color = "#F7FAFF"
-
-                st.markdown(
-                    f"""
-                    <div style="display:flex;justify-content:{align};margin-bottom:8px;">
-                      <div style="max-width:80%;">
-                        <div style="font-size:11px;color:#A0A8D8;text-transform:uppercase;margin-bottom:2px;">
-                          {msg["label"]}
-                        </div>
-                        <div style="
-                            padding:10px 14px;
-                            border-radius:12px;
-                            background:{bg};
-                            font-size:13px;
-                            white-space:pre-wrap;
-                            border:1px solid {border};
-                            color:{text_color};
-                        ">
-                          {msg["text"]}
-                        </div>
-                      </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
+            if not hasattr(st, "fragment"):
+                chat_window()
+            elif sync_pending_answers():
+                # refresh just the chat window until pending answers land
+                st.fragment(run_every=ANSWER_REFRESH_SECONDS)(live_chat_window)()
+            else:
+                # slow refresh so other staff's injury updates show up unprompted
+                st.fragment(run_every=FEED_REFRESH_SECONDS)(chat_window)()
 
         # Bottom input bar
         st.markdown("<hr style='border-color:#2E3650;opacity:0.6;' />", unsafe_allow_html=True)
@@ -459,7 +823,7 @@ def screen_chat(embed: bool = False):
         with center_bar:
             with st.form("chat_form"):
                 user_text = st.text_input(
-                    "",
+                    "Message",
                     key="chat_input",
                     placeholder="Try: 'List all injuries' or 'Show the injury report'…",
                     label_visibility="collapsed",
@@ -473,7 +837,7 @@ def screen_chat(embed: bool = False):
                 unsafe_allow_html=True,
             )
 
-        if send and user_text.strip():
+        if send and user_text.strip() and admit_send(role):
             question = user_text.strip()
 
             # append user message
@@ -481,23 +845,35 @@ def screen_chat(embed: bool = False):
                 {"sender": "user", "label": "You", "text": question}
             )
 
-            # AI answer with role awareness
-            answer = ai_answer(question, role)
-            st.session_state.chat_history.append(
-                {"sender": "bot", "label": "Chatbox", "text": answer}
-            )
+            # AI answer with role awareness, prepared off the script thread
+            answer_msg = {"sender": "bot", "label": "Chatbox", "text": PENDING_ANSWER_TEXT, "pending": True}
+            try:
+                job = get_answer_pipeline().submit(
+                    st.session_state.session_id, ai_answer_stream, question, role
+                )
+                st.session_state.pending_answers[job.id] = answer_msg
+            except PipelineFull:
+                del answer_msg["pending"]
+                answer_msg["text"] = (
+                    "The assistant is busy with other staff questions right now. "
+                    "Please try again in a moment."
+                )
+            st.session_state.chat_history.append(answer_msg)
 
             # record into query DB as "new"
             log_query(question, status="new", note="")
 
+            # jump back to the newest messages
+            st.session_state.chat_offset = 0
+
             st.rerun()
 
         # Guided DB update (for the latest question)
         st.markdown("### Guided Database Update (latest question)", unsafe_allow_html=True)
-        if st.session_state.query_db:
-            last = st.session_state.query_db[-1]
+        last = query_log.get(st.session_state.last_query_id)
+        if last:
             st.markdown(
-                f"<div style='color:#F7FAFF;font-size:13px;'><strong>Last question (Q{last['id']}):</strong> {last['question']}</div>",
+                f"<div style='color:#F7FAFF;font-size:13px;'><strong>Last question (Q{last['id']}):</strong> {escape(last['question'])}</div>",
                 unsafe_allow_html=True,
             )
 
@@ -506,8 +882,8 @@ def screen_chat(embed: bool = False):
             with col_status:
                 new_status = st.selectbox(
                     "Mark this as:",
-                    ["new", "reviewed", "answered", "ignored"],
-                    index=["new", "reviewed", "answered", "ignored"].index(last["status"]),
+                    QUERY_STATUSES,
+                    index=QUERY_STATUSES.index(last["status"]),
                     key="guided_status",
                 )
 
@@ -528,104 +904,183 @@ def screen_chat(embed: bool = False):
         # Live Injury Update form (Team Physician only)
         st.markdown("### Live Injury Update (Team Physician only)", unsafe_allow_html=True)
         if role == "Team Physician":
-            players = st.session_state.players
-            labels = [f"#{p['number']} {p['name']} ({p['position']})" for p in players]
-            selected_label = st.selectbox(
-                "Select player to update",
-                labels,
-                index=0,
-            )
-            idx = labels.index(selected_label)
-            player = players[idx]
-
-            col_inj, col_status = st.columns(2)
-            with col_inj:
-                new_injury = st.text_input(
-                    "Injury description",
-                    value=player["injury"],
-                    key=f"inj_{idx}",
-                )
-            with col_status:
-                new_status_text = st.text_area(
-                    "Status / availability",
-                    value=player["status"],
-                    key=f"status_{idx}",
-                    height=80,
-                )
-
-            if st.button("Save Injury Update", key=f"save_{idx}"):
-                player["injury"] = new_injury
-                player["status"] = new_status_text
-                player["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-                st.session_state.players[idx] = player
-
-                # Let the chat know we updated
-                summary = (
-                    f"Updated injury report for **#{player['number']} {player['name']} ({player['position']})**:\n\n"
-                    f"- **Injury:** {player['injury']}\n"
-                    f"- **Status:** {player['status']}\n"
-                    f"_Last updated: {player['last_updated']}_"
-                )
-                st.session_state.chat_history.append(
-                    {"sender": "bot", "label": "Chatbox", "text": summary}
-                )
-
-                # log as a query-style event
-                log_query(
-                    f"Doctor updated injury for #{player['number']} {player['name']}.",
-                    status="answered",
-                    note="Live injury update performed in demo UI.",
+            mode = st.radio("Update mode", ["One player", "Bulk edit"], horizontal=True, key="update_mode")
+            if mode == "Bulk edit":
+                render_bulk_update()
+            else:
+                search = st.text_input(
+                    "Find player",
+                    key="player_search",
+                    placeholder="Number, name or position, e.g. '52', 'reed', 'WR'",
                 )
-
-                st.success("Injury updated. Ask for the injury report again to see the change.")
-                st.rerun()
+                players = {p["number"]: p for p in players_store.search(search, limit=PLAYER_PICKER_LIMIT)}
+                if not players:
+                    st.info(f"No players match “{search}”.")
+                else:
+                    number = st.selectbox(
+                        "Select player to update",
+                        list(players),
+                        index=0,
+                        format_func=lambda n: f"#{n} {players[n]['name']} ({players[n]['position']})",
+                    )
+                    player = players[number]
+
+                    col_inj, col_status = st.columns(2)
+                    with col_inj:
+                        new_injury = st.text_input(
+                            "Injury description",
+                            value=player["injury"],
+                            key=f"inj_{number}",
+                        )
+                    with col_status:
+                        new_status_text = st.text_area(
+                            "Status / availability",
+                            value=player["status"],
+                            key=f"status_{number}",
+                            height=80,
+                        )
+
+                    if st.button("Save Injury Update", key=f"save_{number}"):
+                        player = players_store.update(
+                            number, injury=new_injury, status=new_status_text
+                        )
+
+                        # Let the chat know we updated
+                        summary = (
+                            f"Updated injury report for **#{player['number']} {player['name']} ({player['position']})**:\n\n"
+                            f"- **Injury:** {player['injury']}\n"
+                            f"- **Status:** {player['status']}\n"
+                            f"_Last updated: {player['last_updated']}_"
+                        )
+                        st.session_state.chat_history.append(
+                            {"sender": "bot", "label": "Chatbox", "text": summary}
+                        )
+                        st.session_state.chat_offset = 0
+
+                        # and every other open session
+                        by = st.session_state.user["username"] or "Team Physician"
+                        get_change_feed().publish(
+                            "injury_update",
+                            f"{by} updated #{player['number']} {player['name']}.",
+                            origin=st.session_state.session_id,
+                            player=player,
+                            by=by,
+                        )
+
+                        # log as a query-style event
+                        log_query(
+                            f"Doctor updated injury for #{player['number']} {player['name']}.",
+                            status="answered",
+                            note="Live injury update performed in demo UI.",
+                        )
+
+                        st.success("Injury updated. Ask for the injury report again to see the change.")
+                        st.rerun()
         else:
             st.info(
                 "Live medical data updates are restricted. Log in as Team Physician to simulate changing injuries in real time."
             )
 
-        # Optional: full DB table for demo
-        with st.expander("View full query database (demo)", expanded=False):
-            if st.session_state.query_db:
-                df = pd.DataFrame(st.session_state.query_db)
-                st.dataframe(df, use_container_width=True)
-
-                json_data = json.dumps(st.session_state.query_db, indent=2)
-                st.download_button(
-                    "Download as JSON",
-                    data=json_data,
-                    file_name="query_db.json",
-                    mime="application/json",
-                )
-            else:
-                st.write("No entries yet.")
+        # Optional: full DB table for demo. The log holds every user's
+        # questions and internal notes, so only clinical roles and admins get it.
+        if policy_for(role).full or is_admin():
+            with st.expander("View full query database (demo)", expanded=False):
+                if len(query_log):
+                    # nothing here is built unless asked for: the table is behind a
+                    # checkbox and an export is only written when it is downloaded
+                    if st.checkbox("Show table", key="show_query_table"):
+                        st.dataframe(get_query_frame(query_log), use_container_width=True)
+
+                    filters = st.session_state.get("query_filters") or {}
+                    if any(filters.values()):
+                        st.caption("Exports include only the questions matching the Previous Questions filters.")
+
+                    col_format, col_download = st.columns([2, 1])
+                    with col_format:
+                        export_format = st.selectbox(
+                            "Export format",
+                            available_formats(),
+                            format_func=lambda f: EXPORT_FORMATS[f][0],
+                            key="export_format",
+                        )
+                    label, extension, mime, _ = EXPORT_FORMATS[export_format]
+                    with col_download:
+                        st.write("")
+                        # a callable is run on click, off the script thread: the
+                        # export streams into a temp file instead of session state
+                        st.download_button(
+                            f"Download as {label}",
+                            data=lambda fmt=export_format, f=dict(filters): export_file(query_log, fmt, **f),
+                            file_name=f"query_db.{extension}",
+                            mime=mime,
+                            on_click="ignore",
+                        )
+                else:
+                    st.write("No entries yet.")
+
+            with st.expander("Query analytics (FAQ mining)", expanded=False):
+                render_query_analytics()
+
+
+def render_query_analytics():
+    """Aggregates kept current as questions are logged; nothing here rescans the log."""
+    analytics = get_query_analytics()
+    if not analytics.total:
+        st.write("No questions logged yet.")
+        return
+
+    col_total, col_forms, col_open = st.columns(3)
+    col_total.metric("Questions", analytics.total)
+    col_forms.metric("Distinct questions", len(analytics.forms))
+    col_open.metric("Unanswered", f"{analytics.unanswered_rate:.0%}")
+
+    st.markdown("**Most asked**")
+    st.table([{"asked": q["count"], "question": q["example"]} for q in analytics.top_questions(10)])
+
+    clusters = analytics.clusters(8)
+    if clusters:
+        st.markdown("**Near-duplicate groups** (candidate FAQ entries)")
+        st.markdown(
+            "\n".join(
+                f"- **{c['label']}** ({c['size']} asked): "
+                + "; ".join(f"“{f['example']}”" for f in c["forms"][1:4])
+                + ("; …" if len(c["forms"]) > 4 else "")
+                for c in clusters
+            )
+        )
+
+    col_roles, col_hours = st.columns(2)
+    with col_roles:
+        st.markdown("**By role**")
+        st.table(
+            [
+                {"role": r["role"], "questions": r["questions"], "unanswered": f"{r['unanswered_rate']:.0%}"}
+                for r in analytics.roles()
+            ]
+        )
+    with col_hours:
+        st.markdown("**By hour of day**")
+        st.bar_chart({"questions": [h["questions"] for h in analytics.hours()]})
 
 
 # ---------- ROUTER ----------
-def main():
+def render_page():
     # Dark, high-contrast styling
-    st.markdown(
-        """
-        <style>
-          body {
-            background-color: #050814;
-            color:#F7FAFF;
-          }
-          .stApp {
-            background: radial-gradient(circle at top left,#151A30,#050814);
-          }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(page_assets()["style"], unsafe_allow_html=True)
 
     step = st.session_state.step
 
+    # every screen past the password needs a live session of the right stage
+    if step != "login" and auth.check(st.session_state.auth_token, "mfa" if step == "mfa" else "active") is None:
+        sign_out("Your session has expired. Please sign in again.")
+        step = "login"
+
     if step == "login":
         screen_login()
     elif step == "mfa":
         screen_mfa()
     elif step in ("dashboard", "chat_screen"):
+        load_chat()
         screen_dashboard()
     else:
         screen_login()
@@ -633,5 +1088,12 @@ def main():
     footer_bar()
 
 
+def main():
+    metrics.session_seen(st.session_state.session_id)
+    with metrics.timer("rerun"), metrics.profile_rerun():
+        render_page()
+    metrics.maybe_write_prometheus()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
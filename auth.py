@@ -0,0 +1,511 @@
+"""
+Authentication and sessions.
+
+Sign-in is two steps: password, then a TOTP code (RFC 6238). Each step issues
+a signed session token that the app keeps in st.session_state and checks on
+every rerun.
+
+- Users come from a pluggable user store. LocalUserStore reads a JSON file of
+  scrypt (or PBKDF2) password hashes, allowed roles and TOTP secrets; point
+  SENTINEL_USERS_PATH at it. Without one, DemoUserStore keeps the prototype's
+  behaviour: any password and any 6-digit code are accepted.
+- Password hashing is deliberately slow, so it runs on a small worker pool
+  with a bound on logins in flight: a login storm at shift change queues
+  there (or is turned away with AuthBusy) instead of stalling the script
+  threads of sessions that are already signed in.
+- Failed passwords and TOTP codes are limited per username with token
+  buckets (rate_limit.RateLimiter): every attempt spends a token and a
+  successful one gets it back, so only failures count. With the bucket
+  empty, attempts are refused with AuthLocked until it refills, which keeps
+  a 6-digit code far out of brute-force reach within its validity window.
+- Sessions live in a process-wide SessionStore with TTL eviction. Checking a
+  token on a rerun is a dict lookup plus an expiry comparison; the HMAC is
+  verified only the first time a token is seen.
+
+Manage the user file from the command line:
+
+    python auth.py add-user kkitching --role "Team Physician" --users users.json
+    python auth.py list-users --users users.json
+"""
+import base64
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import secrets
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import quote
+
+from rate_limit import RateLimiter
+
+SESSION_TTL = 8 * 3600  # a working shift
+MFA_TTL = 300  # time allowed between password and code
+LOGIN_TIMEOUT = 10.0
+
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2**14, 8, 1
+PBKDF2_ITERATIONS = 600_000
+
+TOTP_STEP = 30
+TOTP_DIGITS = 6
+TOTP_WINDOW = 1  # steps of clock drift accepted either way
+TOTP_ISSUER = "Washington Sentinels"
+
+# failed attempts per username: (refill per minute, burst)
+ATTEMPT_BUDGETS = {
+    "password": (5.0, 10),
+    "totp": (2.0, 5),
+}
+
+
+class AuthError(Exception):
+    """Sign-in or verification failed; the message is safe to show."""
+
+
+class AuthBusy(AuthError):
+    """Too many sign-ins are being processed right now."""
+
+
+class AuthLocked(AuthError):
+    """Too many failed attempts for this username; try again later."""
+
+
+# ---------- PASSWORD HASHING ----------
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password: str) -> str:
+    """Encoded hash: scrypt$n$r$p$salt$hash, or pbkdf2_sha256$iterations$salt$hash without scrypt."""
+    salt = os.urandom(16)
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(
+            password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, maxmem=64 * 1024 * 1024, dklen=32
+        )
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, *params = encoded.split("$")
+        if scheme == "scrypt":
+            n, r, p, salt, expected = params
+            digest = hashlib.scrypt(
+                password.encode(), salt=base64.b64decode(salt), n=int(n), r=int(r), p=int(p),
+                maxmem=64 * 1024 * 1024, dklen=32,
+            )
+        elif scheme == "pbkdf2_sha256":
+            iterations, salt, expected = params
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+        else:
+            return False
+        return hmac.compare_digest(digest, base64.b64decode(expected))
+    except (ValueError, TypeError):
+        return False
+
+
+# burned on unknown usernames so they take as long as wrong passwords
+_DUMMY_HASH = None
+
+
+def _dummy_hash() -> str:
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+# ---------- TOTP (RFC 6238) ----------
+def new_totp_secret() -> str:
+    return base64.b32encode(os.urandom(20)).decode("ascii").rstrip("=")
+
+
+def _hotp(key: bytes, counter: int, digits: int = TOTP_DIGITS) -> str:
+    mac = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = mac[-1] & 0x0F
+    code = struct.unpack(">I", mac[offset : offset + 4])[0] & 0x7FFFFFFF
+    return str(code % 10**digits).zfill(digits)
+
+
+def _totp_key(secret: str) -> bytes:
+    secret = secret.upper().replace(" ", "")
+    return base64.b32decode(secret + "=" * (-len(secret) % 8))
+
+
+def totp(secret: str, at: float | None = None) -> str:
+    """The current code for a base32 secret."""
+    return _hotp(_totp_key(secret), int((time.time() if at is None else at) // TOTP_STEP))
+
+
+def verify_totp(secret: str, code: str, at: float | None = None, after: int = -1) -> int | None:
+    """
+    The time step the code belongs to, or None. Only steps later than `after`
+    are accepted, so a code cannot be replayed once used.
+    """
+    if not (code.isdigit() and len(code) == TOTP_DIGITS):
+        return None
+    key = _totp_key(secret)
+    now = int((time.time() if at is None else at) // TOTP_STEP)
+    for counter in range(now - TOTP_WINDOW, now + TOTP_WINDOW + 1):
+        if counter > after and hmac.compare_digest(_hotp(key, counter), code):
+            return counter
+    return None
+
+
+def provisioning_uri(secret: str, username: str) -> str:
+    """otpauth:// URI for authenticator apps (usually shown as a QR code)."""
+    return (
+        f"otpauth://totp/{quote(TOTP_ISSUER)}:{quote(username)}"
+        f"?secret={secret}&issuer={quote(TOTP_ISSUER)}&digits={TOTP_DIGITS}&period={TOTP_STEP}"
+    )
+
+
+# ---------- USER STORES ----------
+class DemoUserStore:
+    """The prototype's behaviour: every username, password, role and 6-digit code is accepted."""
+
+    demo = True
+
+    def get(self, username: str) -> dict | None:
+        return {"password": None, "roles": None, "totp": None}
+
+
+class LocalUserStore:
+    """
+    Users in a JSON file: {username: {"password": <encoded hash>, "roles":
+    [...], "totp": <base32 secret>}}. The file is re-read when it changes on
+    disk and written atomically.
+    """
+
+    demo = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._users = {}
+        self._mtime = None
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            self._users, self._mtime = {}, None
+            return
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as f:
+                self._users = json.load(f)
+            self._mtime = mtime
+
+    def get(self, username: str) -> dict | None:
+        with self._lock:
+            self._load()
+            return self._users.get(username)
+
+    def usernames(self) -> list[str]:
+        with self._lock:
+            self._load()
+            return sorted(self._users)
+
+    def add(self, username: str, password: str, roles, totp_secret: str | None = None) -> str:
+        """Create or replace a user and return their TOTP secret."""
+        record = {"password": hash_password(password), "roles": list(roles), "totp": totp_secret or new_totp_secret()}
+        with self._lock:
+            self._load()
+            users = dict(self._users)
+            users[username] = record
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(users, f, indent=2)
+            os.replace(tmp, self.path)
+            self._users, self._mtime = users, os.path.getmtime(self.path)
+        return record["totp"]
+
+
+# ---------- SESSIONS ----------
+class Session:
+    __slots__ = ("id", "username", "role", "stage", "expires", "token")
+
+    def __init__(self, session_id: str, username: str, role: str, stage: str, expires: float):
+        self.id = session_id
+        self.username = username
+        self.role = role
+        self.stage = stage  # "mfa" (password checked) or "active"
+        self.expires = expires
+        self.token = None
+
+
+class SessionStore:
+    """Sessions by id, expired lazily in deadline order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._deadlines = []  # heap of (expires, session id); stale entries are skipped
+        self.on_evict = None  # fn(session), called under the lock
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def put(self, session: Session):
+        with self._lock:
+            self._sessions[session.id] = session
+            heapq.heappush(self._deadlines, (session.expires, session.id))
+            self._sweep_locked(time.time())
+
+    def get(self, session_id: str) -> Session | None:
+        session = self._sessions.get(session_id)
+        if session is None or session.expires <= time.time():
+            return None
+        return session
+
+    def remove(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None and self.on_evict:
+                self.on_evict(session)
+
+    def sweep(self):
+        with self._lock:
+            self._sweep_locked(time.time())
+
+    def _sweep_locked(self, now: float):
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, session_id = heapq.heappop(deadlines)
+            session = self._sessions.get(session_id)
+            # the session may have been renewed (a later deadline is queued too)
+            if session is not None and session.expires <= now:
+                del self._sessions[session_id]
+                if self.on_evict:
+                    self.on_evict(session)
+
+
+# ---------- SERVICE ----------
+class AuthService:
+    def __init__(
+        self,
+        users,
+        secret: bytes | None = None,
+        workers: int = 2,
+        max_pending: int = 32,
+        attempts: RateLimiter | None = None,
+    ):
+        self.users = users
+        self.attempts = attempts or RateLimiter(ATTEMPT_BUDGETS)  # failed passwords / codes per username
+        self._secret = secret or secrets.token_bytes(32)
+        self._hasher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth-hash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.sessions = SessionStore()
+        self.sessions.on_evict = self._forget_token
+        self._verified = {}  # token -> Session, filled on first successful check
+        self._last_totp = {}  # username -> last accepted time step (replay guard)
+        self._lock = threading.Lock()
+        self.stats = {
+            "logins": 0, "login_failures": 0, "mfa_failures": 0, "locked_out": 0, "busy": 0,
+            "cache_hits": 0, "cache_misses": 0,
+        }
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _attempt(self, username: str, kind: str):
+        """Spend one of the username's attempts of this kind, or refuse with AuthLocked."""
+        wait = self.attempts.acquire(username, kind)
+        if wait:
+            self._count("locked_out")
+            raise AuthLocked(f"Too many failed attempts. Please try again in {int(wait) + 1} seconds.")
+
+    # ----- tokens -----
+    def _sign(self, session: Session) -> str:
+        body = f"{session.id}.{int(session.expires)}"
+        sig = hmac.new(self._secret, body.encode(), hashlib.sha256).digest()
+        token = f"{body}.{base64.urlsafe_b64encode(sig).decode('ascii').rstrip('=')}"
+        self._forget_token(session)
+        session.token = token
+        return token
+
+    def _forget_token(self, session: Session):
+        if session.token is not None:
+            self._verified.pop(session.token, None)
+
+    def _unsign(self, token: str) -> str | None:
+        try:
+            session_id, expires, sig = token.split(".")
+            expected = hmac.new(self._secret, f"{session_id}.{expires}".encode(), hashlib.sha256).digest()
+            given = base64.urlsafe_b64decode(sig + "=" * (-len(sig) % 4))
+        except (ValueError, AttributeError):
+            return None
+        if not hmac.compare_digest(expected, given) or int(expires) <= time.time():
+            return None
+        return session_id
+
+    # ----- sign-in -----
+    def login(self, username: str, password: str, role: str) -> str:
+        """Check the password (on the hashing pool) and return a token for the MFA step."""
+        if not username or not password:
+            raise AuthError("Please enter both username and password.")
+        if not self._slots.acquire(blocking=False):
+            self._count("busy")
+            raise AuthBusy("Sign-in is busy right now. Please try again in a few seconds.")
+        try:
+            self._attempt(username, "password")
+            user = self.users.get(username)
+            if not self.users.demo:
+                encoded = user["password"] if user else _dummy_hash()
+                try:
+                    ok = self._hasher.submit(verify_password, password, encoded).result(timeout=LOGIN_TIMEOUT)
+                except FutureTimeout:
+                    self._count("busy")
+                    self.attempts.refund(username, "password")  # not the user's failure
+                    raise AuthBusy("Sign-in is busy right now. Please try again in a few seconds.") from None
+                if not ok or user is None:
+                    self._count("login_failures")
+                    raise AuthError("Invalid username or password.")
+                if user.get("roles") and role not in user["roles"]:
+                    self._count("login_failures")
+                    raise AuthError(f"{username} is not allowed to sign in as {role}.")
+            self.attempts.refund(username, "password")
+        finally:
+            self._slots.release()
+
+        session = Session(secrets.token_urlsafe(16), username, role, "mfa", time.time() + MFA_TTL)
+        token = self._sign(session)
+        self.sessions.put(session)
+        return token
+
+    def verify_mfa(self, token: str, code: str) -> str:
+        """Check the TOTP code for a password-checked session and return its active token."""
+        session = self.check(token, stage="mfa")
+        if session is None:
+            raise AuthError("Your sign-in expired. Please start again.")
+        code = (code or "").strip()
+        self._attempt(session.username, "totp")
+        if self.users.demo:
+            ok = code.isdigit() and len(code) == TOTP_DIGITS
+        else:
+            secret = (self.users.get(session.username) or {}).get("totp")
+            counter = None
+            if secret:
+                with self._lock:
+                    counter = verify_totp(secret, code, after=self._last_totp.get(session.username, -1))
+                    if counter is not None:
+                        self._last_totp[session.username] = counter
+            ok = counter is not None
+        if not ok:
+            self._count("mfa_failures")
+            raise AuthError("That code is not valid. Enter the current 6-digit code from your authenticator app.")
+        self.attempts.refund(session.username, "totp")
+
+        session.stage = "active"
+        session.expires = time.time() + SESSION_TTL
+        token = self._sign(session)
+        self.sessions.put(session)
+        self._count("logins")
+        return token
+
+    # ----- per rerun -----
+    def check(self, token: str | None, stage: str = "active") -> Session | None:
+        """The live session a token belongs to, or None. O(1) once the token has been seen."""
+        if not token:
+            return None
+        session = self._verified.get(token)
+        if session is not None:
+            self._count_hit()
+        else:
+            self._count("cache_misses")
+            session_id = self._unsign(token)
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None or session.token != token:
+                return None
+            self._verified[token] = session
+        if session.expires <= time.time() or session.stage != stage:
+            return None
+        return session
+
+    def _count_hit(self):
+        # plain increment: a lost update on a statistic is not worth a lock on every rerun
+        self.stats["cache_hits"] += 1
+
+    def logout(self, token: str | None):
+        session = self._verified.get(token) if token else None
+        if session is None and token:
+            session_id = self._unsign(token)
+            session = self.sessions.get(session_id) if session_id else None
+        if session is not None:
+            self.sessions.remove(session.id)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_auth_service() -> AuthService:
+    """
+    The process-wide service. SENTINEL_USERS_PATH selects a LocalUserStore
+    (otherwise demo sign-in), and SENTINEL_AUTH_SECRET keeps tokens valid
+    across several server processes.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                path = os.environ.get("SENTINEL_USERS_PATH")
+                secret = os.environ.get("SENTINEL_AUTH_SECRET")
+                _service = AuthService(
+                    LocalUserStore(path) if path else DemoUserStore(),
+                    secret=secret.encode() if secret else None,
+                )
+    return _service
+
+
+def set_auth_service(service: AuthService) -> AuthService:
+    """Swap the process-wide service (benchmarks)."""
+    global _service
+    with _service_lock:
+        _service = service
+    return service
+
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    # CLI-only imports, kept off the sign-in screen's cold start
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(description="Manage the Sentinel user file.")
+    parser.add_argument("command", choices=["add-user", "list-users"])
+    parser.add_argument("username", nargs="?")
+    parser.add_argument("--role", action="append", default=[], help="role the user may sign in as (repeatable)")
+    parser.add_argument("--users", default=os.environ.get("SENTINEL_USERS_PATH"), help="user file (default: $SENTINEL_USERS_PATH)")
+    args = parser.parse_args(argv)
+    if not args.users:
+        parser.error("no user file: pass --users or set SENTINEL_USERS_PATH")
+
+    store = LocalUserStore(args.users)
+    if args.command == "list-users":
+        for name in store.usernames():
+            print(f"{name}: {', '.join(store.get(name).get('roles') or ['any role'])}")
+        return 0
+
+    if not args.username:
+        parser.error("add-user needs a username")
+    password = getpass.getpass(f"Password for {args.username}: ")
+    if not password or password != getpass.getpass("Repeat password: "):
+        print("Passwords are empty or do not match.", file=sys.stderr)
+        return 1
+    secret = store.add(args.username, password, args.role)
+    print(f"TOTP secret for {args.username}: {secret}")
+    print(provisioning_uri(secret, args.username))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,864 @@
+"""
+Benchmarks for the Sentinel chatbot.
+
+Run from the repo root, e.g.:
+
+    python benchmark.py micro                      # ai_answer / report / log_query at 12, 500, 10k players
+    python benchmark.py flow --users 50            # login -> MFA -> chat for N simulated staff (needs streamlit)
+    python benchmark.py router
+    python benchmark.py auth --users 40            # password + TOTP sign-ins per second, token checks
+    python benchmark.py shared --workers 4         # N worker processes on SQLite / Redis stand-in state
+    python benchmark.py startup                    # cold imports (-X importtime) and login first paint
+    python benchmark.py ratelimit --users 20       # fair service with one abusive client, limiter off / on
+    SENTINEL_MODEL=gpt2 python benchmark.py generation
+    python benchmark.py all --json bench.json      # every suite, machine-readable
+    python benchmark.py compare old.json new.json  # % change of every number between two runs
+
+Every JSON file carries the git commit and Python version it was produced
+with, so results from different commits can be compared directly.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from intent_router import IntentRouter
+
+SAMPLE_QUESTIONS = [
+    "List all injuries",
+    "Show the Sentinels injury report",
+    "hi there",
+    "what can you do?",
+    "how is #17 doing this week?",
+    "any WR injuries before Sunday?",
+    "who is limited in contact drills",
+    "is this ship ready for the game or should we wait on the final practice report from the medical staff",
+]
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+ROSTER_SIZES = (12, 500, 10_000)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    return {
+        "count": len(seconds),
+        "p50_ms": percentile(seconds, 50) * 1e3,
+        "p95_ms": percentile(seconds, 95) * 1e3,
+        "p99_ms": percentile(seconds, 99) * 1e3,
+    }
+
+
+def time_per_call(fn, args_list, repeat: int) -> float:
+    """Best-of-3 mean seconds per call over args_list * repeat calls."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for args in args_list:
+                fn(*args)
+        elapsed = (time.perf_counter() - start) / (repeat * len(args_list))
+        best = min(best, elapsed)
+    return best
+
+
+# ---------- INTENT ROUTER ----------
+def build_router(intent_count: int, seed: int = 7) -> IntentRouter:
+    """The real chatbot intents plus synthetic ones with 3 phrases each."""
+    from chatbot import router as real_router
+
+    rng = random.Random(seed)
+    router = IntentRouter()
+    for intent in real_router.intents():
+        router.register(intent.name, [" ".join(p) for p in intent.phrases], intent.priority)
+    for i in range(max(intent_count - len(router), 0)):
+        phrases = []
+        for _ in range(3):
+            words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))]
+            if rng.random() < 0.3:
+                words.append("".join(rng.choices(string.ascii_lowercase, k=5)))
+            phrases.append(" ".join(words))
+        router.register(f"synthetic_{i}", phrases, priority=rng.randint(0, 40))
+    router.compile()
+    return router
+
+
+def bench_router(intent_counts=(4, 50, 100, 250, 500, 1000), repeat: int = 500) -> dict:
+    results = {}
+    args_list = [(q,) for q in SAMPLE_QUESTIONS]
+    for count in intent_counts:
+        router = build_router(count)
+        results[str(count)] = {
+            "intents": len(router),
+            "us_per_query": time_per_call(router.route, args_list, repeat) * 1e6,
+        }
+    return results
+
+# ---------- MICROBENCHMARKS ----------
+FIRST_NAMES = ["Marcus", "Devin", "Tyler", "Jalen", "Cameron", "Malik", "Isaiah", "Andre", "Logan", "Jordan", "Eli", "Nate"]
+LAST_NAMES = ["Reed", "Cole", "Brooks", "Ortiz", "Price", "Harris", "Grant", "Walker", "Hayes", "Fox", "Summers", "Dawson"]
+
+
+def synthetic_roster(size: int, seed: int = 11) -> list[dict]:
+    """The demo roster, padded out with generated players built from its injuries and statuses."""
+    from player_store import SENTINEL_PLAYERS
+
+    rng = random.Random(seed)
+    roster = [dict(p) for p in SENTINEL_PLAYERS[:size]]
+    used = {p["number"] for p in roster}
+    number = 100
+    while len(roster) < size:
+        while number in used:
+            number += 1
+        template = rng.choice(SENTINEL_PLAYERS)
+        roster.append(
+            {
+                "number": number,
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{len(roster)}",
+                "position": template["position"],
+                "injury": template["injury"],
+                "status": template["status"],
+            }
+        )
+        used.add(number)
+    return roster
+
+
+def bench_micro(sizes=ROSTER_SIZES, role: str = "Head Coach") -> dict:
+    """
+    Per-call cost of the hot helpers at several roster sizes. ai_answer is
+    measured with the answer cache emptied before every call (the *_us
+    columns) and answered from it (*_cached_us); report calls both warm and
+    right after a physician edit.
+    """
+    from answer_cache import get_answer_cache
+    from chatbot import ai_answer
+    from injury_report import format_injury_report
+    from player_store import PlayerStore, get_store, set_store
+    from query_log import QueryLog, get_query_log, set_query_log
+
+    original_store, original_log = get_store(), get_query_log()
+    results = {}
+    for size in sizes:
+        store = set_store(PlayerStore(synthetic_roster(size)))
+        log = set_query_log(QueryLog())
+        repeat = max(1, 2000 // size)
+        edit_numbers = [p["number"] for p in store.all()[:: max(1, size // 50)]]
+
+        cache = get_answer_cache()
+
+        def uncached(text, role):
+            cache.clear()
+            return ai_answer(text, role)
+
+        ai_answer("warm up", role)
+        row = {}
+        for name, questions in (
+            ("report", [("List all injuries", role)]),
+            ("targeted", [("how is #17?", role), ("any WR injuries?", role)]),
+            ("smalltalk", [("hi there", role), ("what can you do?", role)]),
+        ):
+            row[f"ai_answer_{name}_us"] = time_per_call(uncached, questions, repeat) * 1e6
+            row[f"ai_answer_{name}_cached_us"] = time_per_call(ai_answer, questions, repeat) * 1e6
+        row["format_injury_report_warm_us"] = time_per_call(format_injury_report, [()], repeat * 10) * 1e6
+
+        def edit_then_report(number):
+            store.update(number, status="Limited practice – benchmark edit")
+            format_injury_report()
+
+        row["format_injury_report_after_edit_us"] = (
+            time_per_call(edit_then_report, [(n,) for n in edit_numbers], 1) * 1e6
+        )
+        row["log_query_us"] = (
+            time_per_call(lambda q: log.log("bench", role, q), [(q,) for q in SAMPLE_QUESTIONS], 50) * 1e6
+        )
+        results[str(size)] = row
+
+    # later suites should see the real roster and log again
+    set_store(original_store)
+    set_query_log(original_log)
+    return results
+
+
+# ---------- END-TO-END FLOW ----------
+FLOW_QUESTIONS = [
+    "List all injuries",
+    "Show the injury report",
+    "hi",
+    "what can you do?",
+    "how is #17?",
+    "any WR injuries?",
+    "who is limited in contact drills?",
+]
+
+
+def simulate_user(user_no: int, questions: int, physician_edits: int, timings: list, lock: threading.Lock) -> int:
+    """
+    Drive one AppTest session through login -> MFA -> dashboard -> chat and
+    return how many script runs it took. Every run's wall time goes to timings.
+
+    A click that changes the step (Sign In, Verify) only records it; the next
+    screen is painted by the following run, so that run is made explicitly, and
+    every widget is looked up by label before it is used.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    role = "Team Physician" if physician_edits else ["Head Coach", "Athletic Trainer", "Front Office"][user_no % 3]
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    runs = 0
+
+    def run(action=None):
+        nonlocal runs
+        start = time.perf_counter()
+        (action or at).run()
+        elapsed = time.perf_counter() - start
+        runs += 1
+        with lock:
+            timings.append(elapsed)
+        if at.exception:
+            raise RuntimeError(f"app raised on the {at.session_state.step} screen: {at.exception[0].value}")
+
+    def widget(elements, label: str):
+        found = [w for w in elements if w.label == label]
+        if not found:
+            raise RuntimeError(f"no {label!r} on the {at.session_state.step} screen (user {user_no})")
+        return found[0]
+
+    run()
+    widget(at.text_input, "Username").input(f"staff{user_no}")
+    widget(at.selectbox, "Role for this session").select(role)
+    widget(at.text_input, "Password").input("demo-password")
+    run(widget(at.button, "Sign In").click())
+    run()  # paints the MFA screen
+
+    widget(at.text_input, "Verification code").input("123456")
+    run(widget(at.button, "Verify & Continue").click())
+    run()  # paints the dashboard
+    run(widget(at.button, "Open Chat").click())
+
+    for i in range(questions):
+        at.text_input(key="chat_input").input(FLOW_QUESTIONS[(user_no + i) % len(FLOW_QUESTIONS)])
+        run(widget(at.button, "Send").click())
+
+    for i in range(physician_edits):
+        widget(at.text_area, "Status / availability").input(f"Limited practice – flow edit {user_no}.{i}")
+        run(widget(at.button, "Save Injury Update").click())
+    return runs
+
+
+def flow_worker(user_nos: list[int], questions: int, physicians: int) -> dict:
+    """One process driving its share of the sessions, one after another."""
+    timings, lock = [], threading.Lock()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    runs = sum(simulate_user(n, questions, 2 if n < physicians else 0, timings, lock) for n in user_nos)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"runs": runs, "timings": timings, "retained": after - before, "peak": peak}
+
+
+def bench_flow(users: int = 20, concurrency: int = 4, questions: int = 5, physician_share: float = 0.2) -> dict:
+    """
+    `users` staff sessions, `concurrency` at a time. AppTest is not safe to
+    drive from several threads (the sessions' script runs share Streamlit's
+    runtime state), so concurrent sessions run in separate processes, each
+    standing in for one app worker with its own store and log.
+    """
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        return {"skipped": "streamlit is not installed"}
+
+    physicians = max(1, int(users * physician_share))
+    shares = [list(range(users))[n::concurrency] for n in range(concurrency)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context("spawn")) as pool:
+        reports = list(pool.map(flow_worker, shares, [questions] * concurrency, [physicians] * concurrency))
+    wall = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "concurrency": concurrency,
+        "reruns": sum(r["runs"] for r in reports),
+        "reruns_per_s": sum(r["runs"] for r in reports) / wall,
+        "rerun_latency": latency_summary([t for r in reports for t in r["timings"]]),
+        "retained_kb_per_session": sum(r["retained"] for r in reports) / users / 1024,
+        "peak_mb": max(r["peak"] for r in reports) / 1024 / 1024,
+    }
+
+
+# ---------- AUTH ----------
+def bench_auth(users: int = 20, concurrency_levels=(1, 4, 16), checks: int = 100_000) -> dict:
+    """
+    Full sign-ins (scrypt password check on the hashing pool + TOTP) per
+    second at several concurrency levels, and the per-rerun token check.
+    """
+    from auth import AuthService, LocalUserStore, totp
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalUserStore(os.path.join(tmp, "users.json"))
+        start = time.perf_counter()
+        secrets_by_user = {f"staff{i}": store.add(f"staff{i}", f"pw-{i}", ["Head Coach"]) for i in range(users)}
+        results["hash_ms"] = (time.perf_counter() - start) / users * 1e3
+
+        for concurrency in concurrency_levels:
+            service = AuthService(store)
+            timings, lock = [], threading.Lock()
+
+            def sign_in(username):
+                started = time.perf_counter()
+                token = service.login(username, f"pw-{username[5:]}", "Head Coach")
+                token = service.verify_mfa(token, totp(secrets_by_user[username]))
+                with lock:
+                    timings.append(time.perf_counter() - started)
+                return token
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                tokens = list(pool.map(sign_in, secrets_by_user))
+            wall = time.perf_counter() - start
+            lat = latency_summary(timings)
+            results[f"c{concurrency}"] = {
+                "logins_per_s": users / wall,
+                "p50_ms": lat["p50_ms"],
+                "p95_ms": lat["p95_ms"],
+                "busy": service.stats["busy"],
+            }
+
+        token = tokens[0]
+        start = time.perf_counter()
+        for _ in range(checks):
+            service.check(token)
+        results["check_us"] = (time.perf_counter() - start) / checks * 1e6
+    return results
+
+
+# ---------- SHARED STATE ----------
+def shared_worker(spec: str, worker_no: int, ops: int, barrier, results):
+    """
+    One app worker: logs `ops` questions and updates a player every tenth,
+    against the shared state named by `spec`, then reports what it ended up seeing.
+    """
+    from player_store import PlayerStore
+    from query_log import QueryLog, SharedBackend
+    from shared_state import open_state
+
+    state = open_state(spec)
+    store = PlayerStore(shared=state)
+    log = QueryLog(SharedBackend(state))
+    numbers = store.numbers()
+    rng = random.Random(worker_no)
+
+    barrier.wait()
+    ids = []
+    start = time.perf_counter()
+    for i in range(ops):
+        ids.append(log.log(f"worker{worker_no}", "Head Coach", f"question {i} from worker {worker_no}"))
+        if i % 10 == 0:
+            store.update(rng.choice(numbers), status=f"Limited (worker {worker_no}, step {i})")
+    elapsed = time.perf_counter() - start
+    barrier.wait()  # every worker has finished writing
+
+    store.sync()
+    log.sync()
+    results.put(
+        {
+            "worker": worker_no,
+            "ids": ids,
+            "elapsed": elapsed,
+            "roster": [(p["number"], p["status"]) for p in store.all()],
+            "log_ids": sorted(e["id"] for e in log.entries()),
+        }
+    )
+
+
+def bench_shared(workers: int = 4, ops: int = 200, backends=("sqlite", "redis")) -> dict:
+    """
+    Spawn `workers` processes sharing state through each backend and check
+    that they agree: unique, per-worker increasing query ids, the same query
+    log and the same roster everywhere. Reports combined write throughput.
+    """
+    from shared_state import StandInServer
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            server = None
+            if backend == "sqlite":
+                spec = f"sqlite:///{os.path.join(tmp, 'state.db')}"
+            else:
+                server = StandInServer()
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                spec = f"redis://127.0.0.1:{server.port}"
+
+            barrier, queue = ctx.Barrier(workers), ctx.Queue()
+            procs = [ctx.Process(target=shared_worker, args=(spec, n, ops, barrier, queue)) for n in range(workers)]
+            for proc in procs:
+                proc.start()
+            reports = [queue.get(timeout=300) for _ in procs]
+            for proc in procs:
+                proc.join()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        all_ids = [q_id for r in reports for q_id in r["ids"]]
+        writes = len(all_ids) + sum(len(range(0, ops, 10)) for _ in reports)
+        results[backend] = {
+            "workers": workers,
+            "writes_per_s": writes / max(r["elapsed"] for r in reports),
+            "ids_unique": len(set(all_ids)) == len(all_ids),
+            "ids_increasing": all(r["ids"] == sorted(r["ids"]) for r in reports),
+            "same_log": all(r["log_ids"] == sorted(all_ids) for r in reports),
+            "same_roster": all(r["roster"] == reports[0]["roster"] for r in reports),
+        }
+    return results
+
+
+# ---------- COLD START ----------
+# what a fresh process imports before it can paint each screen (app.py)
+STARTUP_PATHS = {
+    "login": "import metrics, auth",
+    "chat": (
+        "import metrics, auth, answer_cache, answer_pipeline, change_feed, chat_history, chatbot, "
+        "injury_report, player_store, query_analytics, query_export, query_log, roster_loader"
+    ),
+    "chat_ready": (
+        "import chatbot, chat_history, query_analytics, query_export, roster_loader\n"
+        "from player_store import get_store\nfrom query_log import get_query_log\n"
+        "get_store(); get_query_log()"
+    ),
+}
+
+FIRST_PAINT = """
+import sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+loaded = time.perf_counter()
+at.run()
+print(loaded - start, time.perf_counter() - loaded)
+"""
+
+
+def run_cold(code: str, *args: str, importtime: bool = False) -> tuple[float, str, str]:
+    """Run `code` in a fresh interpreter from an empty directory; (wall seconds, stdout, stderr)."""
+    repo = os.path.dirname(APP_PATH)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo, os.environ.get("PYTHONPATH")])))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code, *args]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        done = subprocess.run(command, cwd=tmp, env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, done.stdout, done.stderr
+
+
+def parse_importtime(stderr: str) -> tuple[float, list[tuple[str, float]]]:
+    """(total import seconds, [(module, self seconds)] slowest first) from -X importtime output."""
+    total, modules = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not name[1:].startswith(" "):  # top level: its cumulative time covers its children
+            total += int(cumulative_us)
+        modules.append((name.strip(), int(self_us) / 1e6))
+    modules.sort(key=lambda m: -m[1])
+    return total / 1e6, modules
+
+
+def bench_startup(repeat: int = 5, top: int = 5) -> dict:
+    """
+    Cold start per screen: interpreter start plus the imports that screen
+    needs, each in a fresh process, and the slowest modules by -X importtime.
+    With streamlit installed, also the first paint of the login screen.
+    """
+    baseline = statistics.median(run_cold("pass")[0] for _ in range(repeat))
+    results = {"interpreter_ms": baseline * 1e3}
+    for path, code in STARTUP_PATHS.items():
+        # wall times without -X importtime, whose bookkeeping would inflate them
+        walls = [run_cold(code)[0] for _ in range(repeat)]
+        traced = [parse_importtime(run_cold(code, importtime=True)[2]) for _ in range(repeat)]
+        imports = [total for total, _ in traced]
+        slowest = traced[-1][1]
+        results[path] = {
+            "wall_ms": statistics.median(walls) * 1e3,
+            "import_ms": statistics.median(imports) * 1e3,
+            "over_interpreter_ms": (statistics.median(walls) - baseline) * 1e3,
+            "slowest": {name: seconds * 1e3 for name, seconds in slowest[:top]},
+        }
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        results["first_paint"] = {"skipped": "streamlit is not installed"}
+        return results
+    loads, paints = [], []
+    for _ in range(repeat):
+        _, stdout, _ = run_cold(FIRST_PAINT, APP_PATH)
+        load, paint = map(float, stdout.split())
+        loads.append(load)
+        paints.append(paint)
+    results["first_paint"] = {
+        "streamlit_import_ms": statistics.median(loads) * 1e3,
+        "login_paint_ms": statistics.median(paints) * 1e3,
+    }
+    return results
+
+
+# ---------- RATE LIMITING ----------
+def jain_index(values: list[float]) -> float:
+    """Jain's fairness index: 1.0 when every client got the same, 1/n when one got everything."""
+    total = sum(values)
+    return total * total / (len(values) * sum(v * v for v in values)) if total else 1.0
+
+
+def bench_ratelimit(
+    users: int = 20,
+    abusers: int = 4,
+    seconds: float = 3.0,
+    interval: float = 0.5,
+    work: float = 0.01,
+    checks: int = 100_000,
+) -> dict:
+    """
+    `users` staff each send a question every `interval` seconds and wait for
+    the answer, while one abusive client sends from `abusers` threads as fast
+    as it can without waiting, all into a small
+    answer pool (every answer takes `work` seconds). Run with no limit and with
+    the per-user token buckets; reports what the staff got served.
+    """
+    from answer_pipeline import AnswerPipeline, PipelineFull
+    from rate_limit import RateLimiter
+
+    def answer():
+        time.sleep(work)
+        return "ok"
+
+    def scenario(limiter) -> dict:
+        pipeline = AnswerPipeline(workers=4, max_pending=16)
+        lock = threading.Lock()
+        served, throttled, busy = Counter(), Counter(), Counter()
+        latencies = []
+        stop = time.monotonic() + seconds
+
+        def done(client: str, job):
+            with lock:
+                served[client] += 1
+                if client != "abuser":
+                    latencies.append(time.monotonic() - job.submitted_at)
+
+        def send(client: str, role: str, wait: bool = True) -> bool:
+            if limiter is not None and limiter.acquire(client, role):
+                with lock:
+                    throttled[client] += 1
+                return False
+            try:
+                job = pipeline.submit(client, answer)
+            except PipelineFull:
+                with lock:
+                    busy[client] += 1
+                return False
+            if wait:
+                job.future.result()
+                done(client, job)
+            else:
+                job.future.add_done_callback(lambda _, job=job: done(client, job))
+            return True
+
+        def staff(n: int):
+            role = "Team Physician" if n % 5 == 0 else "Head Coach"
+            time.sleep(random.random() * interval)  # spread the staff out
+            while time.monotonic() < stop:
+                start = time.monotonic()
+                send(f"staff{n}", role)
+                time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+        def abuser():
+            while time.monotonic() < stop:
+                # fires and forgets, like a script resubmitting the form
+                if not send("abuser", "Head Coach", wait=False):
+                    time.sleep(0.0005)
+
+        threads = [threading.Thread(target=staff, args=(n,)) for n in range(users)]
+        threads += [threading.Thread(target=abuser) for _ in range(abusers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        while pipeline.pending_count():  # the abuser's last answers
+            time.sleep(work)
+
+        staff_served = [served[f"staff{n}"] for n in range(users)]
+        staff_sent = sum(staff_served) + sum(busy[f"staff{n}"] + throttled[f"staff{n}"] for n in range(users))
+        return {
+            "staff_served_pct": 100.0 * sum(staff_served) / max(staff_sent, 1),
+            "staff_busy": sum(busy[f"staff{n}"] for n in range(users)),
+            "staff_throttled": sum(throttled[f"staff{n}"] for n in range(users)),
+            "staff_p95_ms": percentile(latencies, 95) * 1e3,
+            "abuser_served": served["abuser"],
+            "abuser_throttled": throttled["abuser"],
+            "abuser_share_pct": 100.0 * served["abuser"] / max(sum(served.values()), 1),
+            "fairness": jain_index(staff_served + [served["abuser"]]),
+        }
+
+    # budgets sized for the test: staff send at 2/s and stay inside theirs
+    budgets = {"Team Physician": (240.0, 10), "*": (150.0, 5)}
+    results = {"unlimited": scenario(None), "limited": scenario(RateLimiter(budgets))}
+
+    limiter = RateLimiter(budgets)
+    limiter.acquire("bench", "Head Coach", cost=10)  # empty, so every check below is a rejection
+    start = time.perf_counter()
+    for _ in range(checks):
+        limiter.acquire("bench", "Head Coach", cost=10)
+    results["rejection_us"] = (time.perf_counter() - start) / checks * 1e6
+    return results
+
+
+# ---------- LOCAL MODEL ----------
+def bench_generation(client_counts=(1, 4, 8), requests_per_client: int = 4, max_new_tokens: int = 32) -> dict:
+    """
+    Time-to-first-token and throughput with N concurrent clients, each sending
+    its requests back to back, all sharing the process-wide micro-batcher.
+    """
+    from generation import build_prompt, generation_available, get_generator
+    from injury_report import format_injury_report
+
+    if not generation_available():
+        return {"skipped": "set SENTINEL_MODEL and install torch + transformers to run this suite"}
+
+    load_start = time.perf_counter()
+    generator = get_generator()
+    results = {"load_seconds": time.perf_counter() - load_start}
+    prompt = build_prompt("Who is limited in contact drills this week?", format_injury_report())
+    generator.generate(prompt, max_new_tokens=4)  # warm-up
+
+    for clients in client_counts:
+        ttfts, lock = [], threading.Lock()
+        before = dict(generator.stats)
+
+        def client():
+            for _ in range(requests_per_client):
+                request = generator.submit(prompt, max_new_tokens)
+                for piece in iter(request.queue.get, None):
+                    if not isinstance(piece, str):
+                        break
+                with lock:
+                    ttfts.append((request.first_token_at or time.perf_counter()) - request.submitted_at)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+        tokens = generator.stats["tokens"] - before["tokens"]
+        batches = generator.stats["batches"] - before["batches"]
+        ttfts.sort()
+        results[str(clients)] = {
+            "requests": len(ttfts),
+            "ttft_p50_ms": statistics.median(ttfts) * 1e3,
+            "ttft_p95_ms": ttfts[int(0.95 * (len(ttfts) - 1))] * 1e3,
+            "tokens_per_s": tokens / wall,
+            "avg_batch": (generator.stats["requests"] - before["requests"]) / max(batches, 1),
+        }
+    return results
+
+
+def print_table(title: str, rows: dict, columns: list[str]):
+    widths = [max(14, len(c) + 2) for c in columns]
+    print(title)
+    print("  " + "key".ljust(10) + "".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for key, row in rows.items():
+        cells = "".join(
+            (f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c])).rjust(w) for c, w in zip(columns, widths)
+        )
+        print("  " + str(key).ljust(10) + cells)
+
+
+def flatten(data, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('meta', {}).get('commit', old_path)} -> {new.get('meta', {}).get('commit', new_path)}")
+    old_flat, new_flat = flatten(old.get("results", old)), flatten(new.get("results", new))
+    for key in sorted(set(old_flat) & set(new_flat)):
+        before, after = old_flat[key], new_flat[key]
+        change = (after - before) / before * 100 if before else float("inf") if after else 0.0
+        print(f"  {key:<60} {before:>12.2f} {after:>12.2f} {change:>+9.1f}%")
+
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(APP_PATH),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def report_micro(results: dict):
+    print_table(
+        "Hot helpers vs. roster size (microseconds per call)",
+        results,
+        list(next(iter(results.values())).keys()),
+    )
+
+
+def report_flow(results: dict):
+    if "skipped" in results:
+        print("Flow benchmark skipped:", results["skipped"])
+        return
+    lat = results["rerun_latency"]
+    print(f"Flow: {results['users']} users, {results['concurrency']} concurrent, {results['reruns']} reruns")
+    print(f"  rerun latency p50/p95/p99: {lat['p50_ms']:.1f} / {lat['p95_ms']:.1f} / {lat['p99_ms']:.1f} ms")
+    print(f"  throughput: {results['reruns_per_s']:.1f} reruns/s")
+    print(f"  memory: {results['retained_kb_per_session']:.1f} KB retained per session, peak {results['peak_mb']:.1f} MB")
+
+
+def report_router(results: dict):
+    print_table("Intent routing cost vs. registered intents", results, ["intents", "us_per_query"])
+
+
+def report_auth(results: dict):
+    rows = {k: v for k, v in results.items() if isinstance(v, dict)}
+    print(f"Password hash: {results['hash_ms']:.1f} ms each; cached token check: {results['check_us']:.2f} us")
+    print_table("Sign-ins (password + TOTP) vs. concurrent logins", rows, ["logins_per_s", "p50_ms", "p95_ms", "busy"])
+
+
+def report_shared(results: dict):
+    print_table(
+        "Worker processes on shared state (consistency checks must all be True)",
+        results,
+        ["workers", "writes_per_s", "ids_unique", "ids_increasing", "same_log", "same_roster"],
+    )
+
+
+def report_startup(results: dict):
+    print(f"Cold start (fresh process each run; interpreter alone {results['interpreter_ms']:.1f} ms)")
+    rows = {k: v for k, v in results.items() if k in STARTUP_PATHS}
+    print_table("Imports per screen path", rows, ["wall_ms", "import_ms", "over_interpreter_ms"])
+    for path, row in rows.items():
+        slowest = ", ".join(f"{name} {ms:.1f}" for name, ms in row["slowest"].items())
+        print(f"  slowest ({path}, ms self): {slowest}")
+    paint = results["first_paint"]
+    if "skipped" in paint:
+        print("Login first paint skipped:", paint["skipped"])
+    else:
+        print(
+            f"Login first paint: {paint['login_paint_ms']:.1f} ms after "
+            f"{paint['streamlit_import_ms']:.1f} ms of streamlit imports"
+        )
+
+
+def report_ratelimit(results: dict):
+    rows = {k: v for k, v in results.items() if isinstance(v, dict)}
+    print(f"Rejected send: {results['rejection_us']:.2f} us")
+    print_table(
+        "Staff vs. one abusive client, no limit / per-user token buckets",
+        rows,
+        ["staff_served_pct", "staff_busy", "staff_p95_ms", "abuser_share_pct", "abuser_throttled", "fairness"],
+    )
+
+
+def report_generation(results: dict):
+    if "skipped" in results:
+        print("Generation benchmark skipped:", results["skipped"])
+        return
+    rows = {k: v for k, v in results.items() if isinstance(v, dict)}
+    print(f"Model load: {results['load_seconds']:.2f}s")
+    print_table(
+        "Local model under concurrent clients",
+        rows,
+        ["requests", "ttft_p50_ms", "ttft_p95_ms", "tokens_per_s", "avg_batch"],
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suite", choices=["micro", "flow", "router", "auth", "shared", "startup", "ratelimit", "generation", "all", "compare"])
+    parser.add_argument("files", nargs="*", help="for compare: OLD.json NEW.json")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--users", type=int, default=20, help="flow/auth/ratelimit: simulated staff sessions")
+    parser.add_argument("--concurrency", type=int, default=4, help="flow: sessions driven at once")
+    parser.add_argument("--questions", type=int, default=5, help="flow: chat messages per session")
+    parser.add_argument("--workers", type=int, default=4, help="shared: worker processes")
+    args = parser.parse_args(argv)
+
+    if args.suite == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs exactly two JSON files")
+        compare(*args.files)
+        return 0
+
+    suites = {
+        "micro": (bench_micro, report_micro),
+        "flow": (lambda: bench_flow(args.users, args.concurrency, args.questions), report_flow),
+        "router": (bench_router, report_router),
+        "auth": (lambda: bench_auth(args.users), report_auth),
+        "shared": (lambda: bench_shared(args.workers), report_shared),
+        "startup": (bench_startup, report_startup),
+        "ratelimit": (lambda: bench_ratelimit(args.users), report_ratelimit),
+        "generation": (bench_generation, report_generation),
+    }
+    selected = list(suites) if args.suite == "all" else [args.suite]
+
+    results = {}
+    for name in selected:
+        run, report = suites[name]
+        results[name] = run()
+        report(results[name])
+        print()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": run_metadata(), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Process-wide change feed for live injury updates.
+
+A physician's save publishes one event; every open chat session picks up the
+events it has not seen yet on its next rerun (or on the chat window's periodic
+refresh). Events carry increasing sequence numbers, so a session only keeps an
+integer cursor and each read returns just the events after it.
+
+Retention is bounded: the feed holds the most recent `retention` events no
+matter how many sessions there are. A session that falls further behind than
+that is told how many events it missed instead of receiving them.
+
+With shared state (several app workers), events are appended to a shared
+stream and take its sequence numbers; each worker copies new ones into its
+local feed before a read, so sessions on every worker see every event. The
+shared stream keeps the same retention: every TRIM_EVERY events, the worker
+that published the event drops everything but the newest `retention`.
+"""
+import itertools
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+
+DEFAULT_RETENTION = 256
+FEED_STREAM = "feed"  # shared-state stream of events
+TRIM_EVERY = 64  # events between trims of the shared stream
+
+
+class FeedEvent:
+    __slots__ = ("seq", "at", "kind", "text", "origin", "data")
+
+    def __init__(self, seq: int, kind: str, text: str, origin: str | None, data: dict, at: float | None = None):
+        self.seq = seq
+        self.at = time.time() if at is None else at
+        self.kind = kind
+        self.text = text
+        self.origin = origin  # session that caused the event; it already has the news
+        self.data = data
+
+
+class ChangeFeed:
+    def __init__(self, retention: int = DEFAULT_RETENTION, shared=None):
+        self.retention = retention
+        self._shared = shared  # shared_state implementation, when workers share the feed
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=retention)
+        self._seqs = deque(maxlen=retention)  # parallel to _events, for bisect
+        self._counter = itertools.count(1)
+        self._latest = 0
+        self.stats = {"published": 0, "delivered": 0, "missed": 0}
+
+    @property
+    def latest(self) -> int:
+        """Sequence number of the newest event (0 before the first one)."""
+        return self._latest
+
+    def publish(self, kind: str, text: str, origin: str | None = None, **data) -> FeedEvent:
+        if self._shared is not None:
+            at = time.time()
+            seq = self._shared.append(
+                FEED_STREAM, {"kind": kind, "text": text, "origin": origin, "data": data, "at": at}
+            )
+            if seq % TRIM_EVERY == 0:
+                self._shared.trim(FEED_STREAM, seq - self.retention + 1)
+            self.sync()
+            self.stats["published"] += 1
+            return FeedEvent(seq, kind, text, origin, data, at)
+        with self._lock:
+            event = FeedEvent(next(self._counter), kind, text, origin, data)
+            self._add(event)
+            self.stats["published"] += 1
+            return event
+
+    def _add(self, event: FeedEvent):
+        self._events.append(event)
+        self._seqs.append(event.seq)
+        self._latest = event.seq
+
+    def sync(self):
+        """Copy events published on other workers into this feed (shared state only)."""
+        if self._shared is None:
+            return
+        with self._lock:
+            # no point fetching more than the feed retains
+            after = max(self._latest, self._shared.last(FEED_STREAM) - self.retention)
+            for seq, e in self._shared.read(FEED_STREAM, after):
+                self._add(FeedEvent(seq, e["kind"], e["text"], e["origin"], e["data"], e["at"]))
+
+    def read(self, cursor: int) -> tuple[list[FeedEvent], int, int]:
+        """
+        (events after cursor, new cursor, number of events lost to retention).
+        A cursor already at the latest event costs one comparison (plus, with
+        shared state, one round trip to pick up other workers' events).
+        """
+        self.sync()
+        if cursor >= self._latest:
+            return [], cursor, 0
+        with self._lock:
+            start = bisect_right(self._seqs, cursor)
+            events = list(itertools.islice(self._events, start, None))
+            # sequence numbers are contiguous, so any shortfall was lost to retention
+            missed = max(self._latest - cursor - len(events), 0)
+            self.stats["delivered"] += len(events)
+            self.stats["missed"] += missed
+            return events, self._latest, missed
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_change_feed() -> ChangeFeed:
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                from shared_state import get_shared_state
+
+                _feed = ChangeFeed(shared=get_shared_state())
+    return _feed
@@ -0,0 +1,290 @@
+"""
+Bounded per-session chat history.
+
+A session's conversation used to be a plain list that grew forever, with a
+fresh copy of the injury report in every report answer. ChatHistory keeps it
+bounded:
+
+- Long bot answers are stored as references to a shared Snapshot: every
+  session that got the same report text points at one string (and one
+  rendered bubble) instead of holding its own copy. Snapshots live exactly as
+  long as some message refers to them.
+- Once more than `cap` messages are held, the oldest are folded into one-line
+  summaries ("“List all injuries” → Sentinels injury report, 12 players").
+  Only the most recent SUMMARY_LINES summaries are kept; older turns are
+  counted.
+- With an archive directory configured (SENTINEL_CHAT_ARCHIVE_DIR), folded
+  messages are also spilled to a per-session JSON-lines file the user can page
+  back through. Report text is written there once per snapshot, and later
+  messages refer to it by file offset.
+
+Memory per session is therefore bounded by the cap, whatever the length of the
+session.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import weakref
+from array import array
+from collections import OrderedDict
+
+from player_store import get_store
+
+DEFAULT_CAP = 200  # messages held in memory
+FOLD_BATCH = 50  # messages folded at a time, so compaction is not paid on every append
+SUMMARY_LINES = 100  # summaries of folded turns kept
+SUMMARY_CHARS = 90
+SHARE_MIN_CHARS = 400  # bot answers at least this long are shared as snapshots
+ARCHIVE_PAGE = 25  # archived messages per page offset kept in memory
+ARCHIVE_MAX_AGE = 24 * 60 * 60  # archives untouched for this long are deleted
+
+
+# ---------- SHARED SNAPSHOTS ----------
+class Snapshot:
+    """One answer text shared by every message that received it."""
+
+    __slots__ = ("digest", "version", "text", "html", "__weakref__")
+
+    def __init__(self, digest: bytes, version: int | None, text: str):
+        self.digest = digest
+        self.version = version  # roster version when the text was first seen
+        self.text = text
+        self.html = {}  # (sender, label) -> rendered bubble
+
+
+_snapshots = weakref.WeakValueDictionary()  # digest -> Snapshot
+
+
+def share(text: str, version: int | None = None) -> Snapshot:
+    digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    snapshot = _snapshots.get(digest)
+    if snapshot is None:
+        snapshot = Snapshot(digest, version, text)
+        _snapshots[digest] = snapshot
+    return snapshot
+
+
+def shared_snapshots() -> int:
+    return len(_snapshots)
+
+
+# ---------- SUMMARIES ----------
+_MARKUP = re.compile(r"^[#>\s]+|[*_`|]+")
+_SPACE = re.compile(r"\s+")
+
+
+def gist(text: str, limit: int = SUMMARY_CHARS) -> str:
+    """First non-empty line of a message, without markdown, cut to `limit` characters."""
+    line = next((ln for ln in text.splitlines() if ln.strip()), "")
+    line = _SPACE.sub(" ", _MARKUP.sub("", line)).strip(" -:")
+    return line if len(line) <= limit else line[: limit - 1].rstrip() + "…"
+
+
+def summarize(messages: list[dict]) -> list[str]:
+    """One line per question and its answer, and one per other message."""
+    lines = []
+    question = None
+    for msg in messages:
+        if msg["sender"] == "user":
+            if question is not None:
+                lines.append(f"“{question}”")
+            question = gist(msg["text"], SUMMARY_CHARS // 2)
+        elif msg["sender"] == "bot" and question is not None:
+            lines.append(f"“{question}” → {gist(msg['text'])}")
+            question = None
+        else:
+            lines.append(f"{msg['label']}: {gist(msg['text'])}")
+    if question is not None:
+        lines.append(f"“{question}”")
+    return lines
+
+
+# ---------- ARCHIVE ----------
+class ChatArchive:
+    """
+    Append-only JSON-lines file of folded messages. Only one file offset per
+    ARCHIVE_PAGE messages is kept in memory; shared snapshot text is written
+    once and referenced by offset while it is among the recently written ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._pages = array("q")  # file offset of every ARCHIVE_PAGE-th message
+        self._written = OrderedDict()  # snapshot digest -> file offset of its text, most recent last
+
+    def append(self, messages: list[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for msg in messages:
+                record = {"sender": msg["sender"], "label": msg["label"]}
+                snapshot = msg.get("snapshot")
+                if snapshot is None:
+                    record["text"] = msg["text"]
+                else:
+                    at = self._written.get(snapshot.digest)
+                    if at is None:
+                        at = f.tell()
+                        f.write(json.dumps({"snapshot": snapshot.version, "text": snapshot.text}) + "\n")
+                        self._written[snapshot.digest] = at
+                        if len(self._written) > 64:
+                            self._written.popitem(last=False)
+                    else:
+                        self._written.move_to_end(snapshot.digest)
+                    record["ref"] = at
+                if self.count % ARCHIVE_PAGE == 0:
+                    self._pages.append(f.tell())
+                f.write(json.dumps(record) + "\n")
+                self.count += 1
+
+    def read(self, start: int, count: int) -> list[dict]:
+        """Archived messages start..start+count-1, oldest first."""
+        start = max(start, 0)
+        count = min(count, self.count - start)
+        if count <= 0:
+            return []
+        messages = []
+        with open(self.path, encoding="utf-8") as f:
+            f.seek(self._pages[start // ARCHIVE_PAGE])
+            skip = start % ARCHIVE_PAGE
+            while len(messages) < count:
+                record = json.loads(f.readline())
+                if "snapshot" in record:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                if "ref" in record:
+                    resume = f.tell()
+                    f.seek(record.pop("ref"))
+                    record["text"] = json.loads(f.readline())["text"]
+                    f.seek(resume)
+                messages.append(record)
+        return messages
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def prune_archives(directory: str, max_age: float = ARCHIVE_MAX_AGE):
+    cutoff = time.time() - max_age
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# ---------- HISTORY ----------
+class ChatHistory:
+    """
+    The messages of one session, oldest first. Messages are dicts with
+    "sender", "label" and "text"; supports len(), indexing and slicing like
+    the list it replaces. A placeholder still waiting for its answer carries
+    "pending": True and is never folded.
+    """
+
+    def __init__(self, session_id: str, cap: int | None = None, archive_dir: str | None = None):
+        self.cap = max(cap or int(os.environ.get("SENTINEL_CHAT_HISTORY_CAP", DEFAULT_CAP)), FOLD_BATCH + 1)
+        self.messages = []
+        self.summaries = []  # one line per folded turn, most recent SUMMARY_LINES only
+        self.folded = 0  # messages folded over the whole session
+        self.dropped_summaries = 0
+        self._summary_message = None
+
+        archive_dir = archive_dir or os.environ.get("SENTINEL_CHAT_ARCHIVE_DIR")
+        self.archive = None
+        if archive_dir:
+            os.makedirs(archive_dir, exist_ok=True)
+            prune_archives(archive_dir)
+            self.archive = ChatArchive(os.path.join(archive_dir, f"{session_id}.jsonl"))
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def append(self, msg: dict):
+        self._share(msg)
+        self.messages.append(msg)
+        if len(self.messages) > self.cap:
+            self.compact()
+
+    def settle(self, msg: dict, text: str, final: bool = True):
+        """Set a message's text (e.g. as its answer streams in); a final long answer is shared."""
+        msg["text"] = text
+        msg.pop("html", None)
+        if final:
+            msg.pop("pending", None)
+            self._share(msg)
+
+    @staticmethod
+    def _share(msg: dict):
+        if msg["sender"] == "bot" and not msg.get("pending") and len(msg["text"]) >= SHARE_MIN_CHARS:
+            snapshot = share(msg["text"], get_store().version)
+            msg["snapshot"] = snapshot
+            msg["text"] = snapshot.text
+            msg.pop("html", None)
+
+    def compact(self):
+        """Fold the oldest messages until the history is FOLD_BATCH below the cap."""
+        target = len(self.messages) - (self.cap - FOLD_BATCH)
+        cut = 0
+        while cut < target and not self.messages[cut].get("pending"):
+            cut += 1
+        if cut == 0:
+            return
+        old, self.messages = self.messages[:cut], self.messages[cut:]
+        if self.archive is not None:
+            self.archive.append(old)
+        self.summaries.extend(summarize(old))
+        excess = len(self.summaries) - SUMMARY_LINES
+        if excess > 0:
+            del self.summaries[:excess]
+            self.dropped_summaries += excess
+        self.folded += cut
+        self._summary_message = None
+
+    def summary_message(self) -> dict | None:
+        """A system message standing in for the folded turns, or None if nothing was folded."""
+        if not self.folded:
+            return None
+        if self._summary_message is None:
+            lines = [f"Earlier in this session ({self.folded} messages folded):"]
+            if self.dropped_summaries:
+                lines.append(f"- … {self.dropped_summaries} older turns")
+            lines += [f"- {line}" for line in self.summaries]
+            if self.archive is not None:
+                lines.append("_The full messages are in the archive below._")
+            self._summary_message = {"sender": "system", "label": "Summary", "text": "\n".join(lines)}
+        return self._summary_message
+
+    def archived(self) -> int:
+        return self.archive.count if self.archive is not None else 0
+
+    def read_archive(self, start: int, count: int) -> list[dict]:
+        return self.archive.read(start, count) if self.archive is not None else []
+
+    def clear(self):
+        self.messages = []
+        self.summaries = []
+        self.folded = 0
+        self.dropped_summaries = 0
+        self._summary_message = None
+        if self.archive is not None:
+            self.archive.delete()
+            self.archive = ChatArchive(self.archive.path)
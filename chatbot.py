@@ -0,0 +1,263 @@
+"""
+Rule-based answers for the injury report chatbot.
+
+Each kind of question is an intent registered on the module-level router, which
+is compiled once at import. ai_answer() routes the message and calls the
+matching handler, falling back to a short hint when nothing matches.
+
+Finished answers are shared across sessions through answer_cache. Handlers
+declare what their answer read (depends_on_players(), static_answer(),
+depends_on_query_log(), uncacheable()); anything undeclared is assumed to
+read the whole roster.
+"""
+from answer_cache import depends_on_players, depends_on_query_log, get_answer_cache, static_answer, uncacheable
+from entities import describe, get_entity_index
+from generation import build_prompt, get_generator
+from injury_report import format_targeted_report, get_report_cache, role_tail
+from intent_router import IntentRouter
+import metrics
+from player_store import get_store
+from projection import policy_for, project
+from query_log import get_query_log
+from retrieval import STOPWORDS, analyze, get_retrieval_index
+from timeline import format_changes, format_player_timeline, format_roster_as_of, strip_when
+
+router = IntentRouter()
+
+
+def answer_targeted(text: str, role: str, fuzzy: bool = True) -> str | None:
+    """
+    Rows for the players, positions or statuses named in the text, if any.
+    Whatever else the question says ("limited in contact drills") is matched
+    against the player records by the retrieval index to narrow the rows down.
+    Misspelled names are matched only with fuzzy=True, i.e. when an intent
+    already says the question is about players.
+    """
+    index = get_entity_index()
+    entities = index.extract(text, fuzzy=fuzzy)
+    if entities.numbers:
+        depends_on_players(entities.numbers)
+        return format_targeted_report(index.resolve(entities), describe(entities), role) + role_tail(role)
+
+    candidates = index.resolve(entities) if entities else None
+    hits = []
+    if analyze(" ".join(entities.rest)):
+        numbers = None if candidates is None else [p["number"] for p in candidates]
+        hits = get_retrieval_index().players(" ".join(entities.rest), numbers=numbers)
+
+    if hits:
+        store = get_store()
+        players = [p for p in (store.get(n) for n in hits) if p]
+        policy = policy_for(role)
+        if not policy.full:
+            # keep only hits the role's own view matches, so a search on
+            # clinical wording cannot reveal detail the role may not see
+            terms = set(analyze(" ".join(entities.rest)))
+            players = [
+                p for p in players
+                if terms & set(analyze(" ".join(str(v) for v in project(p, policy).values())))
+            ]
+        if players or not entities:
+            words = " ".join(t for t in entities.rest if t not in STOPWORDS)
+            asked_for = ", ".join(filter(None, [describe(entities), f"“{words}”"]))
+            return format_targeted_report(players, asked_for, role) + role_tail(role)
+    if entities:
+        return format_targeted_report(candidates, describe(entities), role) + role_tail(role)
+    return None
+
+
+def named_numbers(text: str) -> list[int] | None:
+    """
+    Numbers of the players, positions or statuses named in the text, or None.
+    Time phrases are left out first: the questions asking for these carry one.
+    """
+    index = get_entity_index()
+    entities = index.extract(strip_when(text), fuzzy=True)
+    if entities.numbers:
+        return entities.numbers
+    if entities:
+        return [p["number"] for p in index.resolve(entities)]
+    return None
+
+
+# ---------- INTENTS ----------
+@router.intent("player_history", ["how long", "since when", "history", "timeline"], priority=40)
+def answer_player_history(text: str, role: str) -> str:
+    uncacheable()  # durations and "since" windows are relative to now
+    numbers = get_entity_index().extract(strip_when(text), fuzzy=True).numbers
+    if not numbers:
+        return format_changes(get_store(), text, role=role)
+    return "\n\n".join(format_player_timeline(get_store(), n, role) for n in numbers[:3])
+
+
+@router.intent("roster_as_of", ["as of", "as it was", "back on"], priority=36)
+def answer_roster_as_of(text: str, role: str) -> str:
+    uncacheable()
+    return format_roster_as_of(get_store(), text, named_numbers(text), role) or answer_injury_report(text, role)
+
+
+@router.intent(
+    "recent_changes",
+    ["what changed", "what's changed", "changes", "changed", "since", "recent updates", "anything new"],
+    priority=35,
+)
+def answer_recent_changes(text: str, role: str) -> str:
+    uncacheable()
+    return format_changes(get_store(), text, named_numbers(text), role)
+
+
+@router.intent("injury_report", ["injury", "injuries", "report", "roster", "list"], priority=30)
+def answer_injury_report(text: str, role: str) -> str:
+    return answer_targeted(text, role) or get_report_cache().for_role(role)
+
+
+@router.intent(
+    "player_status",
+    ["how is", "how's", "status", "available", "availability", "playing", "update on", "who is", "who's", "anyone"],
+    priority=25,
+)
+def answer_player_status(text: str, role: str) -> str:
+    return answer_targeted(text, role) or answer_fallback(text, role)
+
+
+@router.intent("greeting", ["hi", "hello", "hey"], priority=20)
+def answer_greeting(text: str, role: str) -> str:
+    static_answer()
+    return (
+        "Hey 👋 This prototype is focused on the **injury report** use case. "
+        "Try asking me something like: *“List all injuries”* or *“Show the Sentinels injury report.”*"
+    )
+
+
+@router.intent("help", ["what can you do", "help"], priority=10)
+def answer_help(text: str, role: str) -> str:
+    static_answer()
+    return (
+        "Right now this demo is centered on an **injury report** use case:\n"
+        "- I can list 12 fictional Washington Sentinels players and their current injuries.\n"
+        "- Ask what changed since yesterday, or how long a player has had their current status.\n"
+        "- Every question you ask is logged into a **query database** for later analysis.\n"
+        "- If you’re logged in as Team Physician, you can update injuries live from this screen."
+    )
+
+
+def answer_fallback(text: str, role: str) -> str:
+    static_answer()
+    depends_on_query_log()  # the similar-questions list
+    answer = (
+        "For this demo, my main job is to show the **injury report** for our 12 fictional Sentinels players. "
+        "Try asking: *“List all injuries”* or *“Show the current injury report.”*"
+    )
+    similar = similar_questions(text, role)
+    if similar:
+        answer += "\n\nSimilar questions already in the query database:\n" + "\n".join(
+            f"- Q{q['id']} “{q['question']}” (status: {q['status']}{', note: ' + q['note'] if q.get('note') else ''})"
+            for q in similar
+        )
+    return answer
+
+
+SIMILAR_SCAN = 25  # closest logged questions checked against a non-clinical role's view
+
+
+def similar_questions(text: str, role: str, k: int = 3) -> list[dict]:
+    """
+    Logged questions like this one that the role may see. The log is shared by
+    every user, so only clinical roles see every question with its internal
+    note; any other role sees only questions asked under its own role, without
+    notes, and matched on the question text alone (a hit on note words would
+    tell it what a note says).
+    """
+    log = get_query_log()
+    if policy_for(role).full:
+        return [q for q in map(log.get, get_retrieval_index().queries(text, k=k)) if q]
+
+    terms = set(analyze(text))
+    similar = []
+    for q in map(log.get, get_retrieval_index().queries(text, k=SIMILAR_SCAN)):
+        if q and q["role"] == role and terms & set(analyze(q["question"])):
+            similar.append({"id": q["id"], "question": q["question"], "status": q["status"]})
+            if len(similar) == k:
+                break
+    return similar
+
+
+router.compile()
+
+
+@metrics.timed()
+def rule_answer(text: str, role: str) -> str | None:
+    """The rule-based answer, or None when no intent or entity applies."""
+    intent = router.route(text)
+    if intent is not None and intent.handler is not None:
+        return intent.handler(text, role)
+    # a bare "#17?" or "Ortiz" still deserves a targeted answer; nothing says
+    # the text is about players, so names have to be spelled right
+    return answer_targeted(text, role, fuzzy=False)
+
+
+@metrics.timed()
+def ai_answer(text: str, role: str) -> str:
+    """
+    Simple "AI" centered on the injury report use case.
+    - When the user asks about injuries / report / roster, it lists every player from live state,
+      or only the players matching the numbers, names, positions or statuses mentioned.
+    - Otherwise gives a friendly, role-aware answer.
+    """
+    cache = get_answer_cache()
+    key = cache_key(text, role)
+    answer = cache.get(key)
+    if answer is None:
+        with cache.tracking() as (deps, version):
+            answer = rule_answer(text, role) or answer_fallback(text, role)
+        cache.put(key, answer, deps, version)
+    return answer
+
+
+def cache_key(text: str, role: str) -> tuple:
+    intent = router.route(text)
+    return get_answer_cache().key(text, role, intent.name if intent else None)
+
+
+def ai_answer_stream(text: str, role: str):
+    """
+    Yield the answer in pieces. Rule-based answers come out in one piece; other
+    questions go to the local model when one is configured, falling back to
+    the rule-based hint if it is not, fails, or says nothing. A cached answer
+    comes out in one piece, and a completed answer is cached whole.
+    """
+    cache = get_answer_cache()
+    key = cache_key(text, role)
+    answer = cache.get(key)
+    if answer is not None:
+        yield answer
+        return
+
+    pieces = []
+    with cache.tracking() as (deps, version):
+        for piece in _answer_pieces(text, role, deps):
+            pieces.append(piece)
+            yield piece
+    cache.put(key, "".join(pieces), deps, version)
+
+
+def _answer_pieces(text: str, role: str, deps):
+    answer = rule_answer(text, role)
+    if answer is not None:
+        yield answer
+        return
+
+    generator = get_generator()
+    if generator is None:
+        yield answer_fallback(text, role)
+        return
+
+    produced = False
+    try:
+        for piece in generator.stream(build_prompt(text, get_report_cache().report(role))):
+            produced = produced or bool(piece.strip())
+            yield piece
+    except Exception:
+        deps.cacheable = False  # a cut-off model answer is not worth keeping
+    if not produced:
+        yield answer_fallback(text, role)
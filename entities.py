@@ -0,0 +1,230 @@
+"""
+Entity extraction for targeted injury questions.
+
+Pulls jersey numbers, player names, positions and status phrases out of a
+message and resolves them against the player store's indexes, so "how is
+#17?" or "any WR injuries?" returns only the matching players. The lookup
+tables are rebuilt only when the roster version changes.
+
+Misspelled names ("how is Ortzi?") are matched only when the caller already
+knows the question is about players (extract(..., fuzzy=True)); otherwise
+ordinary words would turn into players ("How do I login?" -> Logan Hayes).
+Fuzzy candidates come from a trigram index of the single-word names, so a
+token is compared with a handful of names rather than the whole roster.
+
+A bare number is a jersey number only when something says so: "#17", "no.
+17", "number 17", "player 17" or a position beside it ("WR 11"). Followed by
+a unit ("1 week", "3 days") it is never one.
+"""
+import difflib
+import threading
+from collections import Counter
+
+from intent_router import tokenize
+from player_store import get_store
+
+# alias -> position codes. Single-letter codes (S, K, C) are left out on purpose:
+# they collide with ordinary words far too often.
+POSITION_ALIASES = {
+    "qb": {"QB"}, "qbs": {"QB"}, "quarterback": {"QB"}, "quarterbacks": {"QB"},
+    "rb": {"RB"}, "rbs": {"RB"}, "running back": {"RB"}, "running backs": {"RB"},
+    "wr": {"WR"}, "wrs": {"WR"}, "receiver": {"WR"}, "receivers": {"WR"},
+    "wide receiver": {"WR"}, "wide receivers": {"WR"},
+    "te": {"TE"}, "tes": {"TE"}, "tight end": {"TE"}, "tight ends": {"TE"},
+    "lb": {"LB"}, "lbs": {"LB"}, "linebacker": {"LB"}, "linebackers": {"LB"},
+    "cb": {"CB"}, "cbs": {"CB"}, "cornerback": {"CB"}, "cornerbacks": {"CB"}, "corner": {"CB"}, "corners": {"CB"},
+    "safety": {"S"}, "safeties": {"S"},
+    "lt": {"LT"}, "left tackle": {"LT"}, "tackle": {"LT", "RT"}, "tackles": {"LT", "RT"},
+    "center": {"C"}, "centers": {"C"},
+    "offensive line": {"LT", "LG", "C", "RG", "RT"}, "o-line": {"LT", "LG", "C", "RG", "RT"},
+    "de": {"DE"}, "des": {"DE"}, "defensive end": {"DE"}, "defensive ends": {"DE"},
+    "kicker": {"K"}, "kickers": {"K"},
+}
+
+# phrase -> status category (see player_store.STATUS_CATEGORIES)
+STATUS_ALIASES = {
+    "out": "out", "ruled out": "out", "inactive": "out",
+    "questionable": "questionable", "doubtful": "questionable",
+    "day-to-day": "day-to-day", "day to day": "day-to-day",
+    "limited": "limited", "restricted": "limited",
+    "cleared": "full", "full participation": "full", "full go": "full",
+}
+
+# words never treated as possible player names
+NAME_STOPWORDS = {
+    "the", "and", "any", "all", "how", "who", "what", "with", "this", "that", "week",
+    "injury", "injuries", "report", "roster", "list", "status", "show", "player", "players",
+    "doing", "today", "game", "practice", "update", "about", "there", "team",
+}
+
+# words that make a bare number next to them a jersey number (besides position aliases)
+JERSEY_WORDS = {"no", "number", "num", "jersey", "player"}
+# words after a number that make it a count, never a jersey number
+COUNT_UNITS = {
+    "second", "seconds", "minute", "minutes", "min", "mins", "hour", "hours", "hr", "hrs",
+    "day", "days", "week", "weeks", "wk", "wks", "month", "months", "year", "years", "game", "games",
+}
+
+MAX_PHRASE_TOKENS = 3
+NAME_CUTOFF = 0.8  # difflib ratio a misspelled name needs
+FUZZY_MIN_LENGTH = 4  # shorter tokens are only matched exactly
+FUZZY_LENGTH_RATIO = 0.75  # shorter / longer of token and name
+FUZZY_CANDIDATES = 8  # names sharing the most trigrams that get a full comparison
+
+
+def trigrams(word: str) -> set[str]:
+    padded = f"^{word}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Entities:
+    __slots__ = ("numbers", "positions", "statuses", "rest")
+
+    def __init__(self):
+        self.numbers = []  # jersey numbers named directly or via a player's name
+        self.positions = set()
+        self.statuses = set()
+        self.rest = []  # tokens that were not part of any entity
+
+    def __bool__(self) -> bool:
+        return bool(self.numbers or self.positions or self.statuses)
+
+
+class EntityIndex:
+    """Lookup tables for one roster version."""
+
+    def __init__(self, store):
+        self.version = store.version
+        self.store = store
+        self.name_tokens = {}  # lowercase first/last/full name -> set of numbers
+        for p in store.all():
+            name = p["name"].lower()
+            for part in [name, *name.split()]:
+                self.name_tokens.setdefault(part, set()).add(p["number"])
+        self._by_trigram = {}  # trigram -> single-word names containing it
+        for part in self.name_tokens:
+            if " " not in part and len(part) >= FUZZY_MIN_LENGTH:
+                for gram in trigrams(part):
+                    self._by_trigram.setdefault(gram, []).append(part)
+
+    def _match_name(self, token: str, fuzzy: bool) -> set[int]:
+        if len(token) < 3 or token in NAME_STOPWORDS:
+            return set()
+        if token in self.name_tokens:
+            return self.name_tokens[token]
+        if not fuzzy or len(token) < FUZZY_MIN_LENGTH:
+            return set()
+
+        shared = Counter()
+        for gram in trigrams(token):
+            shared.update(self._by_trigram.get(gram, ()))
+        best, best_ratio = None, NAME_CUTOFF
+        for part, _ in shared.most_common(FUZZY_CANDIDATES):
+            if min(len(part), len(token)) / max(len(part), len(token)) < FUZZY_LENGTH_RATIO:
+                continue
+            ratio = difflib.SequenceMatcher(None, token, part).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = part, ratio
+        return self.name_tokens[best] if best else set()
+
+    @staticmethod
+    def _jersey_number(tokens: list[str], i: int) -> int | None:
+        token = tokens[i]
+        if token.startswith("#"):
+            return int(token[1:]) if token[1:].isdigit() else None
+        if not token.isdigit():
+            return None
+        before = tokens[i - 1] if i else ""
+        after = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if after in COUNT_UNITS:
+            return None
+        if before in JERSEY_WORDS or before in POSITION_ALIASES or after in POSITION_ALIASES or after == "player":
+            return int(token)
+        return None
+
+    def extract(self, text: str, fuzzy: bool = False) -> Entities:
+        """
+        The entities named in the text. With fuzzy=True (the question is known
+        to be about players), tokens close to a player's name count as that name.
+        """
+        found = Entities()
+        tokens = [t[:-2] if t.endswith(("'s", "’s")) else t for t in tokenize(text)]
+
+        i = 0
+        while i < len(tokens):
+            # longest phrase first, so "wide receivers" beats "receivers"
+            for size in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i : i + size])
+                if phrase in POSITION_ALIASES:
+                    found.positions |= POSITION_ALIASES[phrase]
+                elif phrase in STATUS_ALIASES:
+                    found.statuses.add(STATUS_ALIASES[phrase])
+                elif phrase in self.name_tokens and size > 1:
+                    found.numbers.extend(sorted(self.name_tokens[phrase]))
+                else:
+                    continue
+                i += size
+                break
+            else:
+                token = tokens[i]
+                number = self._jersey_number(tokens, i)
+                if number is not None:
+                    found.numbers.append(number)
+                else:
+                    matched = self._match_name(token, fuzzy)
+                    if matched:
+                        found.numbers.extend(sorted(matched))
+                    else:
+                        found.rest.append(token)
+                i += 1
+
+        found.numbers = list(dict.fromkeys(found.numbers))
+        return found
+
+    def resolve(self, entities: Entities) -> list[dict]:
+        """
+        Players named directly win; otherwise position and status filters are
+        intersected using the store's secondary indexes.
+        """
+        if entities.numbers:
+            return [p for p in (self.store.get(n) for n in entities.numbers) if p]
+
+        by_position = None
+        if entities.positions:
+            by_position = {}
+            for pos in sorted(entities.positions):
+                for p in self.store.by_position(pos):
+                    by_position[p["number"]] = p
+        by_status = None
+        if entities.statuses:
+            by_status = {}
+            for category in sorted(entities.statuses):
+                for p in self.store.by_status(category):
+                    by_status[p["number"]] = p
+
+        if by_position is not None and by_status is not None:
+            return [p for n, p in by_position.items() if n in by_status]
+        return list((by_position if by_position is not None else by_status or {}).values())
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_entity_index() -> EntityIndex:
+    global _index
+    store = get_store()
+    index = _index
+    if index is None or index.store is not store or index.version != store.version:
+        with _index_lock:
+            if _index is None or _index.store is not store or _index.version != store.version:
+                _index = EntityIndex(store)
+            index = _index
+    return index
+
+
+def describe(entities: Entities) -> str:
+    parts = [f"#{n}" for n in entities.numbers]
+    parts += sorted(entities.positions)
+    parts += sorted(entities.statuses)
+    return ", ".join(parts)
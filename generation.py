@@ -0,0 +1,238 @@
+"""
+Optional local language-model backend (GPT-2 class, CPU only).
+
+The rule-based answers in chatbot.py remain the fast path. This backend is only
+used for questions no intent handles, and only when SENTINEL_MODEL names a
+locally available model (a directory or a name already in the Hugging Face
+cache). Nothing is downloaded: loading runs with local_files_only=True.
+
+Requests from every session go to one process-wide Generator. A scheduler
+thread collects whatever arrives within a short window into a micro-batch,
+runs one forward pass per token for the whole batch (left-padded, with a KV
+cache), and pushes each new piece of text to the caller's queue as soon as it
+is produced, so answers can be streamed into the chat bubble.
+"""
+import importlib.util
+import os
+import queue
+import threading
+import time
+
+DEFAULT_MAX_NEW_TOKENS = 80
+DEFAULT_MAX_BATCH = 8
+DEFAULT_BATCH_WINDOW = 0.02  # seconds to wait for more requests before a batch starts
+
+PROMPT_TEMPLATE = (
+    "You are the Washington Sentinels internal assistant. Answer briefly and only "
+    "from the injury report below.\n\n{context}\n\nQuestion: {question}\nAnswer:"
+)
+
+_DONE = object()
+
+
+def generation_available() -> bool:
+    """True when a model is configured and torch/transformers can be imported."""
+    if not os.environ.get("SENTINEL_MODEL"):
+        return False
+    # looked up, not imported: loading torch takes seconds, and the model does that anyway
+    return all(importlib.util.find_spec(name) is not None for name in ("torch", "transformers"))
+
+
+class GenerationRequest:
+    __slots__ = ("prompt", "max_new_tokens", "queue", "cancelled", "submitted_at", "first_token_at")
+
+    def __init__(self, prompt: str, max_new_tokens: int):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.queue = queue.Queue()
+        self.cancelled = False
+        self.submitted_at = time.perf_counter()
+        self.first_token_at = None
+
+
+class Generator:
+    def __init__(
+        self,
+        model_name: str,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        threads: int | None = None,
+    ):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=True)
+        self.tokenizer.padding_side = "left"
+        self.tokenizer.truncation_side = "left"  # keep the question at the end of the prompt
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, local_files_only=True)
+        self.model.to("cpu")
+        self.model.eval()
+        self.max_positions = getattr(self.model.config, "n_positions", 1024)
+
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._pending = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"batches": 0, "requests": 0, "tokens": 0, "busy_seconds": 0.0}
+
+        self._worker = threading.Thread(target=self._run, name="generation-batcher", daemon=True)
+        self._worker.start()
+
+    # ----- public API -----
+    def submit(self, prompt: str, max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS) -> GenerationRequest:
+        request = GenerationRequest(prompt, max_new_tokens)
+        self._pending.put(request)
+        return request
+
+    def stream(self, prompt: str, max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS, timeout: float = 60.0):
+        """Yield text pieces as they are generated. Closing the generator cancels the request."""
+        request = self.submit(prompt, max_new_tokens)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Generation timed out")
+                try:
+                    piece = request.queue.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError("Generation timed out") from None
+                if piece is _DONE:
+                    return
+                if isinstance(piece, BaseException):
+                    raise piece
+                yield piece
+        finally:
+            request.cancelled = True
+
+    def generate(self, prompt: str, max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS, timeout: float = 60.0) -> str:
+        return "".join(self.stream(prompt, max_new_tokens, timeout))
+
+    # ----- scheduler -----
+    def _collect_batch(self) -> list[GenerationRequest]:
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [r for r in batch if not r.cancelled]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                tokens = self._generate_batch(batch)
+            except Exception as exc:  # surface the failure to every waiting caller
+                for request in batch:
+                    request.queue.put(exc)
+                continue
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["requests"] += len(batch)
+                self.stats["tokens"] += tokens
+                self.stats["busy_seconds"] += time.perf_counter() - started
+
+    def _generate_batch(self, batch: list[GenerationRequest]) -> int:
+        torch = self.torch
+        tok = self.tokenizer
+        max_new = max(r.max_new_tokens for r in batch)
+
+        enc = tok(
+            [r.prompt for r in batch],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_positions - max_new,
+        )
+        input_ids = enc["input_ids"]
+        attention_mask = enc["attention_mask"]
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        generated = [[] for _ in batch]
+        emitted = [""] * len(batch)
+        finished = [r.cancelled for r in batch]
+        past = None
+        produced = 0
+
+        with torch.inference_mode():
+            for step in range(max_new):
+                out = self.model(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
+                    past_key_values=past,
+                    use_cache=True,
+                )
+                past = out.past_key_values
+                next_ids = out.logits[:, -1, :].argmax(dim=-1)
+
+                for i, request in enumerate(batch):
+                    if finished[i]:
+                        continue
+                    token_id = int(next_ids[i])
+                    if request.cancelled or token_id == tok.eos_token_id or step >= request.max_new_tokens:
+                        finished[i] = True
+                        request.queue.put(_DONE)
+                        continue
+                    generated[i].append(token_id)
+                    produced += 1
+                    # decode the whole suffix so multi-byte characters are never split
+                    text = tok.decode(generated[i], skip_special_tokens=True)
+                    piece, emitted[i] = text[len(emitted[i]):], text
+                    if piece:
+                        if request.first_token_at is None:
+                            request.first_token_at = time.perf_counter()
+                        request.queue.put(piece)
+
+                if all(finished):
+                    break
+
+                next_ids = next_ids.masked_fill(torch.tensor(finished), tok.pad_token_id)
+                input_ids = next_ids.unsqueeze(-1)
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones((len(batch), 1))], dim=-1)
+                position_ids = position_ids[:, -1:] + 1
+
+        for i, request in enumerate(batch):
+            if not finished[i]:
+                request.queue.put(_DONE)
+        return produced
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> Generator | None:
+    """
+    Load the configured model on first use and keep it resident for the life
+    of the process. Returns None when no backend is configured or installed.
+    """
+    global _generator
+    if _generator is None and generation_available():
+        with _generator_lock:
+            if _generator is None:
+                os.environ.setdefault("HF_HUB_OFFLINE", "1")
+                _generator = Generator(
+                    os.environ["SENTINEL_MODEL"],
+                    max_batch=int(os.environ.get("SENTINEL_MODEL_BATCH", DEFAULT_MAX_BATCH)),
+                    threads=int(os.environ["SENTINEL_MODEL_THREADS"]) if os.environ.get("SENTINEL_MODEL_THREADS") else None,
+                )
+    return _generator
+
+
+def build_prompt(question: str, context: str) -> str:
+    return PROMPT_TEMPLATE.format(context=context.strip(), question=question.strip())
@@ -0,0 +1,156 @@
+"""
+Injury report formatting with version-stamped, per-role views.
+
+Each role sees the report through its projection policy (see projection.py).
+For every policy the cache keeps a materialized view: one rendered fragment
+per player, reused until that player is edited, and the joined report,
+re-joined only when the roster version changes. Roles sharing a policy share
+the view, each role's variant (report + role-specific tail) is cached on top,
+so repeated "show the injury report" requests cost one dict lookup, and
+targeted answers are assembled from the same fragments.
+"""
+import threading
+
+import metrics
+from player_store import get_store
+from projection import CLINICAL, policy_for, project
+
+REPORT_HEADER = "Here’s the current Sentinels injury report (demo data):\n"
+FILTERED_REPORT_HEADER = "Here’s the current Sentinels injury report (demo data, filtered for your role):\n"
+
+
+def format_player(p: dict) -> str:
+    """Markdown for one (possibly projected) record; fields left out of it are not shown."""
+    lines = [f"- **#{p['number']} {p['name']} ({p['position']})**"]
+    if "injury" in p:
+        lines.append(f"  **Injury:** {p['injury']}")
+    if "status" in p:
+        lines.append(f"  **Status:** {p['status']}")
+    if "last_updated" in p:
+        lines.append(f"  _Last updated: {p['last_updated']}_")
+    return "  \n".join(lines)
+
+
+def role_tail(role: str) -> str:
+    if role == "Team Physician":
+        return (
+            "\n\nAs Team Physician, you’d be able to update these entries in the real system "
+            "directly from this interface (clearing players, changing phases, etc.). "
+            "Use the **Live Injury Update** panel below to simulate that in this demo."
+        )
+    policy = policy_for(role)
+    if policy.full:
+        return "\n\nYou’re seeing full clinical detail. Only the Team Physician can change these entries."
+    return f"\n\nThis view is filtered for your role: {policy.summary}. Clinical detail stays with the medical staff."
+
+
+class RoleView:
+    """One policy's materialized report at one roster version."""
+
+    __slots__ = ("version", "fragments", "report")
+
+    def __init__(self, version: int, fragments: dict, report: str):
+        self.version = version
+        self.fragments = fragments  # number -> (revision, rendered fragment)
+        self.report = report
+
+
+class ReportCache:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._views = {}  # policy name -> RoleView
+        self._variants = {}  # (version, role) -> report + role tail
+        self.renders = 0  # fragments rendered so far; handy in benchmarks
+
+    def view(self, policy=CLINICAL) -> RoleView:
+        view = self._views.get(policy.name)
+        if view is not None and view.version == self.store.version:
+            return view
+
+        with self._lock:
+            version, revisions = self.store.revisions()
+            view = self._views.get(policy.name)
+            if view is not None and view.version == version:
+                return view
+
+            # a view is never modified once built, so readers need no lock
+            previous = view.fragments if view is not None else {}
+            fragments = {}
+            parts = [REPORT_HEADER if policy.full else FILTERED_REPORT_HEADER]
+            for number, revision in revisions:
+                cached = previous.get(number)
+                if cached is None or cached[0] != revision:
+                    cached = (revision, format_player(project(self.store.get(number), policy)))
+                    self.renders += 1
+                fragments[number] = cached
+                parts.append(cached[1])
+
+            view = RoleView(version, fragments, "\n".join(parts))
+            self._views[policy.name] = view
+            return view
+
+    def report(self, role: str | None = None) -> str:
+        """The report as the role may see it; the full clinical report without a role."""
+        return self.view(CLINICAL if role is None else policy_for(role)).report
+
+    @metrics.timed("injury_report_for_role")
+    def for_role(self, role: str) -> str:
+        view = self.view(policy_for(role))
+        key = (view.version, role)
+        variants = self._variants
+        if key not in variants:
+            if any(k[0] != view.version for k in variants):
+                variants = self._variants = {}
+            variants[key] = view.report + role_tail(role)
+        return variants[key]
+
+    def fragments(self, numbers, role: str) -> list[str]:
+        fragments = self.view(policy_for(role)).fragments
+        return [fragments[n][1] for n in numbers if n in fragments]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    global _cache
+    store = get_store()
+    if _cache is None or _cache.store is not store:
+        with _cache_lock:
+            if _cache is None or _cache.store is not store:
+                _cache = ReportCache(store)
+    return _cache
+
+
+@metrics.timed()
+def format_injury_report(role: str | None = None) -> str:
+    return get_report_cache().report(role)
+
+
+def format_update_notice(player: dict, by: str, role: str | None = None) -> str:
+    """A live-update message about one saved record, as the role may see it."""
+    view = player if role is None else project(player, policy_for(role))
+    return f"{by} updated the injury report:\n\n" + format_player(view)
+
+
+def format_batch_notice(players: list[dict], by: str, role: str | None = None) -> str:
+    """One live-update message for a bulk edit, as the role may see it."""
+    if len(players) == 1:
+        return format_update_notice(players[0], by, role)
+    policy = None if role is None else policy_for(role)
+    views = players if policy is None else [project(p, policy) for p in players]
+    return f"{by} updated {len(players)} players on the injury report:\n\n" + "\n".join(map(format_player, views))
+
+
+def format_targeted_report(players: list[dict], asked_for: str, role: str | None = None) -> str:
+    if not players:
+        return f"No players on the current injury report match **{asked_for}**."
+    noun = "player" if len(players) == 1 else "players"
+    lines = [f"Here’s what the injury report has for **{asked_for}** ({len(players)} {noun}):\n"]
+    if role is None:
+        lines.extend(format_player(p) for p in players)
+    else:
+        lines.extend(get_report_cache().fragments([p["number"] for p in players], role))
+    return "\n".join(lines)
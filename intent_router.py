@@ -0,0 +1,92 @@
+"""
+Token-based intent router.
+
+Intents are declared once with the words/phrases that trigger them and are
+compiled into an inverted index (first token -> candidate phrases). Routing a
+message tokenizes it and walks the tokens once, so the cost depends on the
+message length and the handful of phrases sharing a first token, not on how
+many intents are registered. Matching is on whole tokens: "hi" no longer fires
+on "this" or "ship".
+"""
+import re
+import threading
+
+TOKEN_RE = re.compile(r"#?[a-z0-9]+(?:['’-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class Intent:
+    __slots__ = ("name", "phrases", "priority", "handler", "order")
+
+    def __init__(self, name, phrases, priority, handler, order):
+        self.name = name
+        self.phrases = phrases
+        self.priority = priority
+        self.handler = handler
+        self.order = order
+
+
+class IntentRouter:
+    def __init__(self):
+        self._intents = {}
+        self._index = None  # token -> list of (phrase tokens, intent name)
+        self._lock = threading.Lock()
+
+    def register(self, name: str, phrases, priority: int = 0, handler=None):
+        """
+        Declare an intent. Each phrase may be a single word ("injury") or
+        several ("what can you do"); the highest-priority match wins.
+        """
+        compiled = tuple(tuple(tokenize(p)) for p in phrases if tokenize(p))
+        if not compiled:
+            raise ValueError(f"Intent {name!r} has no usable phrases")
+        with self._lock:
+            order = self._intents[name].order if name in self._intents else len(self._intents)
+            self._intents[name] = Intent(name, compiled, priority, handler, order)
+            self._index = None
+
+    def intent(self, name: str, phrases, priority: int = 0):
+        """Decorator form of register() that attaches the handler."""
+
+        def decorator(fn):
+            self.register(name, phrases, priority, handler=fn)
+            return fn
+
+        return decorator
+
+    def compile(self):
+        index = {}
+        for intent in self._intents.values():
+            for phrase in intent.phrases:
+                index.setdefault(phrase[0], []).append((phrase, intent.name))
+        self._index = index
+        return index
+
+    def match(self, text: str) -> set[str]:
+        """Every intent with at least one phrase in the text, in one pass."""
+        index = self._index or self.compile()
+        tokens = tokenize(text)
+        found = set()
+        for i, token in enumerate(tokens):
+            for phrase, name in index.get(token, ()):
+                if len(phrase) == 1 or tuple(tokens[i : i + len(phrase)]) == phrase:
+                    found.add(name)
+        return found
+
+    def route(self, text: str) -> Intent | None:
+        found = self.match(text)
+        if not found:
+            return None
+        return max(
+            (self._intents[name] for name in found),
+            key=lambda intent: (intent.priority, -intent.order),
+        )
+
+    def intents(self) -> list[Intent]:
+        return list(self._intents.values())
+
+    def __len__(self) -> int:
+        return len(self._intents)
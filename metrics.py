@@ -0,0 +1,279 @@
+"""
+Lightweight timing instrumentation for reruns.
+
+Stages are timed with the timer() context manager or the timed() decorator
+and recorded into fixed-size ring-buffer histograms, so memory stays constant
+however long the process runs and percentiles reflect the most recent calls.
+When collection is disabled (SENTINEL_METRICS=0, or the admin panel toggle)
+a timed call costs one flag check.
+
+- snapshot() feeds the admin panel: p50/p95/p99 per stage, active sessions,
+  resident memory.
+- render_prometheus() / write_prometheus() produce the Prometheus text
+  exposition format; SENTINEL_METRICS_PATH names the file the app refreshes.
+- profile_rerun() optionally samples the script thread's stack while a rerun
+  runs. Reruns slower than SENTINEL_PROFILE_SLOW_MS are written to
+  SENTINEL_PROFILE_DIR as folded stacks ("main;screen_chat;ai_answer 12"),
+  the input format of flamegraph.pl and speedscope.
+"""
+import functools
+import os
+import resource
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+
+HISTOGRAM_SIZE = 1024  # samples kept per stage
+SESSION_WINDOW = 15 * 60  # a session counts as active for this long after its last rerun
+PROMETHEUS_INTERVAL = 10.0  # seconds between metric file writes
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+
+enabled = os.environ.get("SENTINEL_METRICS", "1") != "0"
+
+
+class Histogram:
+    """The last `size` durations of one stage, plus lifetime count and sum."""
+
+    __slots__ = ("_samples", "_next", "count", "total", "max", "_lock")
+
+    def __init__(self, size: int = HISTOGRAM_SIZE):
+        self._samples = array("d", bytes(8 * size))
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples[self._next] = seconds
+            self._next = (self._next + 1) % len(self._samples)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentiles(self, *pcts: float) -> list[float]:
+        with self._lock:
+            filled = min(self.count, len(self._samples))
+            ordered = sorted(self._samples[:filled])
+        if not ordered:
+            return [0.0 for _ in pcts]
+        return [ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)] for p in pcts]
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_sessions = {}  # session id -> last rerun time
+_sessions_pruned = 0.0
+
+
+def histogram(name: str) -> Histogram:
+    hist = _histograms.get(name)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(name, Histogram())
+    return hist
+
+
+def set_enabled(value: bool):
+    global enabled
+    enabled = value
+
+
+@contextmanager
+def timer(name: str):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name).record(time.perf_counter() - start)
+
+
+def timed(name: str | None = None):
+    """Decorator form of timer(); the stage defaults to the function's name."""
+
+    def decorator(fn):
+        stage = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram(stage).record(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def session_seen(session_id: str):
+    global _sessions_pruned
+    now = time.time()
+    _sessions[session_id] = now
+    if now - _sessions_pruned > 60:
+        _sessions_pruned = now
+        cutoff = now - SESSION_WINDOW
+        for sid, seen in list(_sessions.items()):
+            if seen < cutoff:
+                _sessions.pop(sid, None)
+
+
+def active_sessions() -> int:
+    cutoff = time.time() - SESSION_WINDOW
+    return sum(1 for seen in list(_sessions.values()) if seen >= cutoff)
+
+
+def memory_bytes() -> tuple[int, int]:
+    """(resident now, peak resident) in bytes; "now" is the peak where /proc is unavailable."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize(), peak
+    except OSError:
+        return peak, peak
+
+
+def snapshot() -> dict:
+    stages = {}
+    for name, hist in sorted(_histograms.items()):
+        p50, p95, p99 = hist.percentiles(50, 95, 99)
+        stages[name] = {
+            "count": hist.count,
+            "p50_ms": p50 * 1e3,
+            "p95_ms": p95 * 1e3,
+            "p99_ms": p99 * 1e3,
+            "max_ms": hist.max * 1e3,
+        }
+    rss, peak = memory_bytes()
+    return {"stages": stages, "sessions": active_sessions(), "rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+# ---------- PROMETHEUS ----------
+def render_prometheus() -> str:
+    data = snapshot()
+    lines = [
+        "# HELP sentinel_stage_seconds Time spent per stage (recent window quantiles).",
+        "# TYPE sentinel_stage_seconds summary",
+    ]
+    for name, hist in sorted(_histograms.items()):
+        for q, value in zip(("0.5", "0.95", "0.99"), hist.percentiles(50, 95, 99)):
+            lines.append(f'sentinel_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'sentinel_stage_seconds_sum{{stage="{name}"}} {hist.total:.6f}')
+        lines.append(f'sentinel_stage_seconds_count{{stage="{name}"}} {hist.count}')
+    lines += [
+        "# HELP sentinel_active_sessions Sessions with a rerun in the last 15 minutes.",
+        "# TYPE sentinel_active_sessions gauge",
+        f"sentinel_active_sessions {data['sessions']}",
+        "# HELP sentinel_resident_memory_bytes Resident memory of the server process.",
+        "# TYPE sentinel_resident_memory_bytes gauge",
+        f"sentinel_resident_memory_bytes {data['rss_bytes']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+_last_write = 0.0
+
+
+def maybe_write_prometheus():
+    """Refresh SENTINEL_METRICS_PATH, at most every PROMETHEUS_INTERVAL seconds."""
+    global _last_write
+    path = os.environ.get("SENTINEL_METRICS_PATH")
+    now = time.monotonic()
+    if path and enabled and now - _last_write >= PROMETHEUS_INTERVAL:
+        _last_write = now
+        write_prometheus(path)
+
+
+# ---------- SAMPLING PROFILER ----------
+class StackSampler:
+    """
+    One daemon thread that samples the stacks of the threads currently inside
+    profile_rerun() and counts them as folded stacks.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._thread = None
+
+    def start(self, thread_id: int):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counts in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[fold(frame)] += 1
+
+
+def fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_sampler = None
+
+
+@contextmanager
+def profile_rerun(label: str = "rerun"):
+    """Sample this thread while the block runs; dump folded stacks if it was slow."""
+    threshold = os.environ.get("SENTINEL_PROFILE_SLOW_MS")
+    if not threshold:
+        yield
+        return
+
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler()
+    thread_id = threading.get_ident()
+    start = time.perf_counter()
+    _sampler.start(thread_id)
+    try:
+        yield
+    finally:
+        counts = _sampler.stop(thread_id)
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        if elapsed_ms >= float(threshold) and counts:
+            directory = os.environ.get("SENTINEL_PROFILE_DIR", "profiles")
+            os.makedirs(directory, exist_ok=True)
+            name = f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed_ms)}ms.folded"
+            with open(os.path.join(directory, name), "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,739 @@
+"""
+Process-wide player injury store.
+
+Streamlit re-executes app.py on every rerun, but imported modules stay loaded,
+so the store created here is shared by every session in the process. Edits made
+by a Team Physician are visible to all staff immediately, and (optionally) they
+are persisted to a SQLite file in WAL mode so they survive a restart.
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+# ---------- FICTIONAL SENTINEL PLAYERS ----------
+SENTINEL_PLAYERS = [
+    {
+        "number": 1,
+        "name": "Marcus Reed",
+        "position": "QB",
+        "injury": "Right shoulder strain",
+        "status": "Day-to-day – limited throws only",
+    },
+    {
+        "number": 22,
+        "name": "Devin Cole",
+        "position": "RB",
+        "injury": "Left hamstring tightness",
+        "status": "Limited practice – no full-speed cuts",
+    },
+    {
+        "number": 11,
+        "name": "Tyler Brooks",
+        "position": "WR",
+        "injury": "Concussion (Phase 2)",
+        "status": "Non-contact drills only",
+    },
+    {
+        "number": 17,
+        "name": "Jalen Ortiz",
+        "position": "WR",
+        "injury": "Right ankle sprain",
+        "status": "Out 1–2 weeks – rehab only",
+    },
+    {
+        "number": 85,
+        "name": "Cameron Price",
+        "position": "TE",
+        "injury": "Rib contusion",
+        "status": "No live contact, individual periods only",
+    },
+    {
+        "number": 52,
+        "name": "Malik Harris",
+        "position": "LB",
+        "injury": "Patellar tendinitis (right knee)",
+        "status": "Practice reps managed – no back-to-back full days",
+    },
+    {
+        "number": 24,
+        "name": "Isaiah Grant",
+        "position": "CB",
+        "injury": "Groin strain",
+        "status": "Day-to-day – avoid long sprints",
+    },
+    {
+        "number": 33,
+        "name": "Andre Walker",
+        "position": "S",
+        "injury": "Fractured right thumb",
+        "status": "Club cast – can practice, monitor contact",
+    },
+    {
+        "number": 72,
+        "name": "Logan Hayes",
+        "position": "LT",
+        "injury": "Lower back spasms",
+        "status": "Questionable – limited team periods",
+    },
+    {
+        "number": 90,
+        "name": "Jordan Fox",
+        "position": "DE",
+        "injury": "Calf strain",
+        "status": "Individual drills only, no full-speed rushes",
+    },
+    {
+        "number": 3,
+        "name": "Eli Summers",
+        "position": "K",
+        "injury": "Right quad strain",
+        "status": "Short-range kicks only, no max effort",
+    },
+    {
+        "number": 60,
+        "name": "Nate Dawson",
+        "position": "C",
+        "injury": "Left hand sprain",
+        "status": "Full participation with taped support",
+    },
+]
+
+PLAYER_STREAM = "players"  # shared-state stream of committed update batches
+SNAPSHOT_STREAM = "players:snapshot"  # shared-state stream of whole-roster snapshots
+SNAPSHOT_EVERY = 256  # shared batches between snapshots
+PLAYER_FIELDS = ("number", "name", "position", "injury", "status", "last_updated", "player_id")
+EDITABLE_FIELDS = ("name", "position", "injury", "status")
+
+# Status text is free-form, so the secondary index works on a coarse category.
+# First match wins, so the more severe categories come first.
+STATUS_CATEGORIES = [
+    ("out", re.compile(r"\bout\b|\bruled out\b|\binjured reserve\b|\bir\b")),
+    ("questionable", re.compile(r"\bquestionable\b|\bdoubtful\b")),
+    ("day-to-day", re.compile(r"\bday[- ]to[- ]day\b")),
+    ("full", re.compile(r"\bfull participation\b|\bcleared\b")),
+    (
+        "limited",
+        re.compile(
+            r"\blimited\b|\bnon-contact\b|\bno live contact\b|\bindividual\b"
+            r"|\bmanaged\b|\bonly\b|\bmonitor\b"
+        ),
+    ),
+]
+
+
+def status_category(status: str) -> str:
+    lower = (status or "").lower()
+    for category, pattern in STATUS_CATEGORIES:
+        if pattern.search(lower):
+            return category
+    return "other"
+
+
+STAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def now_str() -> str:
+    return datetime.now().strftime(STAMP_FORMAT)
+
+
+def stamp_time(stamp: str) -> float:
+    """Epoch seconds for a last_updated stamp, or 0.0 if it cannot be read."""
+    try:
+        return datetime.strptime(stamp, STAMP_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _intern(value) -> str:
+    return sys.intern(str(value).strip()) if value is not None else ""
+
+
+class PlayerRecord:
+    """
+    One roster row. A full organisation roster holds thousands of these, so
+    they use slots instead of a dict each, and the columns that repeat across
+    players (position, injury, status, last_updated) are interned: every "WR"
+    or "Full participation" on the roster is the same string object.
+    Records are never modified once stored; an update builds a new one.
+    """
+
+    __slots__ = PLAYER_FIELDS
+
+    def __init__(self, number, name, position, injury="", status="", last_updated="", player_id=None):
+        self.number = int(number)
+        self.name = str(name)
+        self.position = _intern(str(position).upper())
+        self.injury = _intern(injury)
+        self.status = _intern(status)
+        self.last_updated = _intern(last_updated)
+        self.player_id = str(player_id) if player_id not in (None, "") else None
+
+    @classmethod
+    def from_mapping(cls, p) -> "PlayerRecord":
+        return cls(**{field: p.get(field) for field in PLAYER_FIELDS if p.get(field) is not None})
+
+    def replace(self, **fields) -> "PlayerRecord":
+        values = self.as_dict()
+        values.update(fields)
+        return PlayerRecord(**values)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in PLAYER_FIELDS}
+
+    def as_row(self) -> tuple:
+        return tuple(getattr(self, field) for field in PLAYER_FIELDS)
+
+
+def name_tokens(name: str) -> list[str]:
+    return [t for t in re.split(r"[^a-z0-9']+", name.lower()) if t]
+
+
+class PlayerStore:
+    """
+    Roster keyed by jersey number, with secondary indexes on player id,
+    position, status category and name tokens. All reads return copies and all
+    writes go through a single lock, so callers never see a half-applied update.
+
+    Every version of every player is kept: an update appends a new immutable
+    record to that player's timeline instead of overwriting the old one.
+    Versions share their unchanged (interned) strings, so a version costs one
+    slotted record and a timestamp. Timelines are sorted by time, so
+    point-in-time reads are a bisect per player, and a global, time-ordered
+    list of updates answers "what changed since ..." by slicing.
+    """
+
+    def __init__(self, players=None, path: str | None = None, shared=None):
+        self._lock = threading.RLock()
+        self._players = {}  # number -> PlayerRecord (primary index, roster order)
+        self._ord = {}  # number -> roster position, for stable ordering
+        self._by_id = {}  # player id -> number
+        self._by_position = {}  # position -> set of numbers
+        self._by_status = {}  # status category -> set of numbers
+        self._names = []  # sorted (name token, number), for prefix search
+        self._revisions = {}  # number -> store version of that player's last change
+        self._history = {}  # number -> ([recorded_at, ...], [PlayerRecord, ...]), oldest first
+        self._change_times = []  # recorded_at of every update, in order
+        self._changes = []  # (number, index into that player's timeline), parallel to _change_times
+        self._last_at = 0.0
+        self._version = 0
+        self._listeners = []
+        self._conn = None
+        self._shared = shared  # shared_state implementation, when workers share the roster
+        self._shared_seq = 0  # last shared batch applied
+        self._own = set()  # sequence numbers of shared batches this worker appended
+
+        self._load(players, path)
+        if shared is not None:
+            self.sync(replaying=self._conn is not None)
+
+    def _load(self, players, path: str | None):
+        if path:
+            self._conn = self._open_db(path)
+            rows = self._conn.execute(
+                f"SELECT {', '.join(PLAYER_FIELDS)} FROM players ORDER BY ord"
+            ).fetchall()
+            if rows:
+                for row in rows:
+                    self._index(PlayerRecord(*row))
+                self._load_history()
+                return
+
+        stamp = now_str()
+        if self._conn is not None:
+            self._conn.execute("BEGIN")
+        try:
+            for p in players if players is not None else SENTINEL_PLAYERS:
+                record = p if isinstance(p, PlayerRecord) else PlayerRecord.from_mapping(p)
+                if record.number in self._players:
+                    raise ValueError(f"Duplicate player number {record.number}")
+                if not record.last_updated:
+                    record = record.replace(last_updated=stamp)
+                self._index(record)
+                self._persist(record)
+                self._record_baseline(record)
+        except BaseException:
+            if self._conn is not None:
+                self._conn.execute("ROLLBACK")
+            raise
+        if self._conn is not None:
+            self._conn.execute("COMMIT")
+
+    # ----- persistence -----
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS players (
+                number INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                position TEXT NOT NULL,
+                injury TEXT NOT NULL,
+                status TEXT NOT NULL,
+                last_updated TEXT NOT NULL,
+                player_id TEXT,
+                ord INTEGER NOT NULL
+            )
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(players)")}
+        if "player_id" not in columns:  # files written before player ids existed
+            conn.execute("ALTER TABLE players ADD COLUMN player_id TEXT")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS player_history (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at REAL NOT NULL,
+                number INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                position TEXT NOT NULL,
+                injury TEXT NOT NULL,
+                status TEXT NOT NULL,
+                last_updated TEXT NOT NULL,
+                player_id TEXT
+            )
+            """
+        )
+        return conn
+
+    def _load_history(self):
+        rows = self._conn.execute(
+            f"SELECT recorded_at, {', '.join(PLAYER_FIELDS)} FROM player_history ORDER BY seq"
+        ).fetchall()
+        for row in rows:
+            self._append_version(PlayerRecord(*row[1:]), row[0])
+        # players without a history yet (files written before it was kept)
+        for record in self._players.values():
+            if record.number not in self._history:
+                self._record_baseline(record)
+
+    def _persist_version(self, record: PlayerRecord, recorded_at: float):
+        if self._conn is None:
+            return
+        self._conn.execute(
+            f"INSERT INTO player_history (recorded_at, {', '.join(PLAYER_FIELDS)}) "
+            f"VALUES ({', '.join('?' * (len(PLAYER_FIELDS) + 1))})",
+            (recorded_at,) + record.as_row(),
+        )
+
+    # ----- history -----
+    def _append_version(self, record: PlayerRecord, recorded_at: float):
+        times, versions = self._history.setdefault(record.number, ([], []))
+        if versions:
+            self._change_times.append(recorded_at)
+            self._changes.append((record.number, len(versions)))
+        times.append(recorded_at)
+        versions.append(record)
+        self._last_at = max(self._last_at, recorded_at)
+
+    def _record_baseline(self, record: PlayerRecord):
+        """
+        A player's first version, dated from its last_updated stamp. It stands
+        for the player's state at any earlier time too, since nothing older
+        is known.
+        """
+        recorded_at = stamp_time(record.last_updated)
+        self._append_version(record, recorded_at)
+        self._persist_version(record, recorded_at)
+
+    def _persist(self, record: PlayerRecord):
+        if self._conn is None:
+            return
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO players ({', '.join(PLAYER_FIELDS)}, ord) "
+            f"VALUES ({', '.join('?' * (len(PLAYER_FIELDS) + 1))})",
+            record.as_row() + (self._ord[record.number],),
+        )
+
+    # ----- indexes -----
+    def _index(self, record: PlayerRecord):
+        number = record.number
+        self._ord.setdefault(number, len(self._ord))
+        self._revisions.setdefault(number, self._version)
+        self._players[number] = record
+        if record.player_id is not None:
+            self._by_id[record.player_id] = number
+        self._by_position.setdefault(record.position, set()).add(number)
+        self._by_status.setdefault(status_category(record.status), set()).add(number)
+        for token in set(name_tokens(record.name)):
+            insort(self._names, (token, number))
+
+    def _unindex(self, record: PlayerRecord):
+        number = record.number
+        if record.player_id is not None:
+            self._by_id.pop(record.player_id, None)
+        self._by_position.get(record.position, set()).discard(number)
+        self._by_status.get(status_category(record.status), set()).discard(number)
+        for token in set(name_tokens(record.name)):
+            i = bisect_left(self._names, (token, number))
+            if i < len(self._names) and self._names[i] == (token, number):
+                del self._names[i]
+
+    # ----- reads -----
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, number) -> bool:
+        return number in self._players
+
+    def get(self, number: int) -> dict | None:
+        record = self._players.get(number)
+        return record.as_dict() if record else None
+
+    def get_by_id(self, player_id: str) -> dict | None:
+        with self._lock:
+            number = self._by_id.get(str(player_id))
+            return self.get(number) if number is not None else None
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            return [p.as_dict() for p in self._players.values()]
+
+    def numbers(self) -> list[int]:
+        with self._lock:
+            return list(self._players)
+
+    def revision(self, number: int) -> int | None:
+        """Store version of the player's last change (lock-free)."""
+        return self._revisions.get(number)
+
+    def revisions(self) -> tuple[int, list[tuple[int, int]]]:
+        """
+        (store version, [(number, revision), ...] in roster order). Callers that
+        cache per-player output re-render only numbers whose revision moved.
+        """
+        with self._lock:
+            return self._version, [(n, self._revisions[n]) for n in self._players]
+
+    def by_position(self, position: str) -> list[dict]:
+        with self._lock:
+            return self._collect(self._by_position.get(position.upper(), ()))
+
+    def by_status(self, category: str) -> list[dict]:
+        with self._lock:
+            return self._collect(self._by_status.get(category, ()))
+
+    def _collect(self, numbers) -> list[dict]:
+        return [self._players[n].as_dict() for n in sorted(numbers, key=self._ord.__getitem__)]
+
+    def positions(self) -> list[str]:
+        with self._lock:
+            return [pos for pos, numbers in self._by_position.items() if numbers]
+
+    def _name_prefix(self, prefix: str) -> set[int]:
+        names = self._names
+        matches = set()
+        i = bisect_left(names, (prefix,))
+        while i < len(names) and names[i][0].startswith(prefix):
+            matches.add(names[i][1])
+            i += 1
+        return matches
+
+    def search(self, query: str, limit: int = 50) -> list[dict]:
+        """
+        Players for a picker, in roster order: an exact number ("52", "#52"),
+        player id or position code, or players whose name has a word starting
+        with each word of the query ("mar re" finds Marcus Reed). An empty
+        query returns the first `limit` players.
+        """
+        query = (query or "").strip()
+        with self._lock:
+            if not query:
+                return [p.as_dict() for p, _ in zip(self._players.values(), range(limit))]
+
+            exact = []
+            number = query.lstrip("#")
+            if number.isdigit() and int(number) in self._players:
+                exact.append(int(number))
+            if query in self._by_id and self._by_id[query] not in exact:
+                exact.append(self._by_id[query])
+
+            words = name_tokens(query)
+            matches = set(self._by_position.get(query.upper(), ()))
+            if words:
+                named = self._name_prefix(words[0])
+                for word in words[1:]:
+                    if not named:
+                        break
+                    named &= self._name_prefix(word)
+                matches |= named
+            matches.difference_update(exact)
+
+            numbers = exact + sorted(matches, key=self._ord.__getitem__)
+            return [self._players[n].as_dict() for n in numbers[:limit]]
+
+    # ----- history reads -----
+    def history(self, number: int) -> list[dict]:
+        """Every version of a player, oldest first, each with its recorded_at time."""
+        with self._lock:
+            times, versions = self._history.get(number, ((), ()))
+            return [dict(v.as_dict(), recorded_at=t) for t, v in zip(times, versions)]
+
+    def _version_at(self, number: int, when: float) -> PlayerRecord | None:
+        times, versions = self._history.get(number, ((), ()))
+        if not versions:
+            return None
+        i = bisect_right(times, when) - 1
+        return versions[max(i, 0)]
+
+    def get_as_of(self, number: int, when: float) -> dict | None:
+        with self._lock:
+            record = self._version_at(number, when)
+            return record.as_dict() if record else None
+
+    def as_of(self, when: float) -> list[dict]:
+        """The roster as it stood at `when` (epoch seconds), in roster order."""
+        with self._lock:
+            return [self._version_at(n, when).as_dict() for n in self._players]
+
+    def changes_between(self, start: float, end: float | None = None) -> list[dict]:
+        """
+        Updates recorded in [start, end), oldest first, each as
+        {"number", "recorded_at", "before", "after"}. Only the updates in the
+        range are visited.
+        """
+        with self._lock:
+            lo = bisect_left(self._change_times, start)
+            hi = len(self._change_times) if end is None else bisect_left(self._change_times, end)
+            changes = []
+            for i in range(lo, hi):
+                number, index = self._changes[i]
+                versions = self._history[number][1]
+                changes.append(
+                    {
+                        "number": number,
+                        "recorded_at": self._change_times[i],
+                        "before": versions[index - 1].as_dict(),
+                        "after": versions[index].as_dict(),
+                    }
+                )
+            return changes
+
+    def status_since(self, number: int) -> tuple[float, bool] | None:
+        """
+        When the player's current status category began: (recorded_at, known).
+        known is False when it already applied to the first recorded version,
+        so the real start is at or before that time.
+        """
+        with self._lock:
+            times, versions = self._history.get(number, ((), ()))
+            if not versions:
+                return None
+            category = status_category(versions[-1].status)
+            i = len(versions) - 1
+            while i > 0 and status_category(versions[i - 1].status) == category:
+                i -= 1
+            return times[i], i > 0
+
+    # ----- writes -----
+    def add_listener(self, fn):
+        """fn(record) is called, under the store lock, after every update."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def update(self, number: int, **fields) -> dict:
+        """Atomically apply an edit to one player and return the new record."""
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot update field(s): {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            current = self._players.get(number)
+            if current is None:
+                raise KeyError(f"No player with number {number}")
+            return self._commit([current.replace(last_updated=now_str(), **fields)])[0]
+
+    def update_many(self, changes: dict) -> list[dict]:
+        """
+        Apply edits to several players as one batch: {number: {field: value}}.
+        Everything is checked before anything is written, edits that change
+        nothing are skipped, the rows go to SQLite in one transaction and the
+        store version moves once. Returns the new records of the players that
+        changed, in roster order.
+        """
+        for number, fields in changes.items():
+            unknown = set(fields) - set(EDITABLE_FIELDS)
+            if unknown:
+                raise ValueError(f"Cannot update field(s): {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            missing = [n for n in changes if n not in self._players]
+            if missing:
+                raise KeyError(f"No player with number {', '.join(map(str, missing))}")
+
+            stamp = now_str()
+            updated = []
+            for number in sorted(changes, key=self._ord.__getitem__):
+                current = self._players[number]
+                record = current.replace(**changes[number])
+                if record.as_row() != current.as_row():
+                    updated.append(record.replace(last_updated=stamp))
+            return self._commit(updated) if updated else []
+
+    def _commit(self, records: list[PlayerRecord]) -> list[dict]:
+        """
+        Make new records current as one change. With shared state the batch is
+        appended to the shared stream and applied from there, in stream order,
+        so every worker applies every batch in the same order.
+        """
+        # keep timelines sorted even if the wall clock steps back
+        recorded_at = max(time.time(), self._last_at)
+        if self._shared is None:
+            return self._apply(records, recorded_at, persist=True)
+        seq = self._shared.append(
+            PLAYER_STREAM, {"at": recorded_at, "players": [record.as_dict() for record in records]}
+        )
+        self._own.add(seq)
+        self.sync()
+        if seq % SNAPSHOT_EVERY == 0:
+            self._snapshot()
+        return [record.as_dict() for record in records]
+
+    def _apply(self, records: list[PlayerRecord], recorded_at: float, persist: bool) -> list[dict]:
+        if persist and self._conn is not None:
+            self._conn.execute("BEGIN")
+            try:
+                for record in records:
+                    self._persist(record)
+                    self._persist_version(record, recorded_at)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+        self._version += 1
+        for record in records:
+            self._unindex(self._players[record.number])
+            self._index(record)
+            self._append_version(record, recorded_at)
+            self._revisions[record.number] = self._version
+        applied = [record.as_dict() for record in records]
+        for fn in self._listeners:
+            for record in applied:
+                fn(record)
+        return applied
+
+    # ----- shared state -----
+    def _in_history(self, record: PlayerRecord, since: float) -> bool:
+        times, versions = self._history.get(record.number, ((), ()))
+        row = record.as_row()
+        return any(v.as_row() == row for v in versions[bisect_left(times, since):])
+
+    def _snapshot(self):
+        """
+        Write the whole roster as of the last applied batch to the snapshot
+        stream, then drop the batches it covers from the batch stream. The
+        newest two snapshots are kept, in case two workers write one at once.
+        """
+        with self._lock:
+            covered = self._shared_seq
+            seq = self._shared.append(
+                SNAPSHOT_STREAM,
+                {"seq": covered, "at": self._last_at, "players": [r.as_dict() for r in self._players.values()]},
+            )
+        self._shared.trim(SNAPSHOT_STREAM, seq - 1)
+        self._shared.trim(PLAYER_STREAM, covered + 1)
+
+    def _restore_snapshot(self) -> bool:
+        """
+        Catch up from the newest snapshot when the batches after this worker's
+        last one have been trimmed. Players that differ from the snapshot are
+        applied as one change (not persisted: the workers that made the edits
+        wrote them). False when no snapshot gets this worker any further.
+        """
+        last = self._shared.last(SNAPSHOT_STREAM)
+        snapshots = [s for _, s in self._shared.read(SNAPSHOT_STREAM, max(last - 2, 0))]
+        if not snapshots:
+            return False
+        snapshot = max(snapshots, key=lambda s: s["seq"])
+        if snapshot["seq"] <= self._shared_seq:
+            return False
+        records = []
+        for p in snapshot["players"]:
+            record = PlayerRecord.from_mapping(p)
+            current = self._players.get(record.number)
+            if current is not None and current.as_row() != record.as_row():
+                records.append(record)
+        if records:
+            self._apply(records, max(snapshot["at"], self._last_at), persist=False)
+        self._shared_seq = snapshot["seq"]
+        self._own = {seq for seq in self._own if seq > self._shared_seq}
+        return True
+
+    def sync(self, replaying: bool = False) -> int:
+        """
+        Apply the batches other workers appended to the shared stream since the
+        last sync; returns how many were applied. Only this worker's own
+        batches are written to its SQLite file, so a file shared by the
+        workers gets each row once. When the next batch this worker needs has
+        been trimmed away, it starts again from the newest snapshot. No-op
+        without shared state.
+        """
+        if self._shared is None:
+            return 0
+        with self._lock:
+            batches = self._shared.read(PLAYER_STREAM, self._shared_seq)
+            if batches and batches[0][0] > self._shared_seq + 1 and self._restore_snapshot():
+                batches = self._shared.read(PLAYER_STREAM, self._shared_seq)
+            for seq, batch in batches:
+                self._shared_seq = seq
+                records = []
+                for p in batch["players"]:
+                    record = PlayerRecord.from_mapping(p)
+                    if record.number not in self._players:
+                        continue  # a player this worker's roster does not have
+                    if replaying and self._in_history(record, batch["at"]):
+                        continue  # already in the SQLite file this worker started from
+                    records.append(record)
+                if records:
+                    self._apply(records, max(batch["at"], self._last_at), persist=seq in self._own)
+                self._own.discard(seq)
+            return len(batches)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PlayerStore:
+    """
+    Return the process-wide store, creating it on first use. Set
+    SENTINEL_STORE_PATH to a file path to back it with SQLite, and
+    SENTINEL_ROSTER_PATH to a CSV or Parquet roster to start from instead of
+    the demo players (ignored once the SQLite file holds a roster). With
+    SENTINEL_SHARED_STATE set, updates go through the shared stream so every
+    worker sees the same roster.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from shared_state import get_shared_state
+
+                players = None
+                roster_path = os.environ.get("SENTINEL_ROSTER_PATH")
+                if roster_path:
+                    from roster_loader import load_roster
+
+                    players = load_roster(roster_path)
+                _store = PlayerStore(players, path=os.environ.get("SENTINEL_STORE_PATH"), shared=get_shared_state())
+    return _store
+
+
+def set_store(store: PlayerStore) -> PlayerStore:
+    """Swap the process-wide store (benchmarks and roster imports)."""
+    global _store
+    with _store_lock:
+        _store = store
+    return store
@@ -0,0 +1,105 @@
+"""
+Role-based projection of player records.
+
+Each role on the login screen maps to a Policy that says how much of a player
+record its staff may see:
+
+- injury: "full" (the clinical description), "region" (body region only) or
+  "hidden"
+- status: "full" (the availability text) or "category" (out, questionable,
+  limited, ...)
+- last_updated: whether the timestamp is shown
+
+project() applies a policy to one record. Reports are not redacted per
+request: injury_report.ReportCache keeps one materialized view per policy and
+re-projects only the players whose revision moved.
+"""
+from player_store import status_category
+
+
+class Policy:
+    __slots__ = ("name", "injury", "status", "last_updated", "summary")
+
+    def __init__(self, name: str, injury: str, status: str, last_updated: bool, summary: str):
+        self.name = name
+        self.injury = injury
+        self.status = status
+        self.last_updated = last_updated
+        self.summary = summary
+
+    @property
+    def full(self) -> bool:
+        return self.injury == "full" and self.status == "full"
+
+
+CLINICAL = Policy("clinical", "full", "full", True, "full clinical detail")
+COACHING = Policy(
+    "coaching", "region", "full", True,
+    "injuries are shown by body region only; practice availability is shown in full",
+)
+ASSISTANT_COACHING = Policy(
+    "assistant-coaching", "region", "full", False,
+    "injuries are shown by body region only; practice availability is shown in full",
+)
+FRONT_OFFICE = Policy(
+    "front-office", "region", "category", False,
+    "injuries are shown by body region and availability by category only",
+)
+RESTRICTED = Policy("restricted", "hidden", "category", False, "only availability categories are shown")
+
+# the roles offered on the login screen
+ROLE_POLICIES = {
+    "Team Physician": CLINICAL,
+    "Athletic Trainer": CLINICAL,
+    "Head Coach": COACHING,
+    "Assistant Coach": ASSISTANT_COACHING,
+    "Front Office": FRONT_OFFICE,
+}
+
+# first match wins; checked against the lower-cased injury text
+BODY_REGIONS = [
+    ("Head", ("concussion", "head", "neck", "jaw", "eye")),
+    ("Core", ("back", "rib", "abdominal", "oblique", "chest", "spine")),
+    ("Upper body", ("shoulder", "elbow", "wrist", "hand", "thumb", "finger", "arm", "bicep", "tricep", "pec", "collarbone")),
+    ("Lower body", ("hamstring", "knee", "patellar", "acl", "mcl", "ankle", "foot", "toe", "groin", "calf", "quad", "hip", "achilles", "shin", "leg")),
+]
+
+STATUS_LABELS = {
+    "out": "Out",
+    "questionable": "Questionable",
+    "day-to-day": "Day-to-day",
+    "full": "Full participation",
+    "limited": "Limited",
+    "other": "Check with medical staff",
+}
+
+
+def policy_for(role: str | None) -> Policy:
+    """The policy for a role; unknown roles get the most restrictive one."""
+    return ROLE_POLICIES.get(role, RESTRICTED)
+
+
+def body_region(injury: str) -> str:
+    lower = (injury or "").lower()
+    for region, words in BODY_REGIONS:
+        if any(word in lower for word in words):
+            return region
+    return "Undisclosed"
+
+
+def project(p: dict, policy: Policy) -> dict:
+    """A copy of the record with only what the policy allows; hidden fields are left out."""
+    if policy.full and policy.last_updated:
+        return dict(p)
+    view = {"number": p["number"], "name": p["name"], "position": p["position"]}
+    if policy.injury == "full":
+        view["injury"] = p["injury"]
+    elif policy.injury == "region":
+        view["injury"] = body_region(p["injury"])
+    if policy.status == "full":
+        view["status"] = p["status"]
+    else:
+        view["status"] = STATUS_LABELS[status_category(p["status"])]
+    if policy.last_updated:
+        view["last_updated"] = p["last_updated"]
+    return view
@@ -0,0 +1,319 @@
+"""
+Incremental analytics over the query log, for mining FAQs.
+
+QueryAnalytics listens to the query log and folds every new or re-triaged
+question into running aggregates, so nothing ever rescans the log:
+
+- top questions by normalized form (answer_cache.normalize_question, so "List
+  all injuries" and "list injuries please" count as one)
+- near-duplicate clusters of normalized forms, found with MinHash signatures
+  over character shingles and LSH banding; a new form is compared only with
+  the forms sharing one of its band buckets and merged into their cluster
+  (union-find) when its estimated similarity is high enough
+- volume per role, per hour of day and per calendar hour
+- unanswered rate (questions still "new" or "reviewed"), overall and per role
+
+Adding a question costs O(1) amortized: one signature for a form not seen
+before, a few dict updates otherwise. A status change only moves counters.
+
+Also a CLI over a log directory (read-only):
+    python query_analytics.py --log-dir query_log/ --top 20 --clusters 10
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+from answer_cache import normalize_question
+
+OPEN_STATUSES = ("new", "reviewed")  # not answered yet (and not ignored)
+NUM_HASHES = 32
+BANDS = 8  # NUM_HASHES / BANDS rows per band: candidates from ~0.6 Jaccard up
+SIMILARITY = 0.6  # estimated Jaccard needed to join a cluster
+SHINGLE = 4  # characters per shingle
+BUCKET_LIMIT = 8  # forms kept per LSH bucket; more add nothing but cost
+
+_HOUR_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}) (\d{2})")
+_EMPTY = 1 << 32
+
+
+def shingles(text: str) -> set[int]:
+    padded = f" {text} "
+    if len(padded) <= SHINGLE:
+        return {zlib.crc32(padded.encode())}
+    return {zlib.crc32(padded[i:i + SHINGLE].encode()) for i in range(len(padded) - SHINGLE + 1)}
+
+
+def minhash(text: str) -> array:
+    """
+    One-permutation MinHash: each shingle hash goes to one of NUM_HASHES bins
+    and each bin keeps its minimum, so a signature costs one hash per shingle
+    rather than NUM_HASHES. Empty bins borrow from the next filled bin to the
+    right, offset by the distance, so short questions still compare well.
+    """
+    bins = [_EMPTY] * NUM_HASHES
+    for h in shingles(text):
+        i = h % NUM_HASHES
+        value = h // NUM_HASHES
+        if value < bins[i]:
+            bins[i] = value
+    for i in range(NUM_HASHES):
+        if bins[i] == _EMPTY:
+            for step in range(1, NUM_HASHES):
+                value = bins[(i + step) % NUM_HASHES]
+                if value < _EMPTY:
+                    bins[i] = _EMPTY + step * _EMPTY + value  # cannot collide with a filled bin
+                    break
+    return array("Q", bins)
+
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+
+
+class QueryAnalytics:
+    def __init__(self):
+        self.log = None  # the log follow() attached to, if any
+        self._lock = threading.Lock()
+        self._seen = {}  # query id -> (form, role, status)
+        self.total = 0
+        self.forms = Counter()  # normalized form -> questions
+        self.examples = {}  # normalized form -> first question asked in that form
+        self.by_role = Counter()
+        self.by_hour_of_day = Counter()  # 0..23
+        self.by_hour = Counter()  # "YYYY-MM-DD HH"
+        self.by_status = Counter()
+        self.open_by_role = Counter()
+
+        self._signatures = {}  # normalized form -> MinHash signature
+        self._buckets = {}  # (band, band hash) -> forms
+        self._parent = {}  # normalized form -> parent form (union-find)
+        self._cluster_size = Counter()  # root form -> questions in the cluster
+
+    @classmethod
+    def follow(cls, log) -> "QueryAnalytics":
+        """Aggregates over `log`, kept current by a listener."""
+        analytics = cls()
+        # listen first, then load: observe() ignores a question it has already counted
+        analytics.log = log
+        log.add_listener(analytics.observe)
+        for entry in log.entries():
+            analytics.observe(entry)
+        return analytics
+
+    # ----- updates -----
+    def observe(self, entry: dict):
+        """Count a new question, or move the counters of one whose status changed."""
+        with self._lock:
+            q_id = entry["id"]
+            known = self._seen.get(q_id)
+            if known is not None:
+                form, role, status = known
+                new_status = entry.get("status", status)
+                if new_status != status:
+                    self._count_status(role, status, -1)
+                    self._count_status(role, new_status, 1)
+                    self._seen[q_id] = (form, role, new_status)
+                return
+            if "question" not in entry:
+                return  # a patch for a question this view never saw
+
+            form = normalize_question(entry["question"])
+            role, status = entry.get("role") or "Unknown", entry.get("status") or "new"
+            self._seen[q_id] = (form, role, status)
+            self.total += 1
+            self.forms[form] += 1
+            self.examples.setdefault(form, entry["question"])
+            self.by_role[role] += 1
+            self._count_status(role, status, 1)
+            match = _HOUR_RE.match(entry.get("created_at") or "")
+            if match:
+                self.by_hour[f"{match.group(1)} {match.group(2)}"] += 1
+                self.by_hour_of_day[int(match.group(2))] += 1
+
+            if form not in self._signatures:
+                self._add_form(form)
+            self._cluster_size[self._find(form)] += 1
+
+    def observe_record(self, record: dict):
+        """observe() for a raw log record ({"op": "add" | "patch", ...})."""
+        self.observe({k: v for k, v in record.items() if k != "op"})
+
+    def _count_status(self, role: str, status: str, delta: int):
+        self.by_status[status] += delta
+        if status in OPEN_STATUSES:
+            self.open_by_role[role] += delta
+
+    # ----- clustering -----
+    def _find(self, form: str) -> str:
+        parent = self._parent
+        root = form
+        while parent[root] != root:
+            root = parent[root]
+        while parent[form] != root:  # path compression
+            parent[form], form = root, parent[form]
+        return root
+
+    def _union(self, a: str, b: str):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self._cluster_size[root_a] < self._cluster_size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._cluster_size[root_a] += self._cluster_size.pop(root_b, 0)
+
+    def _add_form(self, form: str):
+        signature = minhash(form)
+        self._signatures[form] = signature
+        self._parent[form] = form
+        rows = NUM_HASHES // BANDS
+        for band in range(BANDS):
+            key = (band, hash(tuple(signature[band * rows:(band + 1) * rows])))
+            members = self._buckets.setdefault(key, [])
+            for other in members:
+                if self._find(other) != self._find(form) and similarity(signature, self._signatures[other]) >= SIMILARITY:
+                    self._union(form, other)
+            if len(members) < BUCKET_LIMIT:
+                members.append(form)
+
+    # ----- reads -----
+    @property
+    def unanswered_rate(self) -> float:
+        open_count = sum(self.by_status[s] for s in OPEN_STATUSES)
+        return open_count / self.total if self.total else 0.0
+
+    def top_questions(self, k: int = 20) -> list[dict]:
+        with self._lock:
+            return [
+                {"form": form, "example": self.examples[form], "count": count}
+                for form, count in self.forms.most_common(k)
+            ]
+
+    def clusters(self, k: int = 10, min_forms: int = 2) -> list[dict]:
+        """The k largest clusters with at least `min_forms` distinct forms, most asked forms first."""
+        with self._lock:
+            members = {}
+            for form in self._signatures:
+                members.setdefault(self._find(form), []).append(form)
+            found = []
+            for root, forms in members.items():
+                if len(forms) < min_forms:
+                    continue
+                forms.sort(key=lambda f: -self.forms[f])
+                found.append(
+                    {
+                        "size": self._cluster_size[root],
+                        "label": self.examples[forms[0]],
+                        "forms": [{"form": f, "example": self.examples[f], "count": self.forms[f]} for f in forms],
+                    }
+                )
+        found.sort(key=lambda c: -c["size"])
+        return found[:k]
+
+    def roles(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "role": role,
+                    "questions": count,
+                    "unanswered": self.open_by_role[role],
+                    "unanswered_rate": self.open_by_role[role] / count if count else 0.0,
+                }
+                for role, count in self.by_role.most_common()
+            ]
+
+    def hours(self) -> list[dict]:
+        with self._lock:
+            return [{"hour": hour, "questions": self.by_hour_of_day[hour]} for hour in range(24)]
+
+    def summary(self, top: int = 20, clusters: int = 10) -> dict:
+        return {
+            "questions": self.total,
+            "distinct_forms": len(self.forms),
+            "unanswered_rate": self.unanswered_rate,
+            "by_status": {status: count for status, count in self.by_status.items() if count},
+            "roles": self.roles(),
+            "hours_of_day": self.hours(),
+            "top_questions": self.top_questions(top),
+            "clusters": self.clusters(clusters),
+        }
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_query_analytics() -> QueryAnalytics:
+    """Aggregates over the process-wide query log, rebuilt if the log is swapped."""
+    global _analytics
+    from query_log import get_query_log
+
+    log = get_query_log()
+    if _analytics is None or _analytics.log is not log:
+        with _analytics_lock:
+            if _analytics is None or _analytics.log is not log:
+                _analytics = QueryAnalytics.follow(log)
+    return _analytics
+
+
+# ---------- CLI ----------
+def render_text(summary: dict) -> str:
+    lines = [
+        f"{summary['questions']} questions, {summary['distinct_forms']} distinct forms, "
+        f"{summary['unanswered_rate']:.0%} unanswered",
+        "",
+        "Top questions",
+    ]
+    lines += [f"  {q['count']:6}  {q['example']}" for q in summary["top_questions"]]
+    lines += ["", "Near-duplicate clusters"]
+    for cluster in summary["clusters"]:
+        lines.append(f"  {cluster['size']:6}  {cluster['label']}")
+        lines += [f"          {f['count']:5}  {f['example']}" for f in cluster["forms"][1:6]]
+    lines += ["", "By role (questions, unanswered)"]
+    lines += [f"  {r['questions']:6}  {r['unanswered_rate']:4.0%}  {r['role']}" for r in summary["roles"]]
+    lines += ["", "By hour of day"]
+    peak = max((h["questions"] for h in summary["hours_of_day"]), default=0) or 1
+    lines += [
+        f"  {h['hour']:02d}:00 {h['questions']:6}  {'#' * round(40 * h['questions'] / peak)}"
+        for h in summary["hours_of_day"]
+    ]
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    from query_log import replay_segments
+
+    parser = argparse.ArgumentParser(description="Analyze a Sentinel query log directory.")
+    parser.add_argument(
+        "--log-dir",
+        default=os.environ.get("SENTINEL_QUERY_LOG_DIR"),
+        help="segment directory (default: $SENTINEL_QUERY_LOG_DIR)",
+    )
+    parser.add_argument("--top", type=int, default=20, help="top questions to list")
+    parser.add_argument("--clusters", type=int, default=10, help="near-duplicate clusters to list")
+    parser.add_argument("--json", action="store_true", help="print the aggregates as JSON")
+    args = parser.parse_args(argv)
+    if not args.log_dir or not os.path.isdir(args.log_dir):
+        parser.error("--log-dir must name an existing query log directory")
+
+    analytics = QueryAnalytics()
+    for record in replay_segments(args.log_dir):
+        analytics.observe_record(record)
+    summary = analytics.summary(args.top, args.clusters)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(render_text(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+On-demand export of the query log.
+
+Nothing here runs on an ordinary rerun: the UI calls these functions only when
+someone asks for an export or opens the table. Exports walk the log in keyset
+pages (the same filters as QueryLog.page()), so only the requested slice is
+materialized and output is produced chunk by chunk:
+
+- JSONL and CSV are plain generators of byte chunks.
+- Parquet and Arrow IPC are written one record batch per chunk when pyarrow is
+  installed.
+
+export_file() writes those chunks to an anonymous temporary file and hands it
+back rewound, so an export never sits in memory as one bytes object and is
+only built when the download is actually requested.
+
+QueryFrameCache keeps a pandas DataFrame of the log and brings it up to date
+from QueryLog.changes_since(), so a rerun after one new question patches one
+row instead of rebuilding the frame from every entry.
+"""
+import csv
+import importlib.util
+import io
+import json
+import tempfile
+import threading
+
+EXPORT_FIELDS = ("id", "user", "role", "question", "status", "note", "created_at")
+EXPORT_CHUNK = 1000
+
+
+def iter_chunks(log, chunk_size: int = EXPORT_CHUNK, **filters):
+    """Lists of matching entries, newest first, chunk_size at a time."""
+    cursor = None
+    while True:
+        entries, cursor = log.page(before_id=cursor, limit=chunk_size, **filters)
+        if entries:
+            yield entries
+        if cursor is None:
+            return
+
+
+def stream_jsonl(log, **filters):
+    for chunk in iter_chunks(log, **filters):
+        yield "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in chunk).encode("utf-8")
+
+
+def stream_csv(log, **filters):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in iter_chunks(log, **filters):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _write_chunks(chunks, out):
+    for chunk in chunks:
+        out.write(chunk)
+
+
+def write_jsonl(log, out, **filters):
+    _write_chunks(stream_jsonl(log, **filters), out)
+
+
+def write_csv(log, out, **filters):
+    _write_chunks(stream_csv(log, **filters), out)
+
+
+def arrow_available() -> bool:
+    # looked up, not imported: pyarrow is only loaded when an export needs it
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _arrow_batches(log, **filters):
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [("id", pa.int64())] + [(name, pa.string()) for name in EXPORT_FIELDS if name != "id"]
+    )
+    for chunk in iter_chunks(log, **filters):
+        columns = {name: [e.get(name) for e in chunk] for name in EXPORT_FIELDS}
+        yield schema, pa.record_batch([columns[name] for name in EXPORT_FIELDS], schema=schema)
+
+
+def write_parquet(log, out, **filters):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for schema, batch in _arrow_batches(log, **filters):
+        if writer is None:
+            writer = pq.ParquetWriter(out, schema)
+        writer.write_table(pa.Table.from_batches([batch]))
+    if writer is not None:
+        writer.close()
+
+
+def write_arrow(log, out, **filters):
+    import pyarrow as pa
+
+    writer = None
+    for schema, batch in _arrow_batches(log, **filters):
+        if writer is None:
+            writer = pa.ipc.new_stream(out, schema)
+        writer.write_batch(batch)
+    if writer is not None:
+        writer.close()
+
+
+# format -> (label, file extension, mime type, function writing the export to a binary file)
+EXPORT_FORMATS = {
+    "jsonl": ("JSON Lines", "jsonl", "application/x-ndjson", write_jsonl),
+    "csv": ("CSV", "csv", "text/csv", write_csv),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet", write_parquet),
+    "arrow": ("Arrow IPC", "arrow", "application/vnd.apache.arrow.stream", write_arrow),
+}
+
+
+def export_file(log, export_format: str, **filters):
+    """
+    The export written to an anonymous temporary file, rewound. The file is
+    returned unbuffered (io.FileIO), which st.download_button accepts; it is
+    deleted once closed.
+    """
+    out = tempfile.TemporaryFile()
+    try:
+        EXPORT_FORMATS[export_format][3](log, out, **filters)
+        raw = out.detach()  # flushes the buffer
+    except BaseException:
+        out.close()
+        raise
+    raw.seek(0)
+    return raw
+
+
+def available_formats() -> list[str]:
+    if arrow_available():
+        return list(EXPORT_FORMATS)
+    return ["jsonl", "csv"]
+
+
+class QueryFrameCache:
+    """
+    A DataFrame of the whole log, indexed by id, brought up to date from the
+    log's change history. A frame handed out is never modified afterwards:
+    updates produce a new frame, so concurrent sessions can share the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.log = None
+        self.version = None
+        self.frame = None
+
+    def get(self, log):
+        import pandas as pd
+
+        with self._lock:
+            if self.frame is not None and self.log is log:
+                version, changed = log.changes_since(self.version)
+                if changed is not None:
+                    if changed:
+                        rows = pd.DataFrame(log.snapshot(changed), columns=EXPORT_FIELDS).set_index("id")
+                        frame = self.frame
+                        existing = rows.index.intersection(frame.index)
+                        if len(existing):
+                            frame = frame.copy()
+                            frame.loc[existing, rows.columns] = rows.loc[existing]
+                        new = rows.index.difference(frame.index)
+                        if len(new):
+                            frame = pd.concat([frame, rows.loc[new]])
+                        self.frame = frame
+                    self.version = version
+                    return self.frame
+
+            self.log = log
+            self.version = log.version
+            self.frame = pd.DataFrame(log.entries(), columns=EXPORT_FIELDS).set_index("id")
+            return self.frame
+
+
+_frame_cache = QueryFrameCache()
+
+
+def get_query_frame(log):
+    return _frame_cache.get(log)
@@ -0,0 +1,633 @@
+"""
+Append-only query log.
+
+Every logged question and every later status/note change is written as a new
+record; nothing is rewritten in place. The log keeps one materialized view in
+memory for the UI and hands records to a pluggable backend for durability:
+
+- MemoryBackend: the default, nothing leaves the process.
+- SegmentedFileBackend: JSONL segment files written by a background thread
+  with group commit (one fsync per batch), so a chat send never waits on disk.
+- SharedBackend: a shared_state stream and counter, so several app workers
+  write one log with one increasing id sequence; QueryLog.sync() applies what
+  the other workers wrote.
+
+Record shapes (one JSON object per line on disk):
+    {"op": "add", "id": 7, "user": ..., "role": ..., "question": ..., "status": ..., "note": ..., "created_at": ...}
+    {"op": "patch", "id": 7, "status": "reviewed", "note": "...", "at": ...}
+"""
+import bisect
+import collections
+import fcntl
+import itertools
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+QUERY_STATUSES = ["new", "reviewed", "answered", "ignored"]
+PATCHABLE_FIELDS = ("status", "note")
+CHANGE_HISTORY = 10_000  # how many recent changes changes_since() can replay
+ID_BLOCK = 64  # ids a FileIdAllocator reserves from its file at a time
+
+
+# ---------- ID ALLOCATORS ----------
+class MemoryIdAllocator:
+    def __init__(self, start: int = 1):
+        self._counter = itertools.count(start)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._counter)
+
+    def ensure_above(self, last_id: int):
+        with self._lock:
+            self._counter = itertools.count(max(next(self._counter), last_id + 1))
+
+
+class FileIdAllocator:
+    """
+    Counter stored in a small file and guarded by flock, so every session and
+    every process writing to the same log directory gets a unique id. Ids are
+    reserved from the file `block` at a time, so only one send in `block`
+    touches the file; they increase within a process, and a block left unused
+    when the process exits is skipped.
+    """
+
+    def __init__(self, path: str, block: int = ID_BLOCK):
+        self.path = path
+        self.block = block
+        self._lock = threading.Lock()
+        self._next = 1
+        self._limit = 0  # last id of the reserved block
+        # "a+" creates the file without truncating an existing counter
+        with open(self.path, "a+"):
+            pass
+
+    def _update(self, fn) -> int:
+        with open(self.path, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read().strip()
+                value = fn(int(raw) if raw else 0)
+                f.seek(0)
+                f.truncate()
+                f.write(str(value))
+                f.flush()
+                return value
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next > self._limit:
+                self._limit = self._update(lambda last: last + self.block)
+                self._next = self._limit - self.block + 1
+            q_id = self._next
+            self._next += 1
+            return q_id
+
+    def ensure_above(self, last_id: int):
+        with self._lock:
+            self._update(lambda last: max(last, last_id))
+            if self._next <= last_id:
+                self._next, self._limit = 1, 0  # the rest of the block is stale; reserve anew
+
+
+class SharedIdAllocator:
+    """Ids from a shared_state counter: unique and increasing across every worker using it."""
+
+    def __init__(self, state, counter: str):
+        self.state = state
+        self.counter = counter
+
+    def next_id(self) -> int:
+        return self.state.incr(self.counter)
+
+    def ensure_above(self, last_id: int):
+        self.state.raise_to(self.counter, last_id)
+
+
+# ---------- BACKENDS ----------
+class MemoryBackend:
+    """Keeps nothing beyond the materialized view; useful for demos and tests."""
+
+    def __init__(self):
+        self.id_allocator = MemoryIdAllocator()
+
+    def append(self, record: dict):
+        pass
+
+    def replay(self):
+        return iter(())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SegmentedFileBackend:
+    """
+    Append-only JSONL segments in a directory (segment-000001.jsonl, ...).
+
+    append() only puts the record on a queue. A background writer drains the
+    queue in batches, writes the whole batch, then fsyncs once (group commit).
+    A batch is cut after commit_interval, however slowly records trickle in.
+    A segment is closed and a new one started once it grows past
+    segment_bytes.
+
+    A failed commit is reported on stderr and in errors/last_error; its
+    records are retried with the next batch, and flush() returns False while
+    any are still unwritten.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 4 * 1024 * 1024,
+        max_batch: int = 512,
+        commit_interval: float = 0.05,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_batch = max_batch
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.id_allocator = FileIdAllocator(os.path.join(directory, "ids.seq"))
+
+        self._queue = queue.Queue()
+        self._unwritten = []  # encoded records of failed commits, retried first
+        self.errors = 0
+        self.last_error = None
+        self._file = None
+        existing = self._segments()
+        self._segment_no = existing[-1][0] if existing else 0
+        self._open_segment(new=not existing)
+
+        self._writer = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._writer.start()
+
+    # ----- segment files -----
+    def _segments(self) -> list[tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".jsonl"):
+                found.append((int(name[len("segment-"):-len(".jsonl")]), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _open_segment(self, new: bool):
+        if self._file is not None:
+            self._file.close()
+        if new:
+            self._segment_no += 1
+        path = os.path.join(self.directory, f"segment-{self._segment_no:06d}.jsonl")
+        self._file = open(path, "ab")
+
+    def replay(self):
+        return replay_segments(self.directory)
+
+    # ----- writer thread -----
+    def append(self, record: dict):
+        self._queue.put(record)
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.commit_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                self._commit(batch)
+            except Exception as exc:  # keep the writer alive; the records are retried
+                self.errors += 1
+                self.last_error = exc
+                print(f"query log: commit of {len(self._unwritten)} records failed: {exc!r}", file=sys.stderr)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+    def _commit(self, batch: list):
+        lines = self._unwritten
+        lines += [
+            json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n"
+            for item in batch
+            if not isinstance(item, threading.Event)
+        ]
+        if not lines:
+            return
+        start = self._file.tell()
+        try:
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            try:
+                self._file.truncate(start)  # no torn half-batch ahead of the retry
+            except OSError:
+                pass
+            raise
+        self._unwritten = []
+        self.last_error = None
+        if self._file.tell() >= self.segment_bytes:
+            self._open_segment(new=True)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every record appended so far is on disk; False if it is not."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) and not self._unwritten
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class SharedBackend:
+    """
+    Records in a shared_state stream. Each worker appends its own records and
+    picks up everyone else's with poll(); its own come back from the stream
+    too and are skipped, since the log has applied them already.
+    """
+
+    def __init__(self, state, stream: str = "query_log"):
+        self.state = state
+        self.stream = stream
+        self.id_allocator = SharedIdAllocator(state, f"{stream}:ids")
+        self._cursor = 0
+        self._own = set()  # sequence numbers of records this worker appended, not yet polled
+
+    def append(self, record: dict):
+        self._own.add(self.state.append(self.stream, record))
+
+    def replay(self):
+        for seq, record in self.state.read(self.stream, self._cursor):
+            self._cursor = seq
+            yield record
+
+    def poll(self) -> list[dict]:
+        """Records other workers appended since the last replay or poll."""
+        records = []
+        for seq, record in self.state.read(self.stream, self._cursor):
+            self._cursor = seq
+            if seq in self._own:
+                self._own.discard(seq)
+            else:
+                records.append(record)
+        return records
+
+    def flush(self, timeout: float | None = None) -> bool:
+        return True  # appends are committed before append() returns
+
+    def close(self):
+        pass
+
+
+def replay_segments(directory: str):
+    """Every record in a segment directory, oldest first, without opening it for writing."""
+    names = [n for n in os.listdir(directory) if n.startswith("segment-") and n.endswith(".jsonl")]
+    for name in sorted(names, key=lambda n: int(n[len("segment-"):-len(".jsonl")])):
+        with open(os.path.join(directory, name), "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # torn final line after a crash; everything before it is intact
+                    break
+
+
+# ---------- SECONDARY INDEXES ----------
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _insert_sorted(ids: list, q_id: int):
+    if not ids or ids[-1] < q_id:
+        ids.append(q_id)  # the usual case: ids arrive in increasing order
+    else:
+        i = bisect.bisect_left(ids, q_id)
+        if i == len(ids) or ids[i] != q_id:
+            ids.insert(i, q_id)
+
+
+def _remove_sorted(ids: list, q_id: int):
+    i = bisect.bisect_left(ids, q_id)
+    if i < len(ids) and ids[i] == q_id:
+        del ids[i]
+
+
+class QueryIndex:
+    """
+    Sorted id lists per status, role, user and search word, plus every entry
+    sorted by (created_at, id), kept in step with every add and patch. A page
+    is read by walking the most selective list backwards from a keyset cursor
+    and checking the remaining filters on each entry, so it costs about a
+    page's worth of entries instead of a pass over the whole log.
+
+    Ids do not follow created_at: processes reserve ids in blocks, so one can
+    log id 70 before another logs id 10. Date ranges are therefore looked up
+    in the date list, never by bisecting ids.
+    """
+
+    def __init__(self):
+        self.ids = []  # every id, ascending
+        self.by_date = []  # (created_at, id), ascending
+        self.by_status = {}
+        self.by_role = {}
+        self.by_user = {}
+        self.by_word = {}  # word -> ids whose question or note contained it
+        self.by_question_word = {}  # word -> ids whose question contains it, for viewers without notes
+
+    @staticmethod
+    def words(text: str) -> set[str]:
+        return set(WORD_RE.findall((text or "").lower()))
+
+    def add(self, entry: dict):
+        q_id = entry["id"]
+        i = bisect.bisect_left(self.ids, q_id)
+        self.ids.insert(i, q_id)
+        bisect.insort(self.by_date, (entry["created_at"], q_id))
+        _insert_sorted(self.by_status.setdefault(entry["status"], []), q_id)
+        _insert_sorted(self.by_role.setdefault(entry["role"], []), q_id)
+        _insert_sorted(self.by_user.setdefault(entry["user"], []), q_id)
+        question_words = self.words(entry["question"])
+        for word in question_words | self.words(entry.get("note")):
+            _insert_sorted(self.by_word.setdefault(word, []), q_id)
+        for word in question_words:
+            _insert_sorted(self.by_question_word.setdefault(word, []), q_id)
+
+    def patch(self, before: dict, after: dict):
+        q_id = after["id"]
+        if before["status"] != after["status"]:
+            _remove_sorted(self.by_status.get(before["status"], []), q_id)
+            _insert_sorted(self.by_status.setdefault(after["status"], []), q_id)
+        # stale note words are left in place; page() re-checks the entry itself
+        for word in self.words(after.get("note")) - self.words(before.get("note")):
+            _insert_sorted(self.by_word.setdefault(word, []), q_id)
+
+    def date_span(self, date_from: str | None, date_to: str | None) -> tuple[int, int]:
+        """Slice of by_date for a YYYY-MM-DD date range (either end optional)."""
+        lo = bisect.bisect_left(self.by_date, (date_from,)) if date_from else 0
+        hi = bisect.bisect_left(self.by_date, (date_to + " 99:99",)) if date_to else len(self.by_date)
+        return lo, max(lo, hi)
+
+    def ids_dated(self, lo: int, hi: int) -> list[int]:
+        """Ids of by_date[lo:hi], ascending."""
+        return sorted(q_id for _, q_id in self.by_date[lo:hi])
+
+
+# ---------- QUERY LOG ----------
+class QueryLog:
+    """
+    Process-wide query database. Writes are appended to the backend; reads are
+    served from an in-memory view rebuilt from the backend at startup.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self._lock = threading.Lock()
+        self._entries = {}  # id -> entry, in id order
+        self._index = QueryIndex()
+        self._version = 0
+        self._changes = collections.deque(maxlen=CHANGE_HISTORY)  # (version, id)
+        self._listeners = []
+
+        last_id = 0
+        for record in self.backend.replay():
+            self._apply(record)
+            last_id = max(last_id, record.get("id", 0))
+        self.backend.id_allocator.ensure_above(last_id)
+
+    def _apply(self, record: dict):
+        op = record.get("op")
+        if op == "add":
+            entry = {k: v for k, v in record.items() if k != "op"}
+            self._entries[entry["id"]] = entry
+            self._index.add(entry)
+        elif op == "patch" and record.get("id") in self._entries:
+            entry = self._entries[record["id"]]
+            before = dict(entry)
+            for field in PATCHABLE_FIELDS:
+                if field in record:
+                    entry[field] = record[field]
+            self._index.patch(before, entry)
+        else:
+            return
+        self._version += 1
+        self._changes.append((self._version, record["id"]))
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_listener(self, fn):
+        """fn(entry) is called, under the log lock, after every add or patch."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def _notify(self, q_id: int):
+        entry = self._entries[q_id]
+        for fn in self._listeners:
+            fn(dict(entry))
+
+    def log(self, user: str, role: str, question: str, status: str = "new", note: str = "") -> int:
+        with self._lock:
+            q_id = self.backend.id_allocator.next_id()
+            record = {
+                "op": "add",
+                "id": q_id,
+                "user": user,
+                "role": role,
+                "question": question,
+                "status": status,  # new | reviewed | answered | ignored
+                "note": note,
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            }
+            self._apply(record)
+            self.backend.append(record)
+            self._notify(q_id)
+        return q_id
+
+    def update(self, q_id: int, status: str, note: str):
+        record = {
+            "op": "patch",
+            "id": q_id,
+            "status": status,
+            "note": note,
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        }
+        with self._lock:
+            if q_id not in self._entries:
+                raise KeyError(f"No query with id {q_id}")
+            self._apply(record)
+            self.backend.append(record)
+            self._notify(q_id)
+
+    def sync(self) -> int:
+        """
+        Apply records other workers wrote, when the backend is shared; returns
+        how many were applied.
+        """
+        poll = getattr(self.backend, "poll", None)
+        if poll is None:
+            return 0
+        with self._lock:
+            records = poll()
+            for record in records:
+                self._apply(record)
+                if record.get("id") in self._entries:
+                    self._notify(record["id"])
+            return len(records)
+
+    def get(self, q_id: int) -> dict | None:
+        entry = self._entries.get(q_id)
+        return dict(entry) if entry else None
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return [dict(e) for e in self._entries.values()]
+
+    def changes_since(self, version: int) -> tuple[int, list[int] | None]:
+        """
+        (current version, ids added or patched after `version`, oldest first).
+        The id list is None when `version` is too old to replay, in which case
+        the caller should rebuild from entries().
+        """
+        with self._lock:
+            if version == self._version:
+                return version, []
+            if not self._changes or self._changes[0][0] > version + 1:
+                return self._version, None
+            start = bisect.bisect_right(self._changes, (version, float("inf")))
+            ids = list(dict.fromkeys(q_id for _, q_id in itertools.islice(self._changes, start, None)))
+            return self._version, ids
+
+    def snapshot(self, ids) -> list[dict]:
+        with self._lock:
+            return [dict(self._entries[q_id]) for q_id in ids if q_id in self._entries]
+
+    def distinct(self, field: str) -> list[str]:
+        """Known values of status, role or user, for filter dropdowns."""
+        lists = {"status": self._index.by_status, "role": self._index.by_role, "user": self._index.by_user}[field]
+        with self._lock:
+            return sorted(value for value, ids in lists.items() if ids)
+
+    def page(
+        self,
+        before_id: int | None = None,
+        limit: int = 20,
+        status: str | None = None,
+        role: str | None = None,
+        user: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        text: str | None = None,
+        search_notes: bool = True,
+    ) -> tuple[list[dict], int | None]:
+        """
+        Newest-first page of entries with id < before_id matching every given
+        filter. Returns (entries, cursor); pass cursor as before_id to get the
+        next (older) page. cursor is None when there is nothing older.
+        text matches questions and notes, or questions only with
+        search_notes=False (for viewers who may not see notes, so a search
+        cannot tell them which entries' notes hold a word).
+        """
+        index = self._index
+        words = QueryIndex.words(text) if text else set()
+        by_word = index.by_word if search_notes else index.by_question_word
+        with self._lock:
+            candidates = [index.ids]
+            for lists, value in ((index.by_status, status), (index.by_role, role), (index.by_user, user)):
+                if value:
+                    candidates.append(lists.get(value, []))
+            for word in words:
+                candidates.append(by_word.get(word, []))
+            driver = min(candidates, key=len)
+            if date_from or date_to:
+                lo, hi = index.date_span(date_from, date_to)
+                if hi - lo < len(driver):
+                    driver = index.ids_dated(lo, hi)
+            last_day = date_to + " 99:99" if date_to else None
+
+            results = []
+            i = len(driver) - 1 if before_id is None else bisect.bisect_left(driver, before_id) - 1
+            while i >= 0:
+                entry = self._entries[driver[i]]
+                i -= 1
+                if date_from and entry["created_at"] < date_from:
+                    continue
+                if last_day and entry["created_at"] > last_day:
+                    continue
+                if status and entry["status"] != status:
+                    continue
+                if role and entry["role"] != role:
+                    continue
+                if user and entry["user"] != user:
+                    continue
+                if words:
+                    searched = QueryIndex.words(entry["question"])
+                    if search_notes:
+                        searched |= QueryIndex.words(entry["note"])
+                    if not words <= searched:
+                        continue
+                results.append(dict(entry))
+                if len(results) > limit:
+                    break  # one past the page: proof that an older match exists
+
+        more = len(results) > limit
+        results = results[:limit]
+        return results, (results[-1]["id"] if results and more else None)
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_query_log() -> QueryLog:
+    """
+    Return the process-wide query log. Set SENTINEL_QUERY_LOG_DIR to keep it in
+    durable segment files instead of memory only, or SENTINEL_SHARED_STATE to
+    share one log between app workers (which takes precedence).
+    """
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                from shared_state import get_shared_state
+
+                state = get_shared_state()
+                directory = os.environ.get("SENTINEL_QUERY_LOG_DIR")
+                if state is not None:
+                    backend = SharedBackend(state)
+                else:
+                    backend = SegmentedFileBackend(directory) if directory else None
+                _log = QueryLog(backend)
+    return _log
+
+
+def set_query_log(log: QueryLog) -> QueryLog:
+    """Swap the process-wide query log (benchmarks and tests of backends)."""
+    global _log
+    with _log_lock:
+        _log = log
+    return log
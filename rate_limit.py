@@ -0,0 +1,199 @@
+"""
+Admission control for the chat endpoint.
+
+Every send costs a history append, an answer job, a query-log write and an
+extra rerun, so one scripted client (or a stuck Enter key) could take the
+answer pool away from everyone else. RateLimiter gives every (username, role)
+a token bucket: a send spends one token, tokens come back at the role's rate
+up to its burst, and a send that finds the bucket empty is turned away before
+any of that work is done.
+
+- Budgets are per role: physicians, who also push roster updates, get more.
+  SENTINEL_RATE_LIMITS overrides them, e.g. "Team Physician=60/15,*=20/5"
+  (sends per minute / burst; "*" covers every other role).
+- The bucket table is split into SHARDS, each behind its own lock, so users
+  on different shards never wait for each other. A check is one dict lookup
+  and a little arithmetic under that lock.
+- A bucket that has refilled completely is no different from a new one, so
+  full buckets are swept out and the table only holds recently active users.
+- Admitted and throttled sends are counted per role for the admin panel.
+
+Buckets are per process: with several app workers a user's budget applies
+within each worker their sessions land on.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+SHARDS = 16
+SWEEP_EVERY = 1024  # checks on a shard between sweeps of its full buckets
+
+# role -> (sends per minute, burst)
+DEFAULT_BUDGETS = {
+    "Team Physician": (60.0, 15),
+    "*": (20.0, 5),
+}
+
+
+def parse_budgets(spec: str) -> dict:
+    """
+    "ROLE=PER_MINUTE[/BURST],..." -> {role: (per_minute, burst)}. A missing
+    burst is a quarter of a minute's sends.
+    """
+    budgets = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        role, sep, value = item.rpartition("=")
+        per_minute, _, burst = value.partition("/")
+        try:
+            per_minute = float(per_minute)
+            burst = int(burst) if burst.strip() else max(int(per_minute // 4), 1)
+        except ValueError:
+            per_minute = None
+        if not sep or not role.strip() or per_minute is None or per_minute <= 0 or burst < 1:
+            raise ValueError(f"Rate limit {item.strip()!r} is not ROLE=PER_MINUTE[/BURST]")
+        budgets[role.strip()] = (per_minute, burst)
+    return budgets
+
+
+class Budget:
+    __slots__ = ("per_minute", "burst", "rate")
+
+    def __init__(self, per_minute: float, burst: int):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.rate = per_minute / 60.0  # tokens per second
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class Shard:
+    __slots__ = ("lock", "buckets", "checks", "admitted", "throttled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}  # (username, role) -> Bucket
+        self.checks = 0
+        self.admitted = Counter()  # role -> sends let through
+        self.throttled = Counter()  # role -> sends turned away
+
+
+class RateLimiter:
+    def __init__(self, budgets: dict | None = None, shards: int = SHARDS, clock=time.monotonic):
+        budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.default = Budget(*budgets.pop("*", DEFAULT_BUDGETS["*"]))
+        self.budgets = {role: Budget(*budget) for role, budget in budgets.items()}
+        self._shards = [Shard() for _ in range(shards)]
+        self._clock = clock
+
+    def budget(self, role: str) -> Budget:
+        return self.budgets.get(role, self.default)
+
+    def acquire(self, username: str, role: str, cost: float = 1.0) -> float:
+        """
+        Spend `cost` tokens of this user's bucket. Returns 0.0 when the send is
+        admitted, otherwise the seconds until enough tokens will be back.
+        """
+        budget = self.budgets.get(role, self.default)
+        key = (username, role)
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = self._clock()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                bucket = shard.buckets[key] = Bucket(budget.burst, now)
+            else:
+                bucket.tokens = min(budget.burst, bucket.tokens + (now - bucket.updated) * budget.rate)
+                bucket.updated = now
+
+            shard.checks += 1
+            if shard.checks % SWEEP_EVERY == 0:
+                self._sweep(shard, now, keep=key)
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                shard.admitted[role] += 1
+                return 0.0
+            shard.throttled[role] += 1
+            return (cost - bucket.tokens) / budget.rate
+
+    def _sweep(self, shard: Shard, now: float, keep: tuple):
+        """
+        Drop buckets that are full again (called with the shard's lock held),
+        except `keep`, the bucket the current check is about to spend from.
+        """
+        full = []
+        for key, bucket in shard.buckets.items():
+            budget = self.budgets.get(key[1], self.default)
+            if key != keep and bucket.tokens + (now - bucket.updated) * budget.rate >= budget.burst:
+                full.append(key)
+        for key in full:
+            del shard.buckets[key]
+
+    def refund(self, username: str, role: str, cost: float = 1.0):
+        """Hand back tokens spent on something that turned out not to count (e.g. a sign-in that succeeded)."""
+        budget = self.budgets.get(role, self.default)
+        key = (username, role)
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is not None:
+                bucket.tokens = min(budget.burst, bucket.tokens + cost)
+
+    def reset(self, username: str, role: str):
+        """Give a user a full bucket again (e.g. after an admin looked into a false alarm)."""
+        key = (username, role)
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            shard.buckets.pop(key, None)
+
+    def stats(self) -> dict:
+        admitted, throttled, buckets = Counter(), Counter(), 0
+        for shard in self._shards:
+            with shard.lock:
+                admitted.update(shard.admitted)
+                throttled.update(shard.throttled)
+                buckets += len(shard.buckets)
+        return {
+            "admitted": sum(admitted.values()),
+            "throttled": sum(throttled.values()),
+            "buckets": buckets,
+            "by_role": {
+                role: {"admitted": admitted[role], "throttled": throttled[role]}
+                for role in sorted(admitted.keys() | throttled.keys())
+            },
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter; SENTINEL_RATE_LIMITS overrides the default budgets per role."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                budgets = dict(DEFAULT_BUDGETS)
+                spec = os.environ.get("SENTINEL_RATE_LIMITS")
+                if spec:
+                    budgets.update(parse_budgets(spec))
+                _limiter = RateLimiter(budgets)
+    return _limiter
+
+
+def set_rate_limiter(limiter: RateLimiter) -> RateLimiter:
+    """Swap the process-wide limiter (benchmarks)."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+    return limiter
@@ -0,0 +1,191 @@
+"""
+BM25 retrieval over player records and logged questions.
+
+Documents are kept as sparse term-frequency vectors in an inverted index
+(term -> {doc_id: tf}). A search only touches the postings of the query's
+terms, accumulates BM25 scores per document and takes the top k. Adding,
+replacing or removing one document updates the postings, document lengths and
+collection statistics in place, so a physician edit or a newly logged question
+never triggers a rebuild.
+
+Document ids are "player:<number>" and "query:<id>".
+"""
+import heapq
+import math
+import threading
+
+from entities import POSITION_ALIASES
+from intent_router import tokenize
+from player_store import get_store, status_category
+from projection import body_region
+from query_log import get_query_log
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "at", "by", "with", "from",
+    "is", "are", "was", "were", "be", "been", "am", "do", "does", "did", "has", "have", "had",
+    "who", "what", "which", "when", "where", "why", "how", "any", "anyone", "anybody", "all",
+    "me", "my", "we", "our", "us", "you", "your", "i", "it", "its", "this", "that", "these", "those",
+    "there", "their", "them", "they", "he", "she", "his", "her", "can", "could", "should", "would",
+    "will", "about", "currently", "right", "now", "still", "show", "list", "tell", "give", "please",
+    "injury", "injuries", "injured", "report", "roster", "status", "player", "players", "guy", "guys",
+    "week", "today", "doing", "update",
+}
+
+# position code -> words a coach might use instead of the code
+POSITION_WORDS = {}
+for _alias, _codes in POSITION_ALIASES.items():
+    for _code in _codes:
+        POSITION_WORDS.setdefault(_code, set()).add(_alias)
+
+
+def stem(term: str) -> str:
+    """Deliberately light suffix stripping: drills -> drill, limited -> limit."""
+    if term.endswith(("'s", "’s")):
+        term = term[:-2]
+    for suffix in ("ing", "ed", "es", "s"):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 4 and not term.endswith("ss"):
+            return term[: -len(suffix)]
+    return term
+
+
+def analyze(text: str) -> list[str]:
+    terms = []
+    for token in tokenize(text):
+        for part in token.lstrip("#").replace("’", "'").split("-"):
+            if part and part not in STOPWORDS:
+                terms.append(stem(part))
+    return terms
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = {}  # term -> {doc_id: tf}
+        self._doc_terms = {}  # doc_id -> {term: tf}, needed to undo a document
+        self._doc_len = {}
+        self._payloads = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: str, text: str, payload=None):
+        """Index a document, replacing any earlier version with the same id."""
+        tf = {}
+        for term in analyze(text):
+            tf[term] = tf.get(term, 0) + 1
+        with self._lock:
+            self._remove_locked(doc_id)
+            for term, count in tf.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            self._doc_terms[doc_id] = tf
+            length = sum(tf.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+            self._payloads[doc_id] = payload
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str):
+        tf = self._doc_terms.pop(doc_id, None)
+        if tf is None:
+            return
+        for term in tf:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._payloads.pop(doc_id, None)
+
+    def search(self, query: str, k: int = 5, prefix: str = "", allowed=None) -> list[tuple[float, str, object]]:
+        """
+        Top-k (score, doc_id, payload). Only documents whose id starts with
+        prefix (and, if given, is in allowed) are scored.
+        """
+        terms = set(analyze(query))
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not terms or not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if not doc_id.startswith(prefix) or (allowed is not None and doc_id not in allowed):
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(score, doc_id, self._payloads[doc_id]) for doc_id, score in top]
+
+
+# ---------- DOCUMENTS ----------
+def player_text(p: dict) -> str:
+    # no name: names are matched by entities, and stemmed names would match
+    # ordinary words ("summer schedule" -> Summers)
+    words = " ".join(sorted(POSITION_WORDS.get(p["position"], ())))
+    region = body_region(p["injury"])
+    return f"{p['position']} {words} {p['injury']} {region} {p['status']} {status_category(p['status'])}"
+
+
+def query_text(q: dict) -> str:
+    return f"{q['question']} {q.get('note', '')}"
+
+
+class RetrievalIndex(BM25Index):
+    """BM25 index kept in step with the player store and the query log."""
+
+    def __init__(self, store, log):
+        super().__init__()
+        self.store = store
+        self.log = log
+        # listen first, then load: anything saved in between is simply indexed twice
+        store.add_listener(self.index_player)
+        log.add_listener(self.index_query)
+        for p in store.all():
+            self.index_player(p)
+        for q in log.entries():
+            self.index_query(q)
+
+    def index_player(self, p: dict):
+        self.add(f"player:{p['number']}", player_text(p), p["number"])
+
+    def index_query(self, q: dict):
+        self.add(f"query:{q['id']}", query_text(q), q["id"])
+
+    def players(self, query: str, k: int = 10, numbers=None) -> list[int]:
+        allowed = None if numbers is None else {f"player:{n}" for n in numbers}
+        hits = self.search(query, k=k, prefix="player:", allowed=allowed)
+        if not hits:
+            return []
+        # drop the long tail of single weak-term matches
+        floor = hits[0][0] * 0.4
+        return [number for score, _, number in hits if score >= floor]
+
+    def queries(self, query: str, k: int = 3) -> list[int]:
+        return [q_id for _, _, q_id in self.search(query, k=k, prefix="query:")]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_retrieval_index() -> RetrievalIndex:
+    global _index
+    store, log = get_store(), get_query_log()
+    index = _index
+    if index is None or index.store is not store or index.log is not log:
+        with _index_lock:
+            if _index is None or _index.store is not store or _index.log is not log:
+                _index = RetrievalIndex(store, log)
+            index = _index
+    return index
@@ -0,0 +1,188 @@
+"""
+Roster import from CSV or Parquet.
+
+The demo ships twelve hard-coded players; a real organisation tracks a
+90-man offseason roster and more. load_roster() turns a roster file into
+PlayerRecords ready for PlayerStore:
+
+- CSV is read with the standard library, one row at a time.
+- Parquet is read one record batch at a time when pyarrow is installed.
+
+Column names are matched case-insensitively, with a few common spellings
+accepted (see COLUMN_ALIASES). number, name and position are required;
+injury, status, last_updated and player_id are optional.
+
+    SENTINEL_ROSTER_PATH=roster.csv streamlit run app.py
+
+Medical-staff update files use the same column names: number or player_id to
+name the player, then injury and/or status. read_updates() parses one and
+diff_updates() reduces it to the edits that change something, ready for
+PlayerStore.update_many(). A blank cell in a file leaves the field as it is
+(so a file can update status alone); a cell holding just CLEAR_MARKER clears
+it.
+"""
+import csv
+import os
+
+from player_store import PLAYER_FIELDS, PlayerRecord
+
+REQUIRED_COLUMNS = ("number", "name", "position")
+UPDATE_FIELDS = ("injury", "status")
+CLEAR_MARKER = "-"  # an update cell holding only this clears the field
+
+# header as found in the file (lower-cased) -> store field
+COLUMN_ALIASES = {
+    "no": "number",
+    "#": "number",
+    "jersey": "number",
+    "jersey_number": "number",
+    "player": "name",
+    "player_name": "name",
+    "pos": "position",
+    "injury_description": "injury",
+    "availability": "status",
+    "updated": "last_updated",
+    "id": "player_id",
+}
+
+
+class RosterError(ValueError):
+    """A roster file that cannot be imported; the message names the row."""
+
+
+def _column_map(headers, required=REQUIRED_COLUMNS) -> dict:
+    mapping = {}
+    for header in headers:
+        key = str(header).strip().lower().replace(" ", "_")
+        field = COLUMN_ALIASES.get(key, key)
+        if field in PLAYER_FIELDS and field not in mapping.values():
+            mapping[header] = field
+    missing = [c for c in required if c not in mapping.values()]
+    if missing:
+        raise RosterError(f"Roster is missing column(s): {', '.join(missing)}")
+    return mapping
+
+
+def _records(rows, mapping: dict):
+    seen = set()
+    for line, row in rows:
+        values = {field: row.get(header) for header, field in mapping.items()}
+        try:
+            number = int(float(values["number"]))
+        except (TypeError, ValueError):
+            raise RosterError(f"Row {line}: invalid player number {values['number']!r}") from None
+        if number in seen:
+            raise RosterError(f"Row {line}: duplicate player number {number}")
+        if not values.get("name") or not values.get("position"):
+            raise RosterError(f"Row {line}: name and position are required")
+        seen.add(number)
+        values["number"] = number
+        yield PlayerRecord.from_mapping(values)
+
+
+def _csv_rows(path: str):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        mapping = _column_map(reader.fieldnames or ())
+        # header is line 1
+        yield from _records(((i, row) for i, row in enumerate(reader, start=2)), mapping)
+
+
+def _parquet_rows(path: str):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    mapping = _column_map(parquet.schema_arrow.names)
+
+    def rows():
+        line = 1
+        for batch in parquet.iter_batches(columns=list(mapping)):
+            columns = batch.to_pydict()
+            for i in range(batch.num_rows):
+                yield line, {header: values[i] for header, values in columns.items()}
+                line += 1
+
+    yield from _records(rows(), mapping)
+
+
+def load_roster(path: str) -> list[PlayerRecord]:
+    """Read a .csv or .parquet roster into PlayerRecords, in file order."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return list(_csv_rows(path))
+    if ext in (".parquet", ".pq"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RosterError("Reading Parquet rosters requires pyarrow") from None
+        return list(_parquet_rows(path))
+    raise RosterError(f"Unsupported roster format: {ext or path}")
+
+
+# ---------- MEDICAL-STAFF UPDATES ----------
+def read_updates(f) -> list[dict]:
+    """
+    Rows of an update CSV, read from an open text file, as dicts with the
+    file's line number under "line".
+    """
+    reader = csv.DictReader(f)
+    mapping = _column_map(reader.fieldnames or (), required=())
+    fields = set(mapping.values())
+    if not fields & {"number", "player_id"}:
+        raise RosterError("Update file needs a number or player_id column")
+    if not fields & set(UPDATE_FIELDS):
+        raise RosterError(f"Update file has none of the column(s): {', '.join(UPDATE_FIELDS)}")
+    keep = {header: field for header, field in mapping.items() if field in ("number", "player_id") + UPDATE_FIELDS}
+    rows = []
+    for line, row in enumerate(reader, start=2):
+        values = {field: row.get(header) for header, field in keep.items()}
+        values["line"] = line
+        rows.append(values)
+    return rows
+
+
+def diff_updates(store, rows, blank_clears: bool = False) -> dict:
+    """
+    {number: {field: new value}} for the rows that change a player. A row
+    names its player by number, or by player_id when the number is blank.
+    A field missing from a row is left as it is. A blank cell is too, unless
+    blank_clears is set (grid edits, where a row holds only the cells the
+    user changed, so a blank one was emptied on purpose); a CLEAR_MARKER
+    cell always clears the field.
+    """
+    changes = {}
+    seen = set()
+    for i, row in enumerate(rows, start=1):
+        where = f"Row {row.get('line', i)}"
+        number = row.get("number")
+        if number not in (None, ""):
+            try:
+                number = int(float(number))
+            except (TypeError, ValueError):
+                raise RosterError(f"{where}: invalid player number {number!r}") from None
+            player = store.get(number)
+        elif row.get("player_id") not in (None, ""):
+            player = store.get_by_id(str(row["player_id"]).strip())
+        else:
+            raise RosterError(f"{where}: no player number or id")
+        if player is None:
+            raise RosterError(f"{where}: no such player {number or row.get('player_id')!r}")
+        if player["number"] in seen:
+            raise RosterError(f"{where}: player #{player['number']} appears more than once")
+        seen.add(player["number"])
+
+        fields = {}
+        for field in UPDATE_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            value = "" if value is None else str(value).strip()
+            if value == CLEAR_MARKER:
+                value = ""
+            elif not value and not blank_clears:
+                continue
+            if value != player[field]:
+                fields[field] = value
+        if fields:
+            changes[player["number"]] = fields
+    return changes
@@ -0,0 +1,514 @@
+"""
+State shared between app workers.
+
+One Streamlit process keeps the roster, the query log and the change feed in
+memory. To run several workers behind a load balancer they need a common
+place for the few things that must agree across processes:
+
+- counters: incr(name) hands out increasing values (query ids);
+  raise_to(name, value) moves a counter up to at least value
+- streams: append(stream, record) adds a JSON record and returns its sequence
+  number (1, 2, ... per stream, in commit order); read(stream, after) returns
+  the (seq, record) pairs after a sequence number; last(stream) is the newest
+- trim(stream, before) drops the records before a sequence number, always
+  keeping the newest one. Sequence numbers never move: a read from before the
+  oldest kept record starts at that record, and the jump in seq is how a
+  reader learns that it missed some.
+
+Nothing is trimmed on its own. ChangeFeed trims its stream to its retention,
+and PlayerStore writes a roster snapshot every so often and then drops the
+batches it covers, so a worker that starts late (or falls behind) applies
+the snapshot plus the tail. The query log stream is the log itself, which
+workers replay on start, so it is kept whole.
+
+Every worker applies the same streams in the same order, so all of them reach
+the same roster, the same query log and the same feed (see PlayerStore.sync,
+QueryLog.sync and ChangeFeed). Implementations:
+
+- LocalState: in memory, for one process (and a baseline to compare against)
+- SQLiteState: a SQLite file in WAL mode, for workers on one host
+- RedisState: any Redis-compatible server, over a minimal RESP client. For
+  local runs and tests, `python shared_state.py serve` starts a small
+  stand-in that speaks enough of the protocol.
+
+SENTINEL_SHARED_STATE selects one for the process: "memory",
+"sqlite:///path/to/state.db" or "redis://host:port". Unset, each worker keeps
+its state to itself, as before.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+from urllib.parse import urlparse
+
+DEFAULT_REDIS_PORT = 6379
+KEY_PREFIX = "sentinel:"
+
+
+# ---------- IN MEMORY ----------
+class LocalState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._streams = {}
+        self._trimmed = {}  # stream -> records dropped from its front
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            value = self._counters.get(name, 0) + 1
+            self._counters[name] = value
+            return value
+
+    def raise_to(self, name: str, value: int):
+        with self._lock:
+            self._counters[name] = max(self._counters.get(name, 0), value)
+
+    def append(self, stream: str, record: dict) -> int:
+        encoded = json.dumps(record)  # what a networked state would store; keeps records independent
+        with self._lock:
+            records = self._streams.setdefault(stream, [])
+            records.append(encoded)
+            return self._trimmed.get(stream, 0) + len(records)
+
+    def read(self, stream: str, after: int, limit: int | None = None) -> list[tuple[int, dict]]:
+        with self._lock:
+            records = self._streams.get(stream, [])
+            trimmed = self._trimmed.get(stream, 0)
+            start = max(after - trimmed, 0)
+            end = len(records) if limit is None else min(len(records), start + limit)
+            chunk = records[start:end]
+        return [(trimmed + start + i + 1, json.loads(r)) for i, r in enumerate(chunk)]
+
+    def last(self, stream: str) -> int:
+        with self._lock:
+            return self._trimmed.get(stream, 0) + len(self._streams.get(stream, ()))
+
+    def trim(self, stream: str, before: int):
+        with self._lock:
+            records = self._streams.get(stream, [])
+            trimmed = self._trimmed.get(stream, 0)
+            drop = min(before - 1 - trimmed, len(records) - 1)
+            if drop > 0:
+                del records[:drop]
+                self._trimmed[stream] = trimmed + drop
+
+    def close(self):
+        pass
+
+
+# ---------- SQLITE FILE ----------
+class SQLiteState:
+    """
+    Counters and streams in one SQLite file. Each write is one IMMEDIATE
+    transaction, so sequence numbers and counters are handed out in commit
+    order across every process using the file.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS streams ("
+            " stream TEXT NOT NULL, seq INTEGER NOT NULL, record TEXT NOT NULL,"
+            " PRIMARY KEY (stream, seq)) WITHOUT ROWID"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread: sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, params: tuple):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(sql, params).fetchone()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return row
+
+    def incr(self, name: str) -> int:
+        return self._write(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value",
+            (name,),
+        )[0]
+
+    def raise_to(self, name: str, value: int):
+        self._write(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)",
+            (name, value),
+        )
+
+    def append(self, stream: str, record: dict) -> int:
+        return self._write(
+            "INSERT INTO streams (stream, seq, record) "
+            "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM streams WHERE stream = ? RETURNING seq",
+            (stream, json.dumps(record), stream),
+        )[0]
+
+    def read(self, stream: str, after: int, limit: int | None = None) -> list[tuple[int, dict]]:
+        rows = self._conn().execute(
+            "SELECT seq, record FROM streams WHERE stream = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (stream, after, -1 if limit is None else limit),
+        ).fetchall()
+        return [(seq, json.loads(record)) for seq, record in rows]
+
+    def last(self, stream: str) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM streams WHERE stream = ?", (stream,)).fetchone()[0]
+
+    def trim(self, stream: str, before: int):
+        # the newest row stays: append numbers the next record from it
+        self._write(
+            "DELETE FROM streams WHERE stream = ? AND seq < MIN(?, (SELECT MAX(seq) FROM streams WHERE stream = ?))",
+            (stream, before, stream),
+        )
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ---------- REDIS ----------
+class RedisError(Exception):
+    """An error reply from the server."""
+
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("Connection closed by the server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = f.read(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(rest)
+        return None if count < 0 else [read_reply(f) for _ in range(count)]
+    raise RedisError(f"Unexpected reply: {line!r}")
+
+
+class RedisState:
+    """
+    Counters are Redis integers (INCR) and streams are Redis lists. A stream
+    also has a "<stream>:trimmed" counter of records dropped from its front,
+    so a record's sequence number is that counter plus its 1-based position in
+    the list. Appends, reads and trims each run as one MULTI/EXEC, so they
+    always see the list and the counter agree; a trim WATCHes the counter so
+    two trims can never both drop the same records.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_REDIS_PORT, prefix: str = KEY_PREFIX):
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self._local = threading.local()
+        self._trimmed = {}  # stream -> last trimmed count seen, to aim reads
+        self.command("PING")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def command(self, *args):
+        sock, reader = self._connection()
+        try:
+            sock.sendall(encode_command(*args))
+            return read_reply(reader)
+        except OSError:
+            self.close()
+            raise
+
+    def transaction(self, *commands):
+        """Run commands as one MULTI/EXEC in one round trip; None if a WATCHed key changed."""
+        sock, reader = self._connection()
+        try:
+            sock.sendall(
+                encode_command("MULTI") + b"".join(encode_command(*c) for c in commands) + encode_command("EXEC")
+            )
+            error, replies = None, []
+            for _ in range(len(commands) + 2):  # +OK, +QUEUED per command, then EXEC's reply
+                try:
+                    replies.append(read_reply(reader))
+                except RedisError as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return replies[-1]
+        except OSError:
+            self.close()
+            raise
+
+    def incr(self, name: str) -> int:
+        return self.command("INCR", self.prefix + name)
+
+    def raise_to(self, name: str, value: int):
+        # no compare-and-set without scripting: a race can overshoot, which
+        # only skips values
+        current = int(self.command("GET", self.prefix + name) or 0)
+        if current < value:
+            self.command("INCRBY", self.prefix + name, value - current)
+
+    def append(self, stream: str, record: dict) -> int:
+        key = self.prefix + stream
+        length, trimmed = self.transaction(("RPUSH", key, json.dumps(record)), ("GET", key + ":trimmed"))
+        return int(trimmed or 0) + length
+
+    def read(self, stream: str, after: int, limit: int | None = None) -> list[tuple[int, dict]]:
+        key = self.prefix + stream
+        trimmed = self._trimmed.get(stream, 0)
+        while True:
+            # list positions depend on the trimmed count, so aim with the last
+            # one seen and go again if a trim has moved it since
+            start = max(after - trimmed, 0)
+            stop = -1 if limit is None else start + limit - 1
+            current, items = self.transaction(("GET", key + ":trimmed"), ("LRANGE", key, start, stop))
+            current = int(current or 0)
+            if current == trimmed:
+                break
+            trimmed = current
+        self._trimmed[stream] = trimmed
+        return [(trimmed + start + i + 1, json.loads(item)) for i, item in enumerate(items)]
+
+    def last(self, stream: str) -> int:
+        key = self.prefix + stream
+        length, trimmed = self.transaction(("LLEN", key), ("GET", key + ":trimmed"))
+        return int(trimmed or 0) + length
+
+    def trim(self, stream: str, before: int):
+        key = self.prefix + stream
+        while True:
+            self.command("WATCH", key + ":trimmed")
+            trimmed = int(self.command("GET", key + ":trimmed") or 0)
+            drop = min(before - 1 - trimmed, self.command("LLEN", key) - 1)
+            if drop <= 0:
+                self.command("UNWATCH")
+                return
+            if self.transaction(("LTRIM", key, drop, -1), ("INCRBY", key + ":trimmed", drop)) is not None:
+                return
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+
+# ---------- LOCAL STAND-IN SERVER ----------
+class StandInServer(socketserver.ThreadingTCPServer):
+    """
+    Just enough of the Redis protocol for RedisState: PING, GET, SET, INCR,
+    INCRBY, DEL, RPUSH, LLEN, LRANGE, LTRIM, FLUSHALL, plus MULTI/EXEC/DISCARD
+    and WATCH/UNWATCH (handled per connection by StandInHandler). One lock
+    serializes every command and every EXEC, which is also what makes INCR,
+    RPUSH and transactions atomic.
+    """
+
+    WRITES = {"SET", "INCR", "INCRBY", "DEL", "RPUSH", "LTRIM"}
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, StandInHandler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.versions = {}  # key -> writes so far, for WATCH
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def execute(self, args: list[bytes]) -> bytes:
+        with self.lock:
+            return self._execute(args)
+
+    def watch(self, keys: list[bytes]) -> dict:
+        with self.lock:
+            return {key: self.versions.get(key, 0) for key in keys}
+
+    def execute_all(self, queued: list[list[bytes]], watched: dict) -> bytes:
+        """EXEC: run the queued commands back to back, unless a watched key was written since WATCH."""
+        with self.lock:
+            if any(self.versions.get(key, 0) != version for key, version in watched.items()):
+                return b"*-1\r\n"
+            replies = []
+            for args in queued:
+                try:
+                    replies.append(self._execute(args))
+                except (IndexError, ValueError):
+                    replies.append(b"-ERR wrong arguments\r\n")
+            return b"*%d\r\n" % len(replies) + b"".join(replies)
+
+    def _execute(self, args: list[bytes]) -> bytes:
+        name = args[0].decode().upper()
+        data = self.data
+        if name in self.WRITES:
+            for key in args[1:2] if name != "DEL" else args[1:]:
+                self.versions[key] = self.versions.get(key, 0) + 1
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name == "GET":
+            value = data.get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "SET":
+            data[args[1]] = args[2]
+            return b"+OK\r\n"
+        if name in ("INCR", "INCRBY"):
+            value = int(data.get(args[1], b"0")) + (int(args[2]) if name == "INCRBY" else 1)
+            data[args[1]] = str(value).encode()
+            return b":%d\r\n" % value
+        if name == "DEL":
+            return b":%d\r\n" % sum(data.pop(key, None) is not None for key in args[1:])
+        if name == "RPUSH":
+            items = data.setdefault(args[1], [])
+            items.extend(args[2:])
+            return b":%d\r\n" % len(items)
+        if name == "LLEN":
+            return b":%d\r\n" % len(data.get(args[1], ()))
+        if name == "LRANGE":
+            items = data.get(args[1], [])
+            start, stop = int(args[2]), int(args[3])
+            chunk = items[start:] if stop == -1 else items[start:stop + 1]
+            return b"*%d\r\n" % len(chunk) + b"".join(b"$%d\r\n%s\r\n" % (len(i), i) for i in chunk)
+        if name == "LTRIM":
+            items = data.get(args[1], [])
+            start, stop = int(args[2]), int(args[3])
+            items[:] = items[start:] if stop == -1 else items[start:stop + 1]
+            return b"+OK\r\n"
+        if name == "FLUSHALL":
+            for key in data:
+                self.versions[key] = self.versions.get(key, 0) + 1
+            data.clear()
+            return b"+OK\r\n"
+        return f"-ERR unknown command '{name}'\r\n".encode()
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        queued, watched = None, {}  # MULTI's commands, and WATCHed key -> version
+        while True:
+            try:
+                args = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            except RedisError as e:
+                self.wfile.write(f"-ERR {e}\r\n".encode())
+                continue
+            if isinstance(args, str):  # inline command, e.g. from telnet
+                args = [a.encode() for a in args.split()]
+            if not args:
+                continue
+            name = args[0].decode().upper()
+            if name == "MULTI":
+                queued, reply = [], b"+OK\r\n"
+            elif name == "EXEC":
+                reply = b"-ERR EXEC without MULTI\r\n" if queued is None else self.server.execute_all(queued, watched)
+                queued, watched = None, {}
+            elif name == "DISCARD":
+                queued, watched, reply = None, {}, b"+OK\r\n"
+            elif name == "WATCH":
+                watched.update(self.server.watch(args[1:]))
+                reply = b"+OK\r\n"
+            elif name == "UNWATCH":
+                watched, reply = {}, b"+OK\r\n"
+            elif queued is not None:
+                queued.append(args)
+                reply = b"+QUEUED\r\n"
+            else:
+                try:
+                    reply = self.server.execute(args)
+                except (IndexError, ValueError):
+                    reply = b"-ERR wrong arguments\r\n"
+            self.wfile.write(reply)
+
+
+# ---------- SELECTION ----------
+def open_state(spec: str):
+    """A state for "memory", "sqlite:///path" or "redis://host:port"."""
+    if spec == "memory":
+        return LocalState()
+    url = urlparse(spec)
+    if url.scheme == "sqlite":
+        return SQLiteState(url.path if spec.startswith("sqlite:///") else url.netloc + url.path)
+    if url.scheme == "redis":
+        return RedisState(url.hostname or "127.0.0.1", url.port or DEFAULT_REDIS_PORT)
+    raise ValueError(f"Unknown shared state {spec!r}; use memory, sqlite:///path or redis://host:port")
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state():
+    """The state named by SENTINEL_SHARED_STATE, or None when workers do not share state."""
+    global _state
+    spec = os.environ.get("SENTINEL_SHARED_STATE")
+    if not spec:
+        return None
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = open_state(spec)
+    return _state
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local Redis-compatible stand-in for shared state.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="serve the stand-in until interrupted")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_REDIS_PORT)
+    args = parser.parse_args(argv)
+
+    server = StandInServer((args.host, args.port))
+    print(f"Serving on redis://{args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """The demo roster and an empty in-memory query log for every test."""
+    for var in ("SENTINEL_STORE_PATH", "SENTINEL_ROSTER_PATH", "SENTINEL_QUERY_LOG_DIR", "SENTINEL_SHARED_STATE"):
+        monkeypatch.delenv(var, raising=False)
+    from player_store import PlayerStore, set_store
+    from query_log import QueryLog, set_query_log
+
+    set_store(PlayerStore())
+    set_query_log(QueryLog())
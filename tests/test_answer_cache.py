@@ -0,0 +1,48 @@
+from answer_cache import AnswerCache, get_answer_cache
+from chatbot import ai_answer, cache_key
+from player_store import PlayerStore, get_store
+from query_log import get_query_log
+
+
+def test_paraphrases_share_one_entry():
+    assert cache_key("List all injuries", "Head Coach") == cache_key("show the injury report pls", "Head Coach")
+    assert cache_key("List all injuries", "Head Coach") != cache_key("List all injuries", "Front Office")
+
+
+def test_player_answer_survives_edits_to_other_players():
+    store = get_store()
+    ai_answer("how is #17?", "Head Coach")
+    ai_answer("List all injuries", "Head Coach")
+    cache = get_answer_cache()
+    assert len(cache) == 2
+
+    store.update(22, status="Out")  # drops the roster-wide report only
+    assert cache.get(cache_key("how is #17?", "Head Coach")) is not None
+    assert cache.get(cache_key("List all injuries", "Head Coach")) is None
+
+    store.update(17, status="Cleared – full participation")
+    assert cache.get(cache_key("how is #17?", "Head Coach")) is None
+    assert "Cleared – full participation" in ai_answer("how is #17?", "Team Physician")
+
+
+def test_time_relative_answers_are_not_stored():
+    ai_answer("what changed since yesterday?", "Team Physician")
+    ai_answer("how long has #17 been out?", "Team Physician")
+    assert len(get_answer_cache()) == 0
+
+
+def test_answer_built_during_an_update_is_not_stored():
+    store = PlayerStore()
+    cache = AnswerCache(store)
+    with cache.tracking() as (deps, version):
+        store.update(1, status="Out")  # lands while the answer is being built
+    cache.put(("report", "injury", "Head Coach"), "stale report", deps, version)
+    assert len(cache) == 0
+
+
+def test_fallback_follows_the_query_log():
+    question = "cold tub protocol for hamstrings?"
+    assert "Similar questions" not in ai_answer(question, "Team Physician")
+    q_id = get_query_log().log(user="someone-else", role="Team Physician", question="cold tub for a hamstring strain?")
+    assert f"Q{q_id}" in ai_answer(question, "Team Physician")
+    assert get_answer_cache().get(cache_key(question, "Team Physician")) is not None  # cached again until the next entry
@@ -0,0 +1,37 @@
+import answer_pipeline
+from answer_pipeline import AnswerPipeline
+
+
+def settle(jobs):
+    for job in jobs:
+        job.future.result(timeout=5)
+
+
+def test_abandoned_jobs_are_reclaimed_after_ttl(monkeypatch):
+    monkeypatch.setattr(answer_pipeline, "SWEEP_INTERVAL", 0.0)
+    pipeline = AnswerPipeline(workers=2, settled_ttl=0.0)
+    abandoned = [pipeline.submit("closed-tab", lambda: "answer") for _ in range(5)]
+    settle(abandoned)
+
+    fresh = pipeline.submit("open-tab", lambda: "answer")
+    assert all(pipeline.get(job.id) is None for job in abandoned)
+    assert pipeline.get(fresh.id) is fresh
+    assert pipeline.stats["evicted"] == 5
+
+
+def test_settled_jobs_are_capped():
+    pipeline = AnswerPipeline(workers=2, max_settled=3)
+    jobs = [pipeline.submit("closed-tab", lambda: "answer") for _ in range(6)]
+    settle(jobs)
+
+    pipeline.submit("open-tab", lambda: "answer")
+    kept = [job for job in jobs if pipeline.get(job.id) is not None]
+    assert kept == jobs[-3:]  # the oldest go first
+
+
+def test_jobs_are_kept_until_collected_within_ttl():
+    pipeline = AnswerPipeline(workers=2)
+    job = pipeline.submit("slow-rerun", lambda: "answer")
+    settle([job])
+    pipeline.submit("other", lambda: "answer")
+    assert pipeline.get(job.id).text == "answer"
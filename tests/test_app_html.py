@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from query_log import get_query_log
+
+testing = pytest.importorskip("streamlit.testing.v1")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAYLOAD = '<img src=x onerror="alert(1)">'
+
+
+def widget(elements, label: str):
+    return next(w for w in elements if w.label == label)
+
+
+def sign_in(role: str):
+    """Demo sign-in through login and MFA, then open the chat (as benchmark.simulate_user does)."""
+    at = testing.AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    widget(at.text_input, "Username").input("kkitching")
+    widget(at.selectbox, "Role for this session").select(role)
+    widget(at.text_input, "Password").input("demo-password")
+    widget(at.button, "Sign In").click().run()
+    at.run()
+    widget(at.text_input, "Verification code").input("123456")
+    widget(at.button, "Verify & Continue").click().run()
+    at.run()
+    widget(at.button, "Open Chat").click().run()
+    assert not at.exception
+    return at
+
+
+def rendered(at) -> str:
+    return "".join(m.value for m in at.markdown)
+
+
+def test_logged_questions_and_chat_text_are_escaped():
+    get_query_log().log(user="someone-else", role="Head Coach", question=PAYLOAD, note=PAYLOAD)
+    at = sign_in("Team Physician")
+    at.text_input(key="chat_input").input(PAYLOAD)
+    widget(at.button, "Send").click().run()
+    assert not at.exception
+
+    html = rendered(at)
+    assert "<img" not in html
+    assert "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;" in html
@@ -0,0 +1,57 @@
+import pytest
+
+from auth import AuthError, AuthLocked, AuthService, LocalUserStore, totp, verify_password
+from rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def service(tmp_path):
+    store = LocalUserStore(str(tmp_path / "users.json"))
+    secret = store.add("coach", "right-password", ["Head Coach"])
+    clock = Clock()
+    attempts = RateLimiter({"password": (6.0, 3), "totp": (6.0, 3)}, clock=clock)
+    return AuthService(store, attempts=attempts), secret, clock
+
+
+def test_verify_password_rejects_malformed_hash():
+    assert verify_password("pw", "scrypt$16384$8$1$c2FsdA==$not base64!") is False
+    assert verify_password("pw", "garbage") is False
+
+
+def test_failed_passwords_lock_the_username(service):
+    auth, _, clock = service
+    for _ in range(3):
+        with pytest.raises(AuthError, match="Invalid"):
+            auth.login("coach", "wrong", "Head Coach")
+    with pytest.raises(AuthLocked):
+        auth.login("coach", "right-password", "Head Coach")
+    assert auth.stats["locked_out"] == 1
+    clock.now += 10  # one attempt back at 6 per minute
+    assert auth.login("coach", "right-password", "Head Coach")
+
+
+def test_successful_sign_ins_do_not_count(service):
+    auth, _, _ = service
+    for _ in range(10):
+        auth.login("coach", "right-password", "Head Coach")
+
+
+def test_failed_codes_lock_mfa(service):
+    auth, secret, clock = service
+    token = auth.login("coach", "right-password", "Head Coach")
+    wrong = "000000" if totp(secret) != "000000" else "111111"
+    for _ in range(3):
+        with pytest.raises(AuthError, match="not valid"):
+            auth.verify_mfa(token, wrong)
+    with pytest.raises(AuthLocked):
+        auth.verify_mfa(token, totp(secret))
+    clock.now += 10
+    assert auth.verify_mfa(token, totp(secret))
@@ -0,0 +1,60 @@
+from chat_history import FOLD_BATCH, SHARE_MIN_CHARS, SUMMARY_LINES, ChatHistory
+
+CAP = FOLD_BATCH + 10
+
+
+def turn(i: int) -> list[dict]:
+    return [
+        {"sender": "user", "label": "You", "text": f"question {i}"},
+        {"sender": "bot", "label": "Chatbox", "text": f"answer {i}"},
+    ]
+
+
+def test_history_stays_under_its_cap_and_summarizes_folded_turns():
+    history = ChatHistory("s1", cap=CAP)
+    for i in range(200):
+        for msg in turn(i):
+            history.append(msg)
+    assert len(history) <= CAP
+    assert history.folded + len(history) == 400
+    assert history[-1]["text"] == "answer 199"
+    summary = history.summary_message()["text"]
+    assert f"({history.folded} messages folded)" in summary
+    assert len(history.summaries) <= SUMMARY_LINES
+    assert "“question 199”" not in summary  # still in memory, not folded
+    assert f"“question {history.folded // 2 - 1}” → answer {history.folded // 2 - 1}" in summary
+
+
+def test_pending_answers_are_never_folded():
+    history = ChatHistory("s2", cap=CAP)
+    pending = {"sender": "bot", "label": "Chatbox", "text": "…", "pending": True}
+    history.append(pending)
+    for i in range(CAP * 2):
+        history.append(turn(i)[0])
+    assert history[0] is pending
+    history.settle(pending, "done")
+    history.append(turn(999)[0])
+    assert history[0] is not pending
+
+
+def test_folded_messages_are_paged_back_from_the_archive(tmp_path):
+    history = ChatHistory("s3", cap=CAP, archive_dir=str(tmp_path))
+    report = "Sentinels injury report\n" + "x" * SHARE_MIN_CHARS
+    for i in range(100):
+        history.append(turn(i)[0])
+        history.append({"sender": "bot", "label": "Chatbox", "text": report})
+    assert history.archived() == history.folded
+    page = history.read_archive(10, 4)
+    assert [m["text"] for m in page] == ["question 5", report, "question 6", report]
+    last = history.archived() - 1
+    expected = f"question {last // 2}" if last % 2 == 0 else report
+    assert [m["text"] for m in history.read_archive(last, 5)] == [expected]
+
+
+def test_long_answers_share_one_snapshot():
+    a, b = ChatHistory("a", cap=CAP), ChatHistory("b", cap=CAP)
+    report = "y" * SHARE_MIN_CHARS
+    a.append({"sender": "bot", "label": "Chatbox", "text": report})
+    b.append({"sender": "bot", "label": "Chatbox", "text": "y" * SHARE_MIN_CHARS})
+    assert a[0]["snapshot"] is b[0]["snapshot"]
+    assert a[0]["text"] is b[0]["text"]
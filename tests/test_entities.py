@@ -0,0 +1,62 @@
+import pytest
+
+from chatbot import ai_answer
+from entities import get_entity_index
+
+COMMON_WORDS = [
+    "How do I login?",
+    "summer schedule?",
+    "any books to read?",
+    "walk me through it",
+    "anything on the trade",
+]
+
+
+@pytest.mark.parametrize("text", COMMON_WORDS)
+def test_common_words_are_not_players(text):
+    assert get_entity_index().extract(text).numbers == []
+
+
+@pytest.mark.parametrize("text", ["How do I login?", "summer schedule?", "any books to read?", "walk me through it"])
+def test_common_words_get_no_player_rows(text):
+    answer = ai_answer(text, "Front Office")
+    assert "**#" not in answer
+
+
+def test_exact_names_match_without_fuzzy():
+    assert get_entity_index().extract("Ortiz").numbers == [17]
+    assert get_entity_index().extract("how is jalen ortiz?").numbers == [17]
+
+
+def test_misspelled_name_matches_only_when_fuzzy():
+    index = get_entity_index()
+    assert index.extract("how is ortzi?").numbers == []
+    assert index.extract("how is ortzi?", fuzzy=True).numbers == [17]
+    assert "#17 Jalen Ortiz" in ai_answer("how is ortzi?", "Head Coach")
+
+
+def test_fuzzy_needs_similar_length():
+    index = get_entity_index()
+    assert index.extract("how is hay?", fuzzy=True).numbers == []
+    assert index.extract("how is walkerson?", fuzzy=True).numbers == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["anyone out for 1 week?", "who is out 3 days", "back in 22 days?", "limited for 1 month", "how about 17?"],
+)
+def test_bare_numbers_are_not_jerseys(text):
+    assert get_entity_index().extract(text, fuzzy=True).numbers == []
+
+
+@pytest.mark.parametrize(
+    "text, number",
+    [("how is #1?", 1), ("how is no. 17?", 17), ("number 22 status", 22), ("player 3 update", 3), ("wr 11", 11)],
+)
+def test_marked_numbers_are_jerseys(text, number):
+    assert get_entity_index().extract(text).numbers == [number]
+
+
+def test_duration_does_not_pick_a_player():
+    answer = ai_answer("anyone out for 1 week?", "Head Coach")
+    assert "Marcus Reed" not in answer
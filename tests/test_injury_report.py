@@ -0,0 +1,27 @@
+from injury_report import ReportCache
+from player_store import PlayerStore
+
+
+def test_report_renders_only_changed_players_again():
+    store = PlayerStore()
+    cache = ReportCache(store)
+    first = cache.view()
+    assert cache.renders == len(store)
+    assert cache.view() is first  # same roster version: nothing rebuilt
+
+    store.update(17, status="Cleared – full participation")
+    second = cache.view()
+    assert cache.renders == len(store) + 1
+    assert "Cleared – full participation" in second.report
+    assert [n for n in store.numbers() if second.fragments[n] is not first.fragments[n]] == [17]
+
+
+def test_role_views_are_cached_separately():
+    store = PlayerStore()
+    cache = ReportCache(store)
+    clinical, coach = cache.report(), cache.report("Head Coach")
+    assert clinical != coach
+    assert cache.for_role("Head Coach") is cache.for_role("Head Coach")
+    store.update(22, injury="Left ankle sprain")
+    assert "Left ankle sprain" in cache.report()
+    assert "Left ankle sprain" not in cache.for_role("Head Coach")  # coaches see body regions only
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from player_store import PlayerStore
+
+
+def test_update_moves_player_between_indexes():
+    store = PlayerStore()
+    before = store.version
+    store.update(17, status="Cleared – full participation")
+    assert store.version == before + 1
+    assert store.revision(17) == store.version
+    assert 17 in [p["number"] for p in store.by_status("full")]
+    assert 17 not in [p["number"] for p in store.by_status("out")]
+
+
+def test_rejected_batch_changes_nothing():
+    store = PlayerStore()
+    version, roster = store.version, store.all()
+    with pytest.raises(KeyError):
+        store.update_many({17: {"status": "Out"}, 999: {"status": "Out"}})
+    with pytest.raises(ValueError):
+        store.update_many({17: {"status": "Out", "number": 5}})
+    assert store.version == version
+    assert store.all() == roster
+
+
+def test_concurrent_updates_each_land_once():
+    store = PlayerStore()
+    version = store.version
+    threads = [
+        threading.Thread(target=lambda n=n: [store.update(n, status=f"edit {i}") for i in range(50)])
+        for n in store.numbers()[:4]
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.version == version + 200
+    assert all(store.get(n)["status"] == "edit 49" for n in store.numbers()[:4])
+
+
+def test_sqlite_file_survives_a_restart(tmp_path):
+    path = str(tmp_path / "players.db")
+    store = PlayerStore(path=path)
+    store.update(22, injury="Left ankle sprain", status="Out")
+    store.update_many({17: {"status": "Limited"}, 3: {"position": "wr"}})
+
+    reloaded = PlayerStore(path=path)
+    assert reloaded.all() == store.all()
+    assert reloaded.get(3)["position"] == "WR"
+    assert [v["status"] for v in reloaded.history(22)][-1] == "Out"
+    assert len(reloaded.history(22)) == 2
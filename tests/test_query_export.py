@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import pytest
+
+from query_export import EXPORT_CHUNK, EXPORT_FIELDS, export_file
+from query_log import QueryLog
+
+
+@pytest.fixture
+def log():
+    log = QueryLog()
+    for i in range(25):
+        log.log(user="u", role="Front Office" if i % 2 else "Head Coach", question=f"question {i}", note=f"note {i}")
+    return log
+
+
+def test_jsonl_and_csv_stream_into_a_temp_file(log):
+    with export_file(log, "jsonl", role="Front Office") as f:
+        assert isinstance(f, io.RawIOBase)  # accepted as is by st.download_button
+        rows = [json.loads(line) for line in f.read().decode("utf-8").splitlines()]
+    assert [r["id"] for r in rows] == list(range(24, 0, -2))
+    assert rows[0]["note"] == "note 23"
+
+    with export_file(log, "csv") as f:
+        reader = csv.DictReader(io.StringIO(f.read().decode("utf-8")))
+        assert tuple(reader.fieldnames) == EXPORT_FIELDS
+        assert [int(r["id"]) for r in reader] == list(range(25, 0, -1))
+
+
+def test_empty_export_is_an_empty_file(log):
+    with export_file(log, "jsonl", status="closed") as f:
+        assert f.read() == b""
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_arrow_formats_round_trip(log, export_format):
+    pa = pytest.importorskip("pyarrow")
+    with export_file(log, export_format, role="Head Coach") as f:
+        data = f.read()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(pa.BufferReader(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.column("id").to_pylist() == list(range(25, 0, -2))
+
+
+def test_export_spans_several_chunks():
+    log = QueryLog()
+    total = EXPORT_CHUNK * 2 + 5
+    for i in range(total):
+        log.log(user="u", role="Head Coach", question=f"question {i}")
+    with export_file(log, "csv") as f:
+        lines = f.read().decode("utf-8").splitlines()
+    assert len(lines) == total + 1  # one header
+    with export_file(log, "jsonl") as f:
+        assert sum(1 for _ in f.read().splitlines()) == total
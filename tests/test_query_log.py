@@ -0,0 +1,91 @@
+from query_log import FileIdAllocator, MemoryBackend, QueryLog, SegmentedFileBackend
+
+
+def test_page_cursor_stops_at_exact_multiple():
+    log = QueryLog()
+    for i in range(40):
+        log.log(user="u", role="Head Coach", question=f"question {i}")
+    first, cursor = log.page(limit=20)
+    assert len(first) == 20 and cursor is not None
+    second, cursor = log.page(before_id=cursor, limit=20)
+    assert len(second) == 20
+    assert cursor is None
+
+
+def test_page_cursor_with_filters():
+    log = QueryLog()
+    for i in range(6):
+        log.log(user="u", role="Front Office" if i % 2 else "Head Coach", question=f"question {i}")
+    page, cursor = log.page(limit=3, role="Front Office")
+    assert [q["id"] for q in page] == [6, 4, 2]
+    assert cursor is None
+    page, cursor = log.page(limit=2, role="Front Office")
+    assert cursor == 4
+    assert [q["id"] for q in log.page(before_id=cursor, limit=2, role="Front Office")[0]] == [2]
+
+
+class ReplayBackend(MemoryBackend):
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def replay(self):
+        return iter(self.records)
+
+
+def test_date_filters_with_interleaved_id_blocks():
+    # two processes holding id blocks 1-64 and 65-128, logging on alternate days
+    days = [(65, "2026-01-01"), (1, "2026-01-02"), (66, "2026-01-03"), (2, "2026-01-04"), (67, "2026-01-05")]
+    log = QueryLog(ReplayBackend([
+        {"op": "add", "id": q_id, "user": "u", "role": "Head Coach", "question": f"question {q_id}",
+         "status": "new", "note": "", "created_at": f"{day} 09:00"}
+        for q_id, day in days
+    ]))
+
+    def ids(**filters):
+        return [q["id"] for q in log.page(limit=10, **filters)[0]]
+
+    assert ids(date_from="2026-01-03") == [67, 66, 2]
+    assert ids(date_to="2026-01-02") == [65, 1]
+    assert ids(date_from="2026-01-02", date_to="2026-01-04") == [66, 2, 1]
+    assert ids(date_from="2026-01-02", date_to="2026-01-04", status="new") == [66, 2, 1]
+    page, cursor = log.page(limit=1, date_from="2026-01-03")
+    assert [q["id"] for q in page] == [67]
+    assert [q["id"] for q in log.page(before_id=cursor, limit=5, date_from="2026-01-03")[0]] == [66, 2]
+
+
+def test_search_without_notes_matches_questions_only():
+    log = QueryLog()
+    with_note = log.log(user="a", role="Head Coach", question="travel plans", note="hamstring flagged")
+    asked = log.log(user="b", role="Head Coach", question="hamstring timeline?")
+    log.update(asked, status="reviewed", note="hamstring again")
+
+    assert [q["id"] for q in log.page(text="hamstring")[0]] == [asked, with_note]
+    assert [q["id"] for q in log.page(text="hamstring", search_notes=False)[0]] == [asked]
+    assert log.page(text="flagged", search_notes=False)[0] == []
+
+
+def test_segment_files_replay_adds_and_note_patches(tmp_path):
+    log = QueryLog(SegmentedFileBackend(str(tmp_path), segment_bytes=200))
+    first = log.log(user="u", role="Head Coach", question="how is #17?")
+    second = log.log(user="v", role="Team Physician", question="hamstring timeline?")
+    log.update(first, status="answered", note="sent the rehab plan")
+    log.update(first, status="reviewed", note="checked again")
+    assert log.backend.flush(timeout=5)
+    log.backend.close()
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) > 1  # small segments roll over
+
+    replayed = QueryLog(SegmentedFileBackend(str(tmp_path)))
+    assert replayed.entries() == log.entries()
+    assert replayed.get(first)["status"] == "reviewed"
+    assert replayed.get(first)["note"] == "checked again"
+    assert replayed.log(user="u", role="Head Coach", question="next") > second
+    replayed.backend.close()
+
+
+def test_file_id_blocks_never_overlap(tmp_path):
+    path = str(tmp_path / "ids.seq")
+    a, b = FileIdAllocator(path, block=4), FileIdAllocator(path, block=4)
+    ids = [a.next_id(), b.next_id(), a.next_id(), b.next_id()] + [a.next_id() for _ in range(5)]
+    assert len(set(ids)) == len(ids)
+    assert ids[:4] == [1, 5, 2, 6]
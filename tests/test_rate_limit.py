@@ -0,0 +1,70 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, parse_budgets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_deny_then_refill():
+    clock = Clock()
+    limiter = RateLimiter({"*": (60.0, 3)}, clock=clock)  # one token a second
+    assert [limiter.acquire("ana", "Head Coach") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("ana", "Head Coach") == pytest.approx(1.0)
+    clock.now += 0.5
+    assert limiter.acquire("ana", "Head Coach") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.acquire("ana", "Head Coach") == 0.0
+    clock.now += 100  # refills only up to the burst
+    assert [limiter.acquire("ana", "Head Coach") for _ in range(4)][-1] > 0
+    assert limiter.acquire("ben", "Head Coach") == 0.0  # buckets are per user
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["throttled"]) == (8, 3)
+
+
+def test_budgets_are_per_role():
+    limiter = RateLimiter({"Team Physician": (60.0, 4), "*": (60.0, 1)}, clock=Clock())
+    physician = [limiter.acquire("kim", "Team Physician") for _ in range(5)]
+    coach = [limiter.acquire("kim", "Head Coach") for _ in range(2)]
+    assert physician.count(0.0) == 4 and coach.count(0.0) == 1
+    assert limiter.stats()["by_role"] == {
+        "Head Coach": {"admitted": 1, "throttled": 1},
+        "Team Physician": {"admitted": 4, "throttled": 1},
+    }
+
+
+def test_refund_and_reset_give_tokens_back():
+    limiter = RateLimiter({"*": (60.0, 1)}, clock=Clock())
+    assert limiter.acquire("ana", "Head Coach") == 0.0
+    limiter.refund("ana", "Head Coach")
+    assert limiter.acquire("ana", "Head Coach") == 0.0
+    assert limiter.acquire("ana", "Head Coach") > 0
+    limiter.reset("ana", "Head Coach")
+    assert limiter.acquire("ana", "Head Coach") == 0.0
+
+
+def test_full_buckets_are_swept(monkeypatch):
+    monkeypatch.setattr(rate_limit, "SWEEP_EVERY", 4)
+    clock = Clock()
+    limiter = RateLimiter({"*": (60.0, 2)}, shards=1, clock=clock)
+    for user in ("a", "b", "c"):
+        limiter.acquire(user, "Head Coach")
+    assert limiter.stats()["buckets"] == 3
+    clock.now += 60
+    limiter.acquire("d", "Head Coach")  # fourth check on the shard sweeps it
+    assert limiter.stats()["buckets"] == 1  # d's own bucket is kept, so its token stays spent
+    assert limiter.acquire("d", "Head Coach") == 0.0
+    assert limiter.acquire("d", "Head Coach") > 0
+
+
+def test_parse_budgets():
+    assert parse_budgets("Team Physician=60/15, *=20") == {"Team Physician": (60.0, 15), "*": (20.0, 5)}
+    for spec in ("Head Coach", "=20/5", "*=fast", "*=0/5", "*=20/0"):
+        with pytest.raises(ValueError, match="ROLE=PER_MINUTE"):
+            parse_budgets(spec)
@@ -0,0 +1,74 @@
+import io
+import re
+
+import pytest
+
+from player_store import PlayerStore
+from roster_loader import RosterError, diff_updates, load_roster, read_updates
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / "roster.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_roster_with_aliased_headers(tmp_path):
+    path = write(tmp_path, "Jersey,Player Name,Pos,Availability\n7,Sam Lee,qb,Full participation\n12,Ana Cruz,WR,\n")
+    records = load_roster(path)
+    assert [(r.number, r.name, r.position, r.status) for r in records] == [
+        (7, "Sam Lee", "QB", "Full participation"),
+        (12, "Ana Cruz", "WR", ""),
+    ]
+    store = PlayerStore(records)
+    assert [p["number"] for p in store.by_position("QB")] == [7]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("name,position\nSam Lee,QB\n", "missing column(s): number"),
+        ("number,name,position\nseven,Sam Lee,QB\n", "Row 2: invalid player number 'seven'"),
+        ("number,name,position\n7,Sam Lee,QB\n7,Ana Cruz,WR\n", "Row 3: duplicate player number 7"),
+        ("number,name,position\n7,,QB\n", "Row 2: name and position are required"),
+    ],
+)
+def test_malformed_csv_is_rejected(tmp_path, text, message):
+    with pytest.raises(RosterError, match=re.escape(message)):
+        load_roster(write(tmp_path, text))
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    path = tmp_path / "roster.xlsx"
+    path.write_bytes(b"")
+    with pytest.raises(RosterError, match="Unsupported roster format"):
+        load_roster(str(path))
+
+
+def test_bulk_diff_skips_unchanged_cells_and_csv_blanks():
+    store = PlayerStore()
+    current = store.get(22)
+    rows = read_updates(io.StringIO(f"number,injury,status\n22,{current['injury']},Out\n17,,\n3,,-\n"))
+    assert diff_updates(store, rows) == {22: {"status": "Out"}, 3: {"status": ""}}
+
+
+def test_bulk_diff_lets_a_grid_edit_clear_a_field():
+    store = PlayerStore()
+    grid_rows = [{"number": 22, "injury": None}, {"number": 17, "status": ""}]  # only the emptied cells
+    changes = diff_updates(store, grid_rows, blank_clears=True)
+    assert changes == {22: {"injury": ""}, 17: {"status": ""}}
+    store.update_many(changes)
+    assert store.get(22)["injury"] == "" and store.get(17)["status"] == ""
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("number,status\n999,Out\n", "Row 2: no such player 999"),
+        ("number,status\n17,Out\n17,Limited\n", "Row 3: player #17 appears more than once"),
+        ("number,status\n,Out\n", "Row 2: no player number or id"),
+    ],
+)
+def test_bulk_diff_rejects_bad_rows(text, message):
+    with pytest.raises(RosterError, match=re.escape(message)):
+        diff_updates(PlayerStore(), read_updates(io.StringIO(text)))
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+import change_feed
+import player_store
+from change_feed import FEED_STREAM, ChangeFeed
+from player_store import PLAYER_STREAM, PlayerStore
+from shared_state import LocalState, RedisState, SQLiteState, StandInServer
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        yield LocalState()
+    elif request.param == "sqlite":
+        state = SQLiteState(str(tmp_path / "state.db"))
+        yield state
+        state.close()
+    else:
+        server = StandInServer()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        state = RedisState(port=server.port)
+        yield state
+        state.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_trim_keeps_sequence_numbers(state):
+    for i in range(10):
+        assert state.append("s", {"i": i}) == i + 1
+    state.trim("s", 7)
+    assert [seq for seq, _ in state.read("s", 0)] == [7, 8, 9, 10]
+    assert state.read("s", 8, limit=1) == [(9, {"i": 8})]
+    assert state.last("s") == 10
+    assert state.append("s", {"i": 10}) == 11
+
+
+def test_trim_always_keeps_the_newest_record(state):
+    for i in range(3):
+        state.append("s", {"i": i})
+    state.trim("s", 100)
+    assert state.read("s", 0) == [(3, {"i": 2})]
+    assert state.append("s", {"i": 3}) == 4
+    state.trim("s", 2)  # already gone: no-op
+    assert [seq for seq, _ in state.read("s", 0)] == [3, 4]
+
+
+def test_feed_stream_keeps_the_feed_retention(state, monkeypatch):
+    monkeypatch.setattr(change_feed, "TRIM_EVERY", 4)
+    feed = ChangeFeed(retention=5, shared=state)
+    for i in range(20):
+        feed.publish("update", f"event {i}")
+    assert len(state.read(FEED_STREAM, 0)) <= 5 + 4
+    late = ChangeFeed(retention=5, shared=state)
+    events, cursor, missed = late.read(0)
+    assert [e.text for e in events] == [f"event {i}" for i in range(15, 20)]
+    assert cursor == 20 and missed == 15
+
+
+def test_late_worker_starts_from_snapshot_and_tail(state, monkeypatch):
+    monkeypatch.setattr(player_store, "SNAPSHOT_EVERY", 4)
+    first = PlayerStore(shared=state)
+    number = first.numbers()[0]
+    for i in range(10):
+        first.update(number, status=f"status {i}")
+    assert state.read(PLAYER_STREAM, 0)[0][0] > 1  # covered batches are gone
+
+    late = PlayerStore(shared=state)
+    assert late.get(number)["status"] == "status 9"
+    first.update(number, status="status 10")
+    late.sync()
+    assert late.get(number)["status"] == "status 10"
@@ -0,0 +1,44 @@
+from chatbot import ai_answer, similar_questions
+from query_log import get_query_log
+
+NOTE = "MRI confirms torn ACL, do not disclose"
+
+
+def log_physician_note():
+    log = get_query_log()
+    q_id = log.log(user="doc", role="Team Physician", question="gala parking passes for the medical staff?")
+    log.update(q_id, "reviewed", NOTE)
+    return q_id
+
+
+def test_no_cross_role_note_in_fallback():
+    log_physician_note()
+    for role in ("Front Office", "Head Coach", "Assistant Coach", "Unknown"):
+        answer = ai_answer("gala parking passes?", role)
+        assert "MRI" not in answer
+        assert "gala parking passes for the medical staff" not in answer
+
+
+def test_note_words_do_not_surface_questions():
+    log = get_query_log()
+    q_id = log.log(user="fo1", role="Front Office", question="contract timeline question")
+    log.update(q_id, "reviewed", "MRI pending for the trade target")
+    assert similar_questions("MRI", "Front Office") == []
+
+
+def test_same_role_questions_without_notes():
+    log = get_query_log()
+    q_id = log.log(user="fo1", role="Front Office", question="ticket sales outlook?")
+    log.update(q_id, "reviewed", "internal only")
+    similar = similar_questions("ticket sales outlook", "Front Office")
+    assert [q["id"] for q in similar] == [q_id]
+    assert "note" not in similar[0]
+    assert "internal only" not in ai_answer("ticket sales outlook", "Front Office")
+
+
+def test_clinical_roles_see_notes():
+    q_id = log_physician_note()
+    assert NOTE in ai_answer("gala parking passes?", "Team Physician")
+    similar = similar_questions("gala parking passes", "Athletic Trainer")
+    assert [q["id"] for q in similar] == [q_id]
+    assert similar[0]["note"] == NOTE
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+import player_store
+from chatbot import ai_answer
+from player_store import PlayerStore, get_store
+from timeline import strip_when
+
+
+def test_strip_when_drops_time_phrases():
+    assert "3" not in strip_when("What changed in the last 3 days?")
+    assert "tuesday" not in strip_when("roster as of Tuesday for #17")
+    assert "#17" in strip_when("roster as of Tuesday for #17")
+
+
+@pytest.mark.parametrize("days", [2, 3])  # #3 Eli Summers is on the demo roster, #2 is not
+def test_last_n_days_where_n_is_a_jersey_number(days):
+    store = get_store()
+    store.update(17, status="Out")
+    store.update(22, status="Limited")
+    answer = ai_answer(f"what changed in the last {days} days?", "Team Physician")
+    assert "(2)" in answer
+    assert "#17 Jalen Ortiz" in answer and "#22 Devin Cole" in answer
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_as_of_rebuilds_past_rosters(tmp_path, monkeypatch):
+    path = str(tmp_path / "players.db")
+    store = PlayerStore(path=path)
+    start = time.time()
+    original = store.all()
+    clock = Clock(start + 100)
+    monkeypatch.setattr(player_store.time, "time", clock)
+    store.update(17, status="Limited")
+    clock.now = start + 200
+    store.update_many({17: {"status": "Cleared"}, 22: {"injury": "Left ankle sprain"}})
+
+    for reader in (store, PlayerStore(path=path)):  # the timeline is also rebuilt from SQLite
+        assert reader.as_of(start + 50) == original
+        assert reader.get_as_of(17, start + 150)["status"] == "Limited"
+        assert reader.get_as_of(22, start + 150)["injury"] == original[1]["injury"]
+        assert reader.as_of(start + 250) == store.all()
+        assert [c["number"] for c in reader.changes_between(start + 50, start + 150)] == [17]
+        later = {c["number"]: c for c in reader.changes_between(start + 150)}  # one batch, roster order
+        assert sorted(later) == [17, 22]
+        assert later[17]["before"]["status"] == "Limited"
+
+
+def test_roster_as_of_answer_uses_the_past_version(monkeypatch):
+    store = get_store()
+    monkeypatch.setattr(player_store.time, "time", Clock(time.time() + 3 * 3600))
+    store.update(17, status="Cleared")
+    answer = ai_answer("roster as of the last 2 hours", "Team Physician")
+    assert "Out 1–2 weeks – rehab only" in answer and "Cleared" not in answer
@@ -0,0 +1,172 @@
+"""
+Chat answers over the roster's history.
+
+PlayerStore keeps every version of every player (see PlayerStore.history());
+this module turns a question's time phrase ("since yesterday", "as of
+Tuesday", "in the last 6 hours") into a point in time and formats the
+matching slice of history for the chat.
+"""
+import re
+from datetime import datetime, timedelta
+
+from injury_report import format_player
+from player_store import status_category
+from projection import policy_for, project
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+UNITS = {"minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+LAST_N_RE = re.compile(r"\b(?:last|past)\s+(\d+)\s+(minute|hour|day|week)s?\b")
+LAST_UNIT_RE = re.compile(r"\b(?:last|past)\s+(minute|hour|day|week)\b")
+WEEKDAY_RE = re.compile(r"\b(" + "|".join(WEEKDAYS) + r")\b")
+RELATIVE_DAY_RE = re.compile(r"\b(?:yesterday|today|this morning|this week)\b")
+
+DEFAULT_WINDOW = UNITS["day"]
+MAX_CHANGES_SHOWN = 25
+
+
+def parse_when(text: str, now: datetime | None = None) -> tuple[float, str] | None:
+    """
+    (epoch seconds, label) for the first time phrase in the text, or None.
+    Days mean the start of that day: "since yesterday" is from midnight. The
+    label reads after "since" or "as of".
+    """
+    now = now or datetime.now()
+    lower = text.lower()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    match = LAST_N_RE.search(lower)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        return now.timestamp() - amount * UNITS[unit], f"{amount} {unit}{'s' if amount != 1 else ''} ago"
+    match = LAST_UNIT_RE.search(lower)
+    if match:
+        unit = match.group(1)
+        return now.timestamp() - UNITS[unit], f"{'an' if unit == 'hour' else 'a'} {unit} ago"
+    if "yesterday" in lower:
+        return (midnight - timedelta(days=1)).timestamp(), "yesterday"
+    if "today" in lower or "this morning" in lower:
+        return midnight.timestamp(), "midnight"
+    if "this week" in lower:
+        monday = midnight - timedelta(days=now.weekday())
+        return monday.timestamp(), f"{monday:%A %m/%d}"
+    match = WEEKDAY_RE.search(lower)
+    if match:
+        days_back = (now.weekday() - WEEKDAYS.index(match.group(1))) % 7
+        day = midnight - timedelta(days=days_back)
+        return day.timestamp(), f"{day:%A %m/%d}"
+    return None
+
+
+def strip_when(text: str) -> str:
+    """
+    The (lowercased) text without the time phrases parse_when reads, so the 3
+    in "the last 3 days" is not taken for jersey #3.
+    """
+    lower = text.lower()
+    for pattern in (LAST_N_RE, LAST_UNIT_RE, WEEKDAY_RE, RELATIVE_DAY_RE):
+        lower = pattern.sub(" ", lower)
+    return lower
+
+
+def format_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%a %m/%d %H:%M")
+
+
+def format_duration(seconds: float) -> str:
+    days, rest = divmod(int(max(seconds, 0)), 86400)
+    hours = rest // 3600
+    if days:
+        return f"{days} day{'s' if days != 1 else ''}" + (f" {hours} h" if hours else "")
+    if hours:
+        return f"{hours} h"
+    return f"{max(rest // 60, 1)} min"
+
+
+def format_changes(store, text: str, numbers=None, role: str | None = None) -> str:
+    """
+    Every update since the time named in the text (default: the last 24
+    hours), showing only the fields the role may see.
+    """
+    start, label = parse_when(text) or (datetime.now().timestamp() - DEFAULT_WINDOW, "24 hours ago")
+    wanted = set(numbers) if numbers else None
+    policy = policy_for(role) if role is not None else None
+
+    entries = []
+    for change in store.changes_between(start):
+        if wanted is not None and change["number"] not in wanted:
+            continue
+        before, after = change["before"], change["after"]
+        if policy is not None:
+            before, after = project(before, policy), project(after, policy)
+        parts = [
+            f"**{field}:** {before[field]} → {after[field]}"
+            for field in ("injury", "status", "position", "name")
+            if field in after and before[field] != after[field]
+        ]
+        # an edit the role cannot see is not a change for that role
+        if parts or policy is None:
+            entries.append(
+                f"- {format_time(change['recorded_at'])} — **#{after['number']} {after['name']}**: "
+                + ("; ".join(parts) or "re-saved, no change")
+            )
+    if not entries:
+        return f"No injury report changes since {label}."
+
+    noun = "change" if len(entries) == 1 else "changes"
+    lines = [f"Injury report {noun} since {label} ({len(entries)}):\n"]
+    lines.extend(reversed(entries[-MAX_CHANGES_SHOWN:]))
+    if len(entries) > MAX_CHANGES_SHOWN:
+        lines.append(f"\n_…and {len(entries) - MAX_CHANGES_SHOWN} earlier changes._")
+    return "\n".join(lines)
+
+
+def format_player_timeline(store, number: int, role: str | None = None) -> str:
+    """A player's versions, newest first, and how long the current status has applied."""
+    history = store.history(number)
+    if not history:
+        return f"No player with number **#{number}** on the roster."
+    if role is not None:
+        policy = policy_for(role)
+        projected = []
+        for version in history:
+            view = dict(project(version, policy), recorded_at=version["recorded_at"])
+            # versions that differ only in fields the role cannot see collapse into one
+            if not projected or any(view.get(f) != projected[-1].get(f) for f in ("injury", "status")):
+                projected.append(view)
+        history = projected
+    current = history[-1]
+    category = status_category(store.get(number)["status"])
+    started, known = store.status_since(number)
+    now = datetime.now().timestamp()
+    if known:
+        since = f"since {format_time(started)} ({format_duration(now - started)})"
+    elif started:
+        since = f"since at least {format_time(started)}, when records begin ({format_duration(now - started)})"
+    else:
+        since = "since before records begin"
+
+    lines = [
+        f"**#{number} {current['name']} ({current['position']})** is currently **{current['status']}**, "
+        f"listed as _{category}_ {since}.\n",
+        "History (newest first):",
+    ]
+    for version in reversed(history):
+        when = format_time(version["recorded_at"]) if version["recorded_at"] else "initial"
+        lines.append(f"- {when}: " + " — ".join(version[f] for f in ("injury", "status") if f in version))
+    return "\n".join(lines)
+
+
+def format_roster_as_of(store, text: str, numbers=None, role: str | None = None) -> str | None:
+    parsed = parse_when(text)
+    if parsed is None:
+        return None
+    when, label = parsed
+    players = store.as_of(when)
+    if numbers:
+        wanted = set(numbers)
+        players = [p for p in players if p["number"] in wanted]
+    if role is not None:
+        policy = policy_for(role)
+        players = [project(p, policy) for p in players]
+    return "\n".join([f"Here’s the injury report as of **{label}**:\n"] + [format_player(p) for p in players])